@@ -85,6 +85,26 @@ class LeakPredictionAI:
                 risk_score += 25
                 risk_factors.append(f"Current leak rate at {proximity:.0f}% of threshold")
 
+        # Factor 2b: EPA leak rate at the latest refrigerant addition (the higher of both methods)
+        latest_addition = ServiceLog.query.filter(
+            ServiceLog.equipment_id == equipment_id,
+            ServiceLog.refrigerant_added > 0
+        ).order_by(ServiceLog.service_date.desc(), ServiceLog.id.desc()).first()
+
+        epa_leak_rate = None
+        if latest_addition:
+            rates = [rate for rate in (latest_addition.annualized_leak_rate, latest_addition.rolling_average_leak_rate)
+                     if rate is not None]
+            epa_leak_rate = max(rates) if rates else None
+
+        if epa_leak_rate is not None:
+            if epa_leak_rate > equipment.leak_rate_threshold:
+                risk_score += 40
+                risk_factors.append(f"EPA leak rate from refrigerant added ({epa_leak_rate:.1f}%) exceeds threshold")
+            elif epa_leak_rate > equipment.leak_rate_threshold * 0.6:
+                risk_score += 20
+                risk_factors.append(f"EPA leak rate from refrigerant added at {epa_leak_rate:.1f}%")
+
         # Factor 3: Non-compliant history
         non_compliant = [i for i in inspections if not i.compliant]
         if len(non_compliant) > 0:
@@ -140,6 +160,11 @@ class LeakPredictionAI:
             'recommendation': recommendation,
             'color': color,
             'current_leak_rate': inspections[0].annual_leak_rate if inspections[0].annual_leak_rate else 0,
+            'epa_leak_rate': {
+                'annualizing': latest_addition.annualized_leak_rate,
+                'rolling_average': latest_addition.rolling_average_leak_rate,
+                'service_date': latest_addition.service_date.isoformat()
+            } if latest_addition else None,
             'threshold': equipment.leak_rate_threshold,
             'inspections_analyzed': len(inspections)
         }
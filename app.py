@@ -3,18 +3,22 @@ EPA Section 608 Refrigerant Tracking & Compliance System
 Managed under 40 CFR Part 82
 Flask web application for tracking refrigerant usage, leakage, recovery, and compliance
 """
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_file, session
-from models import db, Equipment, Technician, ServiceLog, LeakInspection, RefrigerantTransaction, ComplianceAlert, RefrigerantInventory, Document, TechnicianCertification, User, Customer
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_file, session, Response, stream_with_context, abort
+from models import db, Equipment, Technician, ServiceLog, LeakInspection, RefrigerantTransaction, ComplianceAlert, RefrigerantInventory, Document, TechnicianCertification, User, Customer, EquipmentComplianceState, RefrigerantDailyRollup, SweepRun, ComplianceAlertArchive
 from datetime import datetime, timedelta
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, inspect, text
+from sqlalchemy.schema import CreateIndex
 from config import get_config
 import os
+import gzip
+import json
 from dotenv import load_dotenv
 from file_utils import (
     create_document_record,
     get_document_path,
     delete_document,
     get_documents_by_entity,
+    documents_by_entity_query,
     format_file_size,
     get_document_icon,
     ALLOWED_EXTENSIONS,
@@ -22,6 +26,44 @@ from file_utils import (
     generate_unique_filename,
     get_upload_folder
 )
+from compliance_state import refresh_compliance_state, rebuild_compliance_states
+from refrigerant_usage import (
+    add_refrigerant_transaction,
+    rebuild_refrigerant_rollup,
+    backfill_transaction_customers,
+    detach_customer_usage,
+    get_monthly_refrigerant_usage,
+    get_usage_by_refrigerant,
+    USAGE_GROUPINGS
+)
+from dashboard_sections import (
+    build_dashboard_context,
+    get_shell_sections,
+    get_role_widgets,
+    invalidate_dashboard_sections,
+    section_cache,
+    DASHBOARD_WIDGETS
+)
+from pagination import paginate_keyset, get_page_size, InvalidCursor
+from equipment_search import ensure_search_index, rebuild_search_index, search_index_size, search_equipment_page, index_equipment, reindex_customer
+from equipment_lookup import equipment_code_index, lookup_equipment, compliance_summary
+from equipment_manifest import get_manifest_version, build_manifest
+from equipment_export import parse_fields, apply_equipment_filters, project_equipment, stream_ndjson, stream_csv
+from conditional_get import collection_version, make_etag, not_modified_response, set_validators
+from bulk_import import detect_format, iter_import_rows, ALL_OR_NOTHING
+from equipment_import import import_equipment
+from service_log_import import ingest_service_logs
+from compliance_sweep import start_sweep_scheduler
+from compliance_alerts import merge_duplicate_alerts, resolve_alerts
+from record_archive import with_archived
+from refrigerant_inventory import adjust_inventory, retry_on_conflict
+from inventory_balances import balance_at, balances_at
+from refrigerant_forecast import get_catalog_forecast
+from leak_rates import (
+    recompute_leak_rates, what_if_thresholds, recompute_inspection_window,
+    recompute_service_leak_rates, recompute_service_window
+)
+from stats_service import get_equipment_stats, get_alert_stats, get_inspection_stats, get_technician_stats
 from auth import (
     login_required,
     permission_required,
@@ -58,6 +100,33 @@ db.init_app(app)
 with app.app_context():
     db.create_all()
 
+    # create_all skips existing tables, so add nullable columns introduced since they were created
+    inspector = inspect(db.engine)
+    added_columns = set()
+    for table in db.metadata.sorted_tables:
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns and column.nullable:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                db.session.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                added_columns.add((table.name, column.name))
+    db.session.commit()
+
+    # Transactions from before owners were recorded get the equipment's current customer
+    if ('refrigerant_transaction', 'customer_id') in added_columns:
+        backfill_transaction_customers()
+        db.session.commit()
+
+    # Duplicate active alerts from before deduplication would block its unique index
+    merge_duplicate_alerts()
+    db.session.commit()
+
+    # ... and indexes (IF NOT EXISTS, since reflection skips expression indexes)
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            db.session.execute(CreateIndex(index, if_not_exists=True))
+    db.session.commit()
+
     # Initialize common refrigerants in inventory if empty
     if RefrigerantInventory.query.count() == 0:
         common_refrigerants = [
@@ -80,6 +149,31 @@ with app.app_context():
 
         db.session.commit()
 
+    # Backfill the compliance rollup for databases created before it existed
+    if EquipmentComplianceState.query.count() == 0 and Equipment.query.count() > 0:
+        rebuild_compliance_states()
+
+    # Backfill EPA leak rates for refrigerant additions logged before they were stored
+    if db.session.query(ServiceLog.id).join(Equipment).filter(
+        ServiceLog.refrigerant_added > 0,
+        ServiceLog.annualized_leak_rate.is_(None),
+        Equipment.full_charge > 0
+    ).first():
+        recompute_service_leak_rates()
+        db.session.commit()
+
+    # Backfill the daily refrigerant rollup for ledgers recorded before it existed
+    if RefrigerantDailyRollup.query.count() == 0 and RefrigerantTransaction.query.count() > 0:
+        rebuild_refrigerant_rollup()
+
+    # Create the equipment search index and backfill it for existing equipment
+    ensure_search_index()
+    if search_index_size() == 0 and Equipment.query.count() > 0:
+        rebuild_search_index()
+
+    # Load the scanner's equipment code index
+    equipment_code_index.load()
+
 
 # ============================================================================
 # PUBLIC LANDING PAGE
@@ -260,7 +354,7 @@ def logout():
 @role_required('admin')
 def user_list():
     """List all users (Admin only)"""
-    users = User.query.all()
+    users = paginate_keyset(User.query, User.username, User.id, descending=False)
     return render_template('user_list.html', users=users)
 
 
@@ -407,6 +501,16 @@ def inject_user():
     }
 
 
+@app.errorhandler(InvalidCursor)
+def handle_invalid_cursor(e):
+    """Restart paging from the first page when a stale or tampered cursor is supplied"""
+    if request.path.startswith('/api/'):
+        return jsonify({'error': str(e)}), 400
+    flash('That page link is no longer valid - showing the first page', 'warning')
+    args = {k: v for k, v in request.args.items() if k not in ('after', 'before')}
+    return redirect(url_for(request.endpoint, **(request.view_args or {}), **args))
+
+
 # ============================================================================
 # DASHBOARD
 # ============================================================================
@@ -414,155 +518,59 @@ def inject_user():
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    """Main dashboard - requires login"""
-    # Get statistics
-    total_equipment = Equipment.query.filter_by(status='Active').count()
-    total_technicians = Technician.query.filter_by(status='Active').count()
-    active_alerts = ComplianceAlert.query.filter_by(status='Active').count()
-
-    # Recent service logs
-    recent_services = ServiceLog.query.order_by(desc(ServiceLog.service_date)).limit(5).all()
-
-    # Upcoming inspections
-    today = datetime.now().date()
-    upcoming_inspections = []
-    equipment_list = Equipment.query.filter_by(status='Active').all()
-    for equip in equipment_list:
-        last_inspection = LeakInspection.query.filter_by(equipment_id=equip.id).order_by(desc(LeakInspection.inspection_date)).first()
-        if last_inspection and last_inspection.next_inspection_date:
-            if last_inspection.next_inspection_date <= today + timedelta(days=7):
-                upcoming_inspections.append({
-                    'equipment': equip,
-                    'next_date': last_inspection.next_inspection_date
-                })
-
-    # Active compliance alerts
-    alerts = ComplianceAlert.query.filter_by(status='Active').order_by(desc(ComplianceAlert.alert_date)).limit(10).all()
-
-    # Low inventory warnings
-    low_inventory = RefrigerantInventory.query.filter(
-        RefrigerantInventory.quantity_on_hand < RefrigerantInventory.reorder_level
-    ).all()
-
-    # === COMPLIANCE METRICS (Manager/Auditor View) ===
-
-    # 1. Compliance Percentage - Equipment with leak rate < 30%
-    compliant_equipment = 0
-    if total_equipment > 0:
-        for equip in equipment_list:
-            last_inspection = LeakInspection.query.filter_by(equipment_id=equip.id).order_by(desc(LeakInspection.inspection_date)).first()
-            if last_inspection:
-                # Equipment is compliant if leak rate < 30% (EPA threshold)
-                if last_inspection.leak_rate_percent < 30:
-                    compliant_equipment += 1
-            else:
-                # No inspection yet, consider compliant (benefit of doubt)
-                compliant_equipment += 1
+    """Main dashboard - requires login; renders the role's page shell, widgets load from JSON endpoints"""
+    current_user = get_current_user()
+    role = current_user.role if current_user else None
+    context = build_dashboard_context(role, sections=get_shell_sections(role))
+    return render_template('dashboard.html', widgets=get_role_widgets(role), **context)
 
-        compliance_percentage = round((compliant_equipment / total_equipment) * 100, 1)
-    else:
-        compliance_percentage = 100.0
-
-    # 2. Active Leak Alerts (Critical + Warning)
-    critical_alerts = ComplianceAlert.query.filter_by(status='Active', severity='Critical').count()
-    warning_alerts = ComplianceAlert.query.filter_by(status='Active', severity='Warning').count()
-
-    # 3. Upcoming EPA Reports (next 30 days)
-    # For demo, we'll show inspections due as "reports needed"
-    upcoming_reports_count = len(upcoming_inspections)
-    # Add equipment that need annual reports
-    six_months_ago = today - timedelta(days=180)
-    equipment_needing_reports = Equipment.query.filter(
-        Equipment.status == 'Active',
-        Equipment.install_date <= six_months_ago
-    ).count()
-
-    # 4. Refrigerant Recovery Summary (last 30 days)
-    thirty_days_ago = today - timedelta(days=30)
-    recovery_logs = ServiceLog.query.filter(
-        ServiceLog.service_date >= thirty_days_ago,
-        ServiceLog.refrigerant_recovered > 0
-    ).all()
-
-    total_recovered = sum([log.refrigerant_recovered for log in recovery_logs])
-    recovery_count = len(recovery_logs)
-
-    # 5. Monthly Refrigerant Usage Trend (last 6 months)
-    monthly_usage = []
-    monthly_labels = []
-
-    for i in range(5, -1, -1):  # Last 6 months
-        month_date = today - timedelta(days=30*i)
-        month_start = month_date.replace(day=1)
-
-        # Calculate next month start
-        if month_date.month == 12:
-            month_end = month_date.replace(year=month_date.year + 1, month=1, day=1)
-        else:
-            month_end = month_date.replace(month=month_date.month + 1, day=1)
-
-        # Get refrigerant added in this month
-        month_logs = ServiceLog.query.filter(
-            ServiceLog.service_date >= month_start,
-            ServiceLog.service_date < month_end
-        ).all()
-
-        month_total = sum([log.refrigerant_added for log in month_logs if log.refrigerant_added])
-        monthly_usage.append(round(month_total, 2))
-        monthly_labels.append(month_start.strftime('%b %Y'))
-
-    # === TECHNICIAN-SPECIFIC DATA ===
-    # Recent service logs (for technicians to track their work)
-    technician_recent_logs = ServiceLog.query.order_by(desc(ServiceLog.service_date)).limit(10).all()
-
-    # Recent leak inspections
-    recent_leak_inspections = LeakInspection.query.order_by(desc(LeakInspection.inspection_date)).limit(10).all()
-
-    # Equipment needing service soon
-    equipment_needing_service = []
-    for equip in equipment_list:
-        last_service = ServiceLog.query.filter_by(equipment_id=equip.id).order_by(desc(ServiceLog.service_date)).first()
-        if last_service:
-            days_since_service = (today - last_service.service_date).days
-            if days_since_service > 60:  # Equipment not serviced in 60+ days
-                equipment_needing_service.append({
-                    'equipment': equip,
-                    'last_service_date': last_service.service_date,
-                    'days_since': days_since_service
-                })
-
-    # === AUDITOR-SPECIFIC DATA ===
-    # Recent compliance documents
-    recent_documents = Document.query.order_by(desc(Document.uploaded_at)).limit(10).all()
-
-    # All active alerts for audit review
-    all_active_alerts = ComplianceAlert.query.filter_by(status='Active').order_by(desc(ComplianceAlert.alert_date)).all()
-
-    return render_template('dashboard.html',
-                           total_equipment=total_equipment,
-                           total_technicians=total_technicians,
-                           active_alerts=active_alerts,
-                           recent_services=recent_services,
-                           upcoming_inspections=upcoming_inspections,
-                           alerts=alerts,
-                           low_inventory=low_inventory,
-                           # Compliance metrics (Manager/Admin)
-                           compliance_percentage=compliance_percentage,
-                           compliant_equipment=compliant_equipment,
-                           critical_alerts=critical_alerts,
-                           warning_alerts=warning_alerts,
-                           upcoming_reports_count=upcoming_reports_count,
-                           total_recovered=round(total_recovered, 2),
-                           recovery_count=recovery_count,
-                           monthly_usage=monthly_usage,
-                           monthly_labels=monthly_labels,
-                           # Technician-specific data
-                           technician_recent_logs=technician_recent_logs,
-                           recent_leak_inspections=recent_leak_inspections,
-                           equipment_needing_service=equipment_needing_service,
-                           # Auditor-specific data
-                           recent_documents=recent_documents,
-                           all_active_alerts=all_active_alerts)
+
+@app.route('/api/dashboard/widgets/<name>')
+@login_required
+def api_dashboard_widget(name):
+    """Get one dashboard widget as JSON (cacheable, supports conditional GET via ETag)"""
+    widget = DASHBOARD_WIDGETS.get(name)
+    if not widget:
+        return jsonify({'error': f'Unknown widget: {name}'}), 404
+
+    current_user = get_current_user()
+    role = current_user.role if current_user else None
+    if name not in get_role_widgets(role):
+        return jsonify({'error': 'Widget not available for your role'}), 403
+
+    context = build_dashboard_context(role, sections=widget['sections'])
+    response = jsonify(widget['serialize'](context))
+    response.cache_control.private = True
+    response.cache_control.max_age = widget['max_age']
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+@app.route('/api/dashboard/cache-stats')
+@role_required('admin')
+def api_dashboard_cache_stats():
+    """Dashboard section cache hit/miss counters"""
+    return jsonify(section_cache.stats())
+
+
+@app.route('/api/compliance-sweeps/runs')
+@role_required('admin')
+def api_compliance_sweep_runs():
+    """Recent compliance sweep runs with their duration and outcome"""
+    query = SweepRun.query
+    if request.args.get('name'):
+        query = query.filter_by(name=request.args['name'])
+    runs = query.order_by(SweepRun.started_at.desc()).limit(get_page_size()).all()
+    return jsonify([{
+        'name': run.name,
+        'holder': run.holder,
+        'started_at': run.started_at.isoformat(),
+        'duration_ms': run.duration_ms,
+        'status': run.status,
+        'alerts_created': run.alerts_created,
+        'alerts_resolved': run.alerts_resolved,
+        'error': run.error
+    } for run in runs])
 
 
 # ============================================================================
@@ -576,13 +584,10 @@ def equipment_list():
     search_query = request.args.get('search', '').strip()
 
     if search_query:
-        # Search by equipment_id or name
-        equipment = Equipment.query.filter(
-            (Equipment.equipment_id.contains(search_query)) |
-            (Equipment.name.contains(search_query))
-        ).all()
+        # Ranked full-text matches on codes, descriptive fields and customer name
+        equipment = search_equipment_page(search_query)
     else:
-        equipment = Equipment.query.all()
+        equipment = paginate_keyset(Equipment.query, Equipment.equipment_id, Equipment.id, descending=False)
 
     return render_template('equipment_list.html', equipment=equipment, search_query=search_query)
 
@@ -599,14 +604,14 @@ def equipment_detail(id):
     """Equipment detail page"""
     equip = Equipment.query.get_or_404(id)
 
-    # Get service history
-    services = ServiceLog.query.filter_by(equipment_id=id).order_by(desc(ServiceLog.service_date)).all()
+    # Get service history (including archived records)
+    services = with_archived(ServiceLog, 'service_date', equipment_id=id)
 
     # Get leak inspections
-    inspections = LeakInspection.query.filter_by(equipment_id=id).order_by(desc(LeakInspection.inspection_date)).all()
+    inspections = with_archived(LeakInspection, 'inspection_date', equipment_id=id)
 
     # Get refrigerant transactions
-    transactions = RefrigerantTransaction.query.filter_by(equipment_id=id).order_by(desc(RefrigerantTransaction.transaction_date)).all()
+    transactions = with_archived(RefrigerantTransaction, 'transaction_date', equipment_id=id)
 
     # Get documents
     documents = get_documents_by_entity(equipment_id=id)
@@ -663,7 +668,10 @@ def equipment_add():
             )
 
             db.session.add(equip)
+            index_equipment(equip)
             db.session.commit()
+            invalidate_dashboard_sections('equipment')
+            equipment_code_index.update(equip)
 
             flash(f'Equipment {equip.equipment_id} added successfully!', 'success')
             return redirect(url_for('equipment_detail', id=equip.id))
@@ -699,15 +707,35 @@ def equipment_edit(id):
             equip.serial_number = request.form.get('serial_number', '')
             equip.refrigerant_type = request.form['refrigerant_type']
             equip.refrigerant_name = request.form['refrigerant_name']
+            previous_full_charge = equip.full_charge
             equip.full_charge = float(request.form['full_charge'])
             equip.status = request.form['status']
+            previous_threshold = equip.leak_rate_threshold
             equip.leak_rate_threshold = float(request.form.get('leak_rate_threshold', 10.0))
             equip.inspection_frequency = int(request.form.get('inspection_frequency', 30))
 
             if request.form.get('install_date'):
                 equip.install_date = datetime.strptime(request.form['install_date'], '%Y-%m-%d').date()
 
+            index_equipment(equip)
+
+            # Re-evaluate inspection history against the new threshold
+            threshold_changed = equip.leak_rate_threshold != previous_threshold
+            if threshold_changed:
+                recompute_leak_rates([equip.id])
+
+            # EPA leak rates are relative to the full charge
+            full_charge_changed = equip.full_charge != previous_full_charge
+            if full_charge_changed:
+                recompute_service_leak_rates([equip.id])
+
             db.session.commit()
+            invalidate_dashboard_sections('equipment')
+            if threshold_changed:
+                invalidate_dashboard_sections('leak_inspection')
+            if full_charge_changed:
+                invalidate_dashboard_sections('service_log')
+            equipment_code_index.update(equip)
             flash(f'Equipment {equip.equipment_id} updated successfully!', 'success')
             return redirect(url_for('equipment_detail', id=equip.id))
         except Exception as e:
@@ -765,6 +793,7 @@ def technician_add():
 
             db.session.add(tech)
             db.session.commit()
+            invalidate_dashboard_sections('technician')
 
             flash(f'Technician {tech.name} added successfully!', 'success')
             return redirect(url_for('technician_list'))
@@ -817,6 +846,7 @@ def technician_edit(id):
                 tech.expiration_date = datetime.strptime(request.form['expiration_date'], '%Y-%m-%d').date()
 
             db.session.commit()
+            invalidate_dashboard_sections('technician')
             flash(f'Technician {tech.name} updated successfully!', 'success')
             return redirect(url_for('technician_list'))
         except Exception as e:
@@ -861,8 +891,8 @@ def download_technician_certificate(id):
 @app.route('/customers')
 def customer_list():
     """List all customers"""
-    customers = Customer.query.order_by(Customer.company_name).all()
-    return render_template('customer_list.html', customers=customers)
+    customers = paginate_keyset(Customer.query, Customer.company_name, Customer.id, descending=False)
+    return render_template('customer_list.html', customers=customers, total_customers=Customer.query.count())
 
 
 @app.route('/customers/add', methods=['GET', 'POST'])
@@ -914,6 +944,8 @@ def customer_edit(id):
             customer.notes = request.form.get('notes', '')
             customer.status = request.form['status']
 
+            # Customer name is part of each equipment's search entry
+            reindex_customer(customer.id)
             db.session.commit()
             flash(f'Customer {customer.company_name} updated successfully!', 'success')
             return redirect(url_for('customer_list'))
@@ -930,7 +962,12 @@ def customer_delete(id):
     customer = Customer.query.get_or_404(id)
 
     try:
+        equipment = list(customer.equipment)
+        # Its refrigerant usage history stays, as unassigned
+        detach_customer_usage(customer.id)
         db.session.delete(customer)
+        if equipment:
+            index_equipment(*equipment)
         db.session.commit()
         flash(f'Customer {customer.company_name} deleted successfully!', 'success')
     except Exception as e:
@@ -947,7 +984,7 @@ def customer_delete(id):
 @app.route('/service-logs')
 def service_log_list():
     """List all service logs"""
-    logs = ServiceLog.query.order_by(desc(ServiceLog.service_date)).all()
+    logs = paginate_keyset(ServiceLog.query, ServiceLog.service_date, ServiceLog.id)
     return render_template('service_log_list.html', logs=logs)
 
 
@@ -955,7 +992,7 @@ def service_log_list():
 def service_log_add():
     """Add new service log"""
     if request.method == 'POST':
-        try:
+        def save_log():
             log = ServiceLog(
                 equipment_id=int(request.form['equipment_id']),
                 technician_id=int(request.form['technician_id']),
@@ -976,13 +1013,10 @@ def service_log_add():
 
             db.session.add(log)
 
-            # Update refrigerant inventory
+            # Update refrigerant inventory (atomic UPDATEs, so concurrent submissions all count)
             equipment = Equipment.query.get(log.equipment_id)
             if log.refrigerant_added > 0:
-                inventory = RefrigerantInventory.query.filter_by(refrigerant_name=equipment.refrigerant_name).first()
-                if inventory:
-                    inventory.quantity_on_hand -= log.refrigerant_added
-
+                if adjust_inventory(equipment.refrigerant_name, on_hand=-log.refrigerant_added):
                     # Create transaction record
                     trans = RefrigerantTransaction(
                         equipment_id=log.equipment_id,
@@ -993,13 +1027,10 @@ def service_log_add():
                         quantity=log.refrigerant_added,
                         notes=f'Added during {log.service_type}'
                     )
-                    db.session.add(trans)
+                    add_refrigerant_transaction(trans, equipment.customer_id)
 
             if log.refrigerant_recovered > 0:
-                inventory = RefrigerantInventory.query.filter_by(refrigerant_name=equipment.refrigerant_name).first()
-                if inventory:
-                    inventory.quantity_recovered += log.refrigerant_recovered
-
+                if adjust_inventory(equipment.refrigerant_name, recovered=log.refrigerant_recovered):
                     # Create transaction record
                     trans = RefrigerantTransaction(
                         equipment_id=log.equipment_id,
@@ -1010,9 +1041,18 @@ def service_log_add():
                         quantity=log.refrigerant_recovered,
                         notes=f'Recovered during {log.service_type}'
                     )
-                    db.session.add(trans)
+                    add_refrigerant_transaction(trans, equipment.customer_id)
 
-            db.session.commit()
+            # EPA leak rate for this addition and the additions within a year after it
+            if log.refrigerant_added > 0:
+                recompute_service_window(log.equipment_id, log.service_date)
+
+            refresh_compliance_state(log.equipment_id)
+            return log
+
+        try:
+            log = retry_on_conflict(save_log)
+            invalidate_dashboard_sections('service_log', 'inventory')
 
             flash('Service log added successfully!', 'success')
             return redirect(url_for('equipment_detail', id=log.equipment_id))
@@ -1033,7 +1073,7 @@ def service_log_add():
 @app.route('/leak-inspections')
 def leak_inspection_list():
     """List all leak inspections"""
-    inspections = LeakInspection.query.order_by(desc(LeakInspection.inspection_date)).all()
+    inspections = paginate_keyset(LeakInspection.query, LeakInspection.inspection_date, LeakInspection.id)
     return render_template('leak_inspection_list.html', inspections=inspections)
 
 
@@ -1054,40 +1094,18 @@ def leak_inspection_add():
                 notes=request.form.get('notes', '')
             )
 
-            # Calculate leak rate and next inspection
-            equipment = Equipment.query.get(inspection.equipment_id)
-            previous_inspection = LeakInspection.query.filter_by(equipment_id=inspection.equipment_id).order_by(desc(LeakInspection.inspection_date)).first()
-
-            if previous_inspection and previous_inspection.current_charge:
-                days_between = (inspection.inspection_date - previous_inspection.inspection_date).days
-                if days_between > 0:
-                    charge_lost = previous_inspection.current_charge - inspection.current_charge
-                    inspection.charge_deficit = charge_lost
-
-                    # Calculate annual leak rate
-                    annual_loss = (charge_lost / previous_inspection.current_charge) * (365.0 / days_between) * 100
-                    inspection.annual_leak_rate = annual_loss
-
-                    # Check compliance
-                    inspection.compliant = annual_loss <= equipment.leak_rate_threshold
-
-                    # Create alert if non-compliant
-                    if not inspection.compliant:
-                        alert = ComplianceAlert(
-                            equipment_id=equipment.id,
-                            alert_date=inspection.inspection_date,
-                            alert_type='Leak Rate Exceeded',
-                            severity='Critical',
-                            title=f'Equipment {equipment.equipment_id}: Leak Rate Exceeds Threshold',
-                            message=f'Annual leak rate of {annual_loss:.2f}% exceeds threshold of {equipment.leak_rate_threshold}%. Immediate repair required per 40 CFR 82.156.'
-                        )
-                        db.session.add(alert)
-
             # Set next inspection date
+            equipment = Equipment.query.get(inspection.equipment_id)
             inspection.next_inspection_date = inspection.inspection_date + timedelta(days=equipment.inspection_frequency)
 
+            # Leak rate against the previous inspection, plus any later ones that now chain from this one
             db.session.add(inspection)
+            db.session.flush()
+            recompute_inspection_window(inspection.equipment_id, inspection.inspection_date, inspection.id)
+
+            refresh_compliance_state(inspection.equipment_id)
             db.session.commit()
+            invalidate_dashboard_sections('leak_inspection', 'alert')
 
             flash('Leak inspection added successfully!', 'success')
             return redirect(url_for('equipment_detail', id=inspection.equipment_id))
@@ -1101,6 +1119,53 @@ def leak_inspection_add():
     return render_template('leak_inspection_form.html', inspection=None, equipment=equipment, technicians=technicians)
 
 
+@app.route('/leak-inspections/<int:id>/edit', methods=['GET', 'POST'])
+def leak_inspection_edit(id):
+    """Edit leak inspection"""
+    inspection = LeakInspection.query.get_or_404(id)
+
+    if request.method == 'POST':
+        try:
+            previous_equipment_id = inspection.equipment_id
+            previous_date = inspection.inspection_date
+
+            inspection.equipment_id = int(request.form['equipment_id'])
+            inspection.technician_id = int(request.form['technician_id'])
+            inspection.inspection_date = datetime.strptime(request.form['inspection_date'], '%Y-%m-%d').date()
+            inspection.inspection_type = request.form['inspection_type']
+            inspection.leak_detected = 'leak_detected' in request.form
+            inspection.leak_location = request.form.get('leak_location', '')
+            inspection.leak_severity = request.form.get('leak_severity', '')
+            inspection.current_charge = float(request.form.get('current_charge', 0.0))
+            inspection.notes = request.form.get('notes', '')
+
+            equipment = Equipment.query.get(inspection.equipment_id)
+            inspection.next_inspection_date = inspection.inspection_date + timedelta(days=equipment.inspection_frequency)
+
+            # Recompute from the earlier of the old and new positions in the unit's history
+            if inspection.equipment_id != previous_equipment_id:
+                recompute_inspection_window(previous_equipment_id, previous_date, inspection.id)
+                refresh_compliance_state(previous_equipment_id)
+                recompute_inspection_window(inspection.equipment_id, inspection.inspection_date, inspection.id)
+            else:
+                recompute_inspection_window(inspection.equipment_id, min(previous_date, inspection.inspection_date), inspection.id)
+
+            refresh_compliance_state(inspection.equipment_id)
+            db.session.commit()
+            invalidate_dashboard_sections('leak_inspection', 'alert')
+
+            flash('Leak inspection updated successfully!', 'success')
+            return redirect(url_for('equipment_detail', id=inspection.equipment_id))
+        except Exception as e:
+            db.session.rollback()
+            flash(f'Error updating leak inspection: {str(e)}', 'error')
+
+    equipment = Equipment.query.filter_by(status='Active').all()
+    technicians = Technician.query.filter_by(status='Active').all()
+
+    return render_template('leak_inspection_form.html', inspection=inspection, equipment=equipment, technicians=technicians)
+
+
 # ============================================================================
 # REFRIGERANT INVENTORY
 # ============================================================================
@@ -1113,33 +1178,38 @@ def inventory_list():
     # Get recent transactions
     transactions = RefrigerantTransaction.query.order_by(desc(RefrigerantTransaction.transaction_date)).limit(20).all()
 
-    return render_template('inventory.html', inventory=inventory, transactions=transactions)
+    forecast = {item['id']: item for item in get_catalog_forecast()}
+
+    return render_template('inventory.html', inventory=inventory, transactions=transactions, forecast=forecast)
 
 
 @app.route('/inventory/<int:id>/adjust', methods=['POST'])
 def inventory_adjust(id):
     """Adjust inventory quantity"""
-    try:
-        inventory = RefrigerantInventory.query.get_or_404(id)
-        adjustment = float(request.form['adjustment'])
-        notes = request.form.get('notes', '')
+    inventory = RefrigerantInventory.query.get_or_404(id)
+    refrigerant_type, refrigerant_name = inventory.refrigerant_type, inventory.refrigerant_name
 
-        inventory.quantity_on_hand += adjustment
+    def save_adjustment():
+        adjustment = float(request.form['adjustment'])
+        adjust_inventory(inventory_id=id, on_hand=adjustment)
 
         # Create transaction record
         trans = RefrigerantTransaction(
             transaction_date=datetime.now().date(),
             transaction_type='Purchase' if adjustment > 0 else 'Disposed',
-            refrigerant_type=inventory.refrigerant_type,
-            refrigerant_name=inventory.refrigerant_name,
+            refrigerant_type=refrigerant_type,
+            refrigerant_name=refrigerant_name,
             quantity=abs(adjustment),
-            notes=notes
+            notes=request.form.get('notes', '')
         )
-        db.session.add(trans)
+        add_refrigerant_transaction(trans)
+        return adjustment
 
-        db.session.commit()
+    try:
+        adjustment = retry_on_conflict(save_adjustment)
+        invalidate_dashboard_sections('inventory')
 
-        flash(f'Inventory adjusted: {adjustment:+.2f} lbs of {inventory.refrigerant_name}', 'success')
+        flash(f'Inventory adjusted: {adjustment:+.2f} lbs of {refrigerant_name}', 'success')
     except Exception as e:
         db.session.rollback()
         flash(f'Error adjusting inventory: {str(e)}', 'error')
@@ -1153,22 +1223,28 @@ def inventory_adjust(id):
 
 @app.route('/alerts')
 def alert_list():
-    """List all compliance alerts"""
-    alerts = ComplianceAlert.query.order_by(desc(ComplianceAlert.alert_date)).all()
-    return render_template('alert_list.html', alerts=alerts)
+    """List all compliance alerts (?archived=1 lists alerts moved to cold storage)"""
+    archived = request.args.get('archived') == '1'
+    model = ComplianceAlertArchive if archived else ComplianceAlert
+    alerts = paginate_keyset(model.query, model.alert_date, model.id)
+    return render_template('alert_list.html', alerts=alerts, archived=archived)
 
 
 @app.route('/alerts/<int:id>/resolve', methods=['POST'])
 def alert_resolve(id):
     """Resolve an alert"""
     try:
-        alert = ComplianceAlert.query.get_or_404(id)
-        alert.status = 'Resolved'
-        alert.resolved_date = datetime.now().date()
-        alert.resolved_by = request.form.get('resolved_by', 'System')
-        alert.resolution_notes = request.form.get('resolution_notes', '')
+        ComplianceAlert.query.get_or_404(id)
+        current_user = get_current_user()
+        resolve_alerts(
+            request.form.get('resolved_by') or (current_user.full_name if current_user else 'System'),
+            notes=request.form.get('resolution_notes', ''),
+            user_id=current_user.id if current_user else None,
+            ids=[id]
+        )
 
         db.session.commit()
+        invalidate_dashboard_sections('alert')
 
         flash('Alert resolved successfully!', 'success')
     except Exception as e:
@@ -1178,6 +1254,56 @@ def alert_resolve(id):
     return redirect(url_for('alert_list'))
 
 
+@app.route('/api/alerts/resolve', methods=['POST'])
+@permission_required('resolve_alerts')
+def api_alerts_resolve():
+    """
+    Resolve active alerts in bulk with one UPDATE
+
+    JSON: ids (list of alert ids) and/or filters equipment_id, alert_type,
+    older_than (YYYY-MM-DD, alerts raised before it); optional notes.
+    """
+    payload = request.get_json(silent=True) or {}
+
+    try:
+        ids = payload.get('ids')
+        if ids is not None:
+            ids = [int(alert_id) for alert_id in ids]
+        equipment_id = int(payload['equipment_id']) if payload.get('equipment_id') is not None else None
+        older_than = datetime.strptime(payload['older_than'], '%Y-%m-%d').date() if payload.get('older_than') else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'ids must be a list of integers, equipment_id an integer, older_than YYYY-MM-DD'}), 400
+
+    current_user = get_current_user()
+    try:
+        resolution = resolve_alerts(
+            current_user.full_name,
+            notes=payload.get('notes', ''),
+            user_id=current_user.id,
+            ids=ids,
+            equipment_id=equipment_id,
+            alert_type=payload.get('alert_type'),
+            older_than=older_than
+        )
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Resolve failed: {str(e)}'}), 500
+
+    if resolution.alert_count:
+        invalidate_dashboard_sections('alert')
+
+    return jsonify({
+        'resolution_id': resolution.id,
+        'resolved': resolution.alert_count,
+        'resolved_by': resolution.resolved_by,
+        'resolved_at': resolution.resolved_at.isoformat()
+    })
+
+
 # ============================================================================
 # REPORTS
 # ============================================================================
@@ -1186,23 +1312,15 @@ def alert_resolve(id):
 def reports():
     """Compliance reports page"""
     # Equipment summary
-    equipment_stats = {
-        'total': Equipment.query.count(),
-        'active': Equipment.query.filter_by(status='Active').count(),
-        'retired': Equipment.query.filter_by(status='Retired').count()
-    }
+    equipment_stats = get_equipment_stats()
 
-    # Refrigerant usage summary
-    refrigerant_usage = db.session.query(
-        RefrigerantTransaction.refrigerant_name,
-        func.sum(RefrigerantTransaction.quantity).label('total')
-    ).filter(
-        RefrigerantTransaction.transaction_type == 'Added'
-    ).group_by(RefrigerantTransaction.refrigerant_name).all()
+    # Refrigerant usage summary (from the daily rollup)
+    refrigerant_usage = get_usage_by_refrigerant('Added')
 
     # Compliance summary
-    total_inspections = LeakInspection.query.count()
-    non_compliant = LeakInspection.query.filter_by(compliant=False).count()
+    inspection_stats = get_inspection_stats()
+    total_inspections = inspection_stats['total']
+    non_compliant = inspection_stats['non_compliant']
 
     return render_template('reports.html',
                            equipment_stats=equipment_stats,
@@ -1217,40 +1335,284 @@ def reports():
 
 @app.route('/api/equipment', methods=['GET'])
 def api_equipment():
-    """Get equipment list as JSON"""
-    equipment = Equipment.query.all()
-    return jsonify([{
-        'id': e.id,
-        'equipment_id': e.equipment_id,
-        'name': e.name,
-        'type': e.equipment_type,
-        'refrigerant': e.refrigerant_name,
-        'status': e.status
-    } for e in equipment])
+    """
+    Get equipment list as JSON, one page at a time (cursors in the Link / X-Next-Cursor headers)
+
+    Query parameters:
+        fields: Comma-separated projection (default id, equipment_id, name, type, refrigerant, status)
+        status, customer_id, refrigerant_name: Optional filters
+        format: 'ndjson' or 'csv' streams every matching row instead of one page
+    """
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # A malformed customer_id must not silently widen an export to the whole fleet
+    customer_id = request.args.get('customer_id') or None
+    if customer_id is not None:
+        try:
+            customer_id = int(customer_id)
+        except ValueError:
+            return jsonify({'error': 'customer_id must be an integer'}), 400
+
+    filters = {
+        'status': request.args.get('status') or None,
+        'customer_id': customer_id,
+        'refrigerant_name': request.args.get('refrigerant_name') or None
+    }
+
+    output_format = request.args.get('format', 'json')
+    if output_format not in ('json', 'ndjson', 'csv'):
+        return jsonify({'error': 'format must be one of: json, ndjson, csv'}), 400
+
+    query = apply_equipment_filters(Equipment.query, **filters)
+
+    # Answer unchanged polls from one aggregate query
+    last_modified, row_count = collection_version(query, Equipment)
+    etag = make_etag(last_modified, row_count)
+    not_modified = not_modified_response(etag, last_modified)
+    if not_modified:
+        return not_modified
+
+    if output_format == 'ndjson':
+        response = Response(stream_with_context(stream_ndjson(fields, filters)), mimetype='application/x-ndjson')
+    elif output_format == 'csv':
+        response = Response(stream_with_context(stream_csv(fields, filters)), mimetype='text/csv',
+                            headers={'Content-Disposition': 'attachment; filename=equipment.csv'})
+    else:
+        equipment = paginate_keyset(query, Equipment.id, Equipment.id, descending=False)
+        response = equipment.apply_headers(jsonify([project_equipment(e, fields) for e in equipment]))
+    return set_validators(response, etag, last_modified)
+
+
+@app.route('/api/equipment/import', methods=['POST'])
+@permission_required('manage_equipment')
+def api_equipment_import():
+    """Bulk import equipment from an uploaded CSV/XLSX file (mode=all_or_nothing|partial)"""
+    file = request.files.get('file')
+    if not file or file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
+
+    try:
+        report = import_equipment(file.stream, detect_format(file.filename), request.form.get('mode', ALL_OR_NOTHING))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Import failed: {str(e)}'}), 500
+
+    if report['imported']:
+        invalidate_dashboard_sections('equipment')
+        equipment_code_index.load()
+
+    return jsonify(report), 200 if report['committed'] else 422
+
+
+@app.route('/api/service-logs/import', methods=['POST'])
+@permission_required('manage_equipment')
+def api_service_logs_import():
+    """Bulk ingest service logs from an uploaded CSV/XLSX file or a JSON body {"logs": [...], "mode": ...}"""
+    try:
+        if request.is_json:
+            payload = request.get_json(silent=True) or {}
+            records = payload.get('logs')
+            if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+                return jsonify({'error': 'logs must be a list of objects'}), 400
+            report = ingest_service_logs(enumerate(records, start=1), payload.get('mode', ALL_OR_NOTHING))
+        else:
+            file = request.files.get('file')
+            if not file or file.filename == '':
+                return jsonify({'error': 'No file selected'}), 400
+            rows = iter_import_rows(file.stream, detect_format(file.filename))
+            report = ingest_service_logs(rows, request.form.get('mode', ALL_OR_NOTHING))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Import failed: {str(e)}'}), 500
+
+    if report['imported']:
+        invalidate_dashboard_sections('service_log', 'inventory')
+
+    return jsonify(report), 200 if report['committed'] else 422
+
+
+@app.route('/api/leak-rates/recompute', methods=['POST'])
+@permission_required('manage_equipment')
+def api_leak_rates_recompute():
+    """Recompute leak rates from inspection history (JSON: dry_run, threshold or thresholds for a what-if)"""
+    payload = request.get_json(silent=True) or {}
+    thresholds = payload.get('thresholds', payload.get('threshold'))
+
+    try:
+        if isinstance(thresholds, dict):
+            thresholds = {int(equipment_id): float(value) for equipment_id, value in thresholds.items()}
+        elif thresholds is not None:
+            thresholds = float(thresholds)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'threshold must be a number, thresholds an object of equipment id -> number'}), 400
+
+    try:
+        if thresholds is not None:
+            report = what_if_thresholds(thresholds)
+        else:
+            report = recompute_leak_rates(dry_run=bool(payload.get('dry_run')))
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Recompute failed: {str(e)}'}), 500
+
+    if report['changed_inspections'] and not report['dry_run']:
+        invalidate_dashboard_sections('leak_inspection')
+
+    return jsonify(report)
+
+
+@app.route('/api/refrigerant-usage/monthly', methods=['GET'])
+def api_refrigerant_usage_monthly():
+    """Get monthly refrigerant added/recovered totals, optionally broken down by refrigerant or customer"""
+    months = request.args.get('months', 6, type=int)
+    group_by = request.args.get('group_by') or None
+
+    if months < 1 or months > 36:
+        return jsonify({'error': 'months must be between 1 and 36'}), 400
+    if group_by and group_by not in USAGE_GROUPINGS:
+        return jsonify({'error': f'group_by must be one of: {", ".join(USAGE_GROUPINGS)}'}), 400
+
+    return jsonify(get_monthly_refrigerant_usage(months=months, group_by=group_by))
+
+
+@app.route('/api/inventory/balance', methods=['GET'])
+@login_required
+def api_inventory_balance():
+    """Ledger balance of one refrigerant (?refrigerant=R-22) or all of them at the end of a date (?date=YYYY-MM-DD)"""
+    try:
+        as_of = datetime.strptime(request.args['date'], '%Y-%m-%d').date() if request.args.get('date') else None
+    except ValueError:
+        return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+
+    refrigerant_name = request.args.get('refrigerant')
+    if not refrigerant_name:
+        return jsonify({'balances': balances_at(as_of)})
+
+    if not RefrigerantInventory.query.filter_by(refrigerant_name=refrigerant_name).first():
+        return jsonify({'error': f'Unknown refrigerant: {refrigerant_name}'}), 404
+    return jsonify(balance_at(refrigerant_name, as_of))
+
+
+@app.route('/api/inventory/forecast', methods=['GET'])
+@login_required
+def api_inventory_forecast():
+    """Usage forecast, days until stockout and suggested reorder quantity for every refrigerant"""
+    return jsonify({
+        'lead_time_days': app.config.get('REORDER_LEAD_TIME_DAYS', 14),
+        'cover_days': app.config.get('REORDER_COVER_DAYS', 60),
+        'refrigerants': get_catalog_forecast()
+    })
+
+
+@app.route('/api/equipment/lookup', methods=['GET'])
+@login_required
+def api_equipment_lookup():
+    """Resolve a scanned equipment ID or serial number to a compact compliance summary"""
+    code = request.args.get('code', '')
+    if not code.strip():
+        return jsonify({'error': 'code is required'}), 400
+
+    result = lookup_equipment(code)
+    if result is None:
+        return jsonify({'error': f'No equipment found for code {code.strip()}'}), 404
+
+    equipment, state = result
+    summary = compliance_summary(equipment, state)
+    summary['url'] = url_for('equipment_detail', id=equipment.id)
+    return jsonify(summary)
+
+
+@app.route('/api/equipment/manifest', methods=['GET'])
+@login_required
+def api_equipment_manifest():
+    """Versioned, gzip-compressed equipment manifest for offline scanning (?since=<version> for a delta)"""
+    since = request.args.get('since', type=int)
+    current = get_manifest_version()
+
+    etag = f'manifest-{current[0]}-{current[1]}-{since or 0}'
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        body = json.dumps(build_manifest(since, current), separators=(',', ':')).encode()
+        response = app.response_class(body, mimetype='application/json')
+        if 'gzip' in request.accept_encodings:
+            response.set_data(gzip.compress(body))
+            response.headers['Content-Encoding'] = 'gzip'
+
+    response.set_etag(etag, weak=True)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
 
 
 @app.route('/api/compliance-status/<int:equipment_id>', methods=['GET'])
 def api_compliance_status(equipment_id):
     """Get compliance status for equipment"""
+    # The status derives from the equipment row, its latest inspection (tracked by the rollup)
+    # and the EPA leak rates on its service logs
+    service_logs_updated = db.session.query(func.max(ServiceLog.updated_at)).filter(
+        ServiceLog.equipment_id == equipment_id
+    ).scalar_subquery()
+    versions = db.session.query(
+        Equipment.updated_at, EquipmentComplianceState.updated_at, service_logs_updated
+    ).outerjoin(
+        EquipmentComplianceState, EquipmentComplianceState.equipment_id == Equipment.id
+    ).filter(Equipment.id == equipment_id).first()
+    if versions is None:
+        abort(404)
+
+    last_modified = max((ts for ts in versions if ts is not None), default=None)
+    etag = make_etag(last_modified)
+    not_modified = not_modified_response(etag, last_modified)
+    if not_modified:
+        return not_modified
+
     equipment = Equipment.query.get_or_404(equipment_id)
 
-    latest_inspection = LeakInspection.query.filter_by(equipment_id=equipment_id).order_by(desc(LeakInspection.inspection_date)).first()
+    latest_inspection = LeakInspection.query.filter_by(equipment_id=equipment_id).order_by(
+        desc(LeakInspection.inspection_date), desc(LeakInspection.id)
+    ).first()
+
+    latest_addition = ServiceLog.query.filter(
+        ServiceLog.equipment_id == equipment_id,
+        ServiceLog.refrigerant_added > 0
+    ).order_by(desc(ServiceLog.service_date), desc(ServiceLog.id)).first()
+
+    epa_leak_rate = None
+    if latest_addition:
+        epa_leak_rate = {
+            'service_date': latest_addition.service_date.isoformat(),
+            'refrigerant_added': latest_addition.refrigerant_added,
+            'annualizing': latest_addition.annualized_leak_rate,
+            'rolling_average': latest_addition.rolling_average_leak_rate
+        }
 
     if latest_inspection:
-        return jsonify({
+        response = jsonify({
             'equipment_id': equipment.equipment_id,
             'compliant': latest_inspection.compliant,
             'leak_rate': latest_inspection.annual_leak_rate,
+            'epa_leak_rate': epa_leak_rate,
             'threshold': equipment.leak_rate_threshold,
             'last_inspection': latest_inspection.inspection_date.isoformat(),
             'next_inspection': latest_inspection.next_inspection_date.isoformat() if latest_inspection.next_inspection_date else None
         })
     else:
-        return jsonify({
+        response = jsonify({
             'equipment_id': equipment.equipment_id,
             'compliant': True,
+            'epa_leak_rate': epa_leak_rate,
+            'threshold': equipment.leak_rate_threshold,
             'message': 'No inspections recorded'
         })
+    return set_validators(response, etag, last_modified)
 
 
 # ============================================================================
@@ -1330,9 +1692,9 @@ def ai_chatbot():
 
             # Get context from system
             context = {
-                'total_equipment': Equipment.query.filter_by(status='Active').count(),
-                'active_alerts': ComplianceAlert.query.filter_by(status='Active').count(),
-                'recent_violations': LeakInspection.query.filter_by(compliant=False).count()
+                'total_equipment': get_equipment_stats()['active'],
+                'active_alerts': get_alert_stats()['active'],
+                'recent_violations': get_inspection_stats()['non_compliant']
             }
 
             # Ask the chatbot
@@ -1412,7 +1774,7 @@ def api_ai_ask():
 @app.route('/documents')
 def document_list():
     """List all documents"""
-    documents = Document.query.filter_by(status='Active').order_by(desc(Document.uploaded_at)).all()
+    documents = paginate_keyset(Document.query.filter_by(status='Active'), Document.uploaded_at, Document.id)
     return render_template('document_list.html', documents=documents, format_file_size=format_file_size, get_document_icon=get_document_icon)
 
 
@@ -1563,11 +1925,11 @@ def technician_detail(id):
     # Get certifications
     certifications = TechnicianCertification.query.filter_by(technician_id=id).all()
 
-    # Get service history
-    services = ServiceLog.query.filter_by(technician_id=id).order_by(desc(ServiceLog.service_date)).limit(10).all()
+    # Get service history (including archived records)
+    services = with_archived(ServiceLog, 'service_date', limit=10, technician_id=id)
 
     # Get inspections
-    inspections = LeakInspection.query.filter_by(technician_id=id).order_by(desc(LeakInspection.inspection_date)).limit(10).all()
+    inspections = with_archived(LeakInspection, 'inspection_date', limit=10, technician_id=id)
 
     return render_template('technician_detail.html',
                          technician=tech,
@@ -1634,27 +1996,41 @@ def technician_certification_add(id):
 @app.route('/api/documents/equipment/<int:equipment_id>')
 def api_documents_equipment(equipment_id):
     """Get documents for equipment"""
+    last_modified, row_count = collection_version(documents_by_entity_query(equipment_id=equipment_id), Document)
+    etag = make_etag(last_modified, row_count)
+    not_modified = not_modified_response(etag, last_modified)
+    if not_modified:
+        return not_modified
+
     documents = get_documents_by_entity(equipment_id=equipment_id)
-    return jsonify([{
+    response = jsonify([{
         'id': d.id,
         'filename': d.original_filename,
         'type': d.document_type,
         'size': d.file_size,
         'uploaded_at': d.uploaded_at.isoformat()
     } for d in documents])
+    return set_validators(response, etag, last_modified)
 
 
 @app.route('/api/documents/technician/<int:technician_id>')
 def api_documents_technician(technician_id):
     """Get documents for technician"""
+    last_modified, row_count = collection_version(documents_by_entity_query(technician_id=technician_id), Document)
+    etag = make_etag(last_modified, row_count)
+    not_modified = not_modified_response(etag, last_modified)
+    if not_modified:
+        return not_modified
+
     documents = get_documents_by_entity(technician_id=technician_id)
-    return jsonify([{
+    response = jsonify([{
         'id': d.id,
         'filename': d.original_filename,
         'type': d.document_type,
         'size': d.file_size,
         'uploaded_at': d.uploaded_at.isoformat()
     } for d in documents])
+    return set_validators(response, etag, last_modified)
 
 
 # ============================================================================
@@ -1671,15 +2047,11 @@ def settings():
     expiring_certs = 0
 
     if get_current_user() and get_current_user().role in ['compliance_manager', 'admin']:
-        total_technicians = Technician.query.count()
-        active_technicians = Technician.query.filter_by(status='Active').count()
-
-        # Count certifications expiring in next 30 days
-        thirty_days_from_now = datetime.now().date() + timedelta(days=30)
-        expiring_certs = Technician.query.filter(
-            Technician.expiration_date <= thirty_days_from_now,
-            Technician.status == 'Active'
-        ).count()
+        # Totals and certifications expiring within the warning window, in one query
+        technician_stats = get_technician_stats()
+        total_technicians = technician_stats['total']
+        active_technicians = technician_stats['active']
+        expiring_certs = technician_stats['expiring_certs']
 
     return render_template('settings.html',
                          total_technicians=total_technicians,
@@ -1697,4 +2069,7 @@ def settings_update():
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
+    # With the debug reloader only the serving child process sweeps
+    if app.config.get('COMPLIANCE_SWEEP_INTERVAL') and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_sweep_scheduler(app, app.config['COMPLIANCE_SWEEP_INTERVAL'])
     app.run(host='0.0.0.0', port=port, debug=True)
@@ -0,0 +1,220 @@
+"""
+Bulk Import Helpers for EcoFreonTrack
+Shared file readers, cell parsers and the validate -> batch -> commit driver used by
+the equipment and service log importers
+"""
+import csv
+import io
+import math
+from datetime import datetime, date
+from models import db
+
+# XLSX support is optional
+try:
+    from openpyxl import load_workbook
+    XLSX_AVAILABLE = True
+except ImportError:
+    XLSX_AVAILABLE = False
+
+# Commit modes
+ALL_OR_NOTHING = 'all_or_nothing'
+PARTIAL = 'partial'
+IMPORT_MODES = (ALL_OR_NOTHING, PARTIAL)
+
+# Rows per executemany batch
+IMPORT_BATCH_SIZE = 1000
+
+# Error details kept in the report (the error count is always exact)
+MAX_REPORTED_ERRORS = 1000
+
+
+# ============================================================================
+# FILE READERS
+# ============================================================================
+
+def _iter_csv(stream):
+    """Yield (row number, {column: value}) from a binary CSV stream"""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    for row_number, row in enumerate(reader, start=2):
+        yield row_number, row
+
+
+def _iter_xlsx(stream):
+    """Yield (row number, {column: value}) from the first sheet of a binary XLSX stream"""
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else '' for cell in next(rows, ())]
+        for row_number, values in enumerate(rows, start=2):
+            if all(value is None for value in values):
+                continue
+            yield row_number, dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def iter_import_rows(stream, file_format):
+    """
+    Yield rows from an uploaded file without loading it into memory
+
+    Args:
+        stream: Binary file-like object
+        file_format: 'csv' or 'xlsx'
+
+    Raises:
+        ValueError: If the format is unsupported or XLSX support is not installed
+    """
+    if file_format == 'csv':
+        return _iter_csv(stream)
+    if file_format == 'xlsx':
+        if not XLSX_AVAILABLE:
+            raise ValueError('XLSX import requires openpyxl (pip install openpyxl)')
+        return _iter_xlsx(stream)
+    raise ValueError(f'Unsupported import format: {file_format}')
+
+
+def detect_format(filename):
+    """Import format from a file name extension"""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return 'xlsx' if extension == 'xlsx' else 'csv'
+
+
+# ============================================================================
+# CELL PARSERS
+# ============================================================================
+
+def cell_text(value):
+    """Cell value as stripped text ('' for empty cells)"""
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def parse_number(value, cast, column, errors):
+    """Parse a numeric cell with cast (int/float), recording an error on failure"""
+    try:
+        # Spreadsheet cells arrive as numbers already (12.0 for an id)
+        if isinstance(value, (int, float)):
+            number = cast(value)
+        else:
+            number = cast(cell_text(value))
+    except ValueError:
+        errors.append(f'{column} must be a number')
+        return None
+    except OverflowError:
+        errors.append(f'{column} must be a finite number')  # int() of an infinite JSON number
+        return None
+
+    # float() accepts 'nan' and 'inf', which slip past every range check
+    if not math.isfinite(number):
+        errors.append(f'{column} must be a finite number')
+        return None
+    return number
+
+
+def parse_date(value, column, errors):
+    """Parse a YYYY-MM-DD (or spreadsheet date) cell, recording an error on failure"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(cell_text(value))
+    except ValueError:
+        errors.append(f'{column} must be a date (YYYY-MM-DD)')
+        return None
+
+
+def parse_bool(value):
+    """Yes/no cell (true/yes/y/1/x, or a JSON boolean)"""
+    if isinstance(value, bool):
+        return value
+    return cell_text(value).lower() in ('true', 'yes', 'y', '1', 'x')
+
+
+# ============================================================================
+# IMPORT DRIVER
+# ============================================================================
+
+def run_import(rows, required_columns, validate, write_batch, mode=ALL_OR_NOTHING,
+               batch_size=IMPORT_BATCH_SIZE, key_column=None, finalize=None):
+    """
+    Validate rows, write valid ones in batches, and commit per the import mode
+
+    In all-or-nothing mode any invalid row rolls back the whole import; in
+    partial mode valid rows are committed and invalid ones are reported.
+
+    Args:
+        rows: Iterable of (row number, {column: value})
+        required_columns: Columns that must be present in the first row
+        validate: callable(row_number, row) -> (params or None, [error messages])
+        write_batch: callable(list of params) that writes one batch in the session
+        mode: ALL_OR_NOTHING or PARTIAL
+        batch_size: Rows per write_batch call
+        key_column: Column echoed in each error entry to identify the row
+        finalize: Optional callable() run after the last batch, before commit
+
+    Returns:
+        Dict report with total_rows, imported, error_count, errors
+        ([{'row', key_column, 'errors'}]) and committed
+
+    Raises:
+        ValueError: For an unsupported mode or input missing required columns
+    """
+    if mode not in IMPORT_MODES:
+        raise ValueError(f'mode must be one of: {", ".join(IMPORT_MODES)}')
+
+    report = {'total_rows': 0, 'imported': 0, 'error_count': 0, 'errors': [], 'committed': False}
+    batch = []
+    checked_header = False
+
+    def writing():
+        # Keep validating after the first error, but stop writing
+        return mode == PARTIAL or not report['error_count']
+
+    try:
+        for row_number, row in rows:
+            if not checked_header:
+                missing = [column for column in required_columns if column not in row]
+                if missing:
+                    raise ValueError(f'Missing required column(s): {", ".join(missing)}')
+                checked_header = True
+
+            report['total_rows'] += 1
+            params, errors = validate(row_number, row)
+            if errors:
+                report['error_count'] += 1
+                if len(report['errors']) < MAX_REPORTED_ERRORS:
+                    entry = {'row': row_number, 'errors': errors}
+                    if key_column:
+                        entry[key_column] = cell_text(row.get(key_column)) or None
+                    report['errors'].append(entry)
+                continue
+
+            if not writing():
+                continue
+
+            batch.append(params)
+            if len(batch) >= batch_size:
+                write_batch(batch)
+                report['imported'] += len(batch)
+                batch = []
+
+        if not writing():
+            db.session.rollback()
+            report['imported'] = 0
+            return report
+
+        if batch:
+            write_batch(batch)
+            report['imported'] += len(batch)
+        if finalize:
+            finalize()
+
+        db.session.commit()
+        report['committed'] = True
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return report
@@ -0,0 +1,258 @@
+"""
+Compliance Alert Upserts and Resolution for EcoFreonTrack
+An equipment or technician has at most one active alert of each type, enforced by the
+partial unique index uq_compliance_alert_active. Raising an alert that is already active
+bumps its occurrence count and last-seen date instead of inserting a duplicate.
+
+Resolving - one alert or thousands - is a single UPDATE recorded as one AlertResolution.
+"""
+import json
+from datetime import datetime
+from sqlalchemy import select, update, func, case, literal, literal_column, text, true, Integer, Date, DateTime
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import aliased
+from models import db, ComplianceAlert, AlertResolution
+
+# Dedup key of active alerts - must match the uq_compliance_alert_active index
+# expressions exactly (an inline 0, not a bound parameter) to serve as an ON CONFLICT target
+ALERT_KEY = (
+    func.coalesce(ComplianceAlert.equipment_id, literal_column('0')),
+    func.coalesce(ComplianceAlert.technician_id, literal_column('0')),
+    ComplianceAlert.alert_type,
+)
+ACTIVE_ALERT = ComplianceAlert.status == 'Active'
+# Most alert ids accepted by one resolve_alerts call (bound parameters per statement)
+MAX_RESOLVE_IDS = 30000
+
+# The index predicate as written in its DDL, so Postgres can infer the partial index
+ACTIVE_ALERT_PREDICATE = text("status = 'Active'")
+
+
+def _insert():
+    """INSERT construct of the bound dialect, for ON CONFLICT support"""
+    dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    return dialect.insert(ComplianceAlert.__table__)
+
+
+def _on_conflict(statement, occurrences):
+    """
+    Turn an alert INSERT into an upsert against the active alert with the same key
+
+    The active alert keeps its id and first alert date; it gains occurrences,
+    and takes the new title, message, severity and last-seen date when the
+    occurrence is at least as recent as the last one seen.
+    """
+    table, excluded = ComplianceAlert.__table__, statement.excluded
+    newer = func.coalesce(table.c.last_seen_date, table.c.alert_date) <= excluded.last_seen_date
+
+    return statement.on_conflict_do_update(
+        index_elements=list(ALERT_KEY),
+        index_where=ACTIVE_ALERT_PREDICATE,
+        set_={
+            'occurrence_count': func.coalesce(table.c.occurrence_count, 1) + occurrences,
+            'last_seen_date': case((newer, excluded.last_seen_date), else_=table.c.last_seen_date),
+            'severity': case((newer, excluded.severity), else_=table.c.severity),
+            'title': case((newer, excluded.title), else_=table.c.title),
+            'message': case((newer, excluded.message), else_=table.c.message),
+            'updated_at': excluded.updated_at,
+        }
+    )
+
+
+def raise_alert(alert_type, severity, title, message, equipment_id=None, technician_id=None,
+                alert_date=None, occurrences=1):
+    """
+    Create an active alert, or record another occurrence on the existing one
+
+    Runs inside the caller's session; the caller commits.
+
+    Args:
+        alert_type: Alert type (part of the dedup key)
+        severity: Info, Warning or Critical
+        title: Alert title
+        message: Alert message
+        equipment_id: Equipment database ID (part of the dedup key)
+        technician_id: Technician database ID (part of the dedup key)
+        alert_date: Date the condition was seen (default today)
+        occurrences: Occurrences to add to an existing alert (0 only refreshes it)
+    """
+    now = datetime.utcnow()
+    alert_date = alert_date or now.date()
+
+    db.session.execute(_on_conflict(_insert().values(
+        equipment_id=equipment_id,
+        technician_id=technician_id,
+        alert_date=alert_date,
+        last_seen_date=alert_date,
+        occurrence_count=max(occurrences, 1),
+        alert_type=alert_type,
+        severity=severity,
+        title=title,
+        message=message,
+        status='Active',
+        created_at=now,
+        updated_at=now
+    ), occurrences))
+
+
+def raise_alerts_from_select(source, alert_type, severity, alert_date, occurrences=0):
+    """
+    Upsert one alert per row of a query in a single INSERT ... SELECT
+
+    Runs inside the caller's session; the caller commits.
+
+    Args:
+        source: Subquery with equipment_id, technician_id, title and message columns
+        alert_type: Alert type of every row
+        severity: Severity of every row
+        alert_date: Date the conditions were seen
+        occurrences: Occurrences to add to alerts that are already active
+
+    Returns:
+        Number of alerts created (rows that matched an active alert are refreshed)
+    """
+    now = datetime.utcnow()
+    already_active = db.session.execute(select(func.count()).select_from(ComplianceAlert).where(
+        ACTIVE_ALERT,
+        ComplianceAlert.alert_type == alert_type,
+        select(source.c.title).where(
+            func.coalesce(source.c.equipment_id, 0) == func.coalesce(ComplianceAlert.equipment_id, 0),
+            func.coalesce(source.c.technician_id, 0) == func.coalesce(ComplianceAlert.technician_id, 0)
+        ).exists()
+    )).scalar()
+
+    upserted = db.session.execute(_on_conflict(_insert().from_select(
+        ['equipment_id', 'technician_id', 'alert_date', 'last_seen_date', 'occurrence_count',
+         'alert_type', 'severity', 'title', 'message', 'status', 'created_at', 'updated_at'],
+        select(
+            source.c.equipment_id,
+            source.c.technician_id,
+            literal(alert_date, Date),
+            literal(alert_date, Date),
+            literal(max(occurrences, 1), Integer),
+            literal(alert_type),
+            literal(severity),
+            source.c.title,
+            source.c.message,
+            literal('Active'),
+            literal(now, DateTime),
+            literal(now, DateTime)
+        # SQLite needs a WHERE before ON CONFLICT to parse INSERT ... SELECT upserts
+        ).where(true())
+    ), occurrences)).rowcount
+
+    return upserted - already_active
+
+
+def merge_duplicate_alerts():
+    """
+    Collapse active alerts sharing a dedup key into the most recent one
+
+    Needed once before uq_compliance_alert_active can be created on a database
+    that already holds duplicates. The kept alert sums the group's occurrences;
+    the others are resolved as merged. The caller commits.
+
+    Returns:
+        Number of duplicate alerts resolved
+    """
+    # Alerts created before the counters existed saw one occurrence on their alert date
+    db.session.execute(update(ComplianceAlert).where(ComplianceAlert.occurrence_count.is_(None)).values(
+        occurrence_count=1
+    ).execution_options(synchronize_session=False))
+    db.session.execute(update(ComplianceAlert).where(ComplianceAlert.last_seen_date.is_(None)).values(
+        last_seen_date=ComplianceAlert.alert_date
+    ).execution_options(synchronize_session=False))
+
+    if not db.session.execute(
+        select(*ALERT_KEY).where(ACTIVE_ALERT).group_by(*ALERT_KEY).having(func.count() > 1).limit(1)
+    ).first():
+        return 0
+
+    duplicate = aliased(ComplianceAlert)
+    same_key = (
+        (duplicate.status == 'Active')
+        & (func.coalesce(duplicate.equipment_id, 0) == ALERT_KEY[0])
+        & (func.coalesce(duplicate.technician_id, 0) == ALERT_KEY[1])
+        & (duplicate.alert_type == ALERT_KEY[2])
+    )
+    newest = select(func.max(duplicate.id)).where(same_key).scalar_subquery()
+
+    db.session.execute(update(ComplianceAlert).where(ACTIVE_ALERT, ComplianceAlert.id == newest).values(
+        occurrence_count=select(func.sum(duplicate.occurrence_count)).where(same_key).scalar_subquery(),
+        last_seen_date=select(func.max(duplicate.last_seen_date)).where(same_key).scalar_subquery()
+    ).execution_options(synchronize_session=False))
+
+    return db.session.execute(update(ComplianceAlert).where(ACTIVE_ALERT, ComplianceAlert.id != newest).values(
+        status='Resolved',
+        resolved_date=datetime.now().date(),
+        resolved_by='System',
+        resolution_notes='Merged into the active alert for the same equipment, technician and type',
+        updated_at=datetime.utcnow()
+    ).execution_options(synchronize_session=False)).rowcount
+
+
+def resolve_alerts(resolved_by, notes='', user_id=None, ids=None, equipment_id=None, alert_type=None,
+                   older_than=None, resolved_date=None):
+    """
+    Resolve active alerts by id list and/or filter with one UPDATE, audited as one AlertResolution
+
+    The alerts are never loaded: the UPDATE stamps each with the resolution's
+    id, so the audit record links to exactly the alerts it closed. Runs inside
+    the caller's session; the caller commits.
+
+    Args:
+        resolved_by: Name recorded on the alerts and the audit record
+        notes: Resolution notes
+        user_id: User who resolved them
+        ids: Alert database IDs
+        equipment_id: Only alerts of this equipment
+        alert_type: Only alerts of this type
+        older_than: Only alerts raised before this date
+        resolved_date: Resolution date (default today)
+
+    Returns:
+        The AlertResolution, with alert_count set to the number of alerts resolved
+
+    Raises:
+        ValueError: No ids or filters given, or too many ids
+    """
+    criteria = {}
+    conditions = [ACTIVE_ALERT]
+    if ids is not None:
+        if len(ids) > MAX_RESOLVE_IDS:
+            raise ValueError(f'At most {MAX_RESOLVE_IDS} alert ids per request')
+        conditions.append(ComplianceAlert.id.in_(ids))
+        criteria['id_count'] = len(ids)
+    if equipment_id is not None:
+        conditions.append(ComplianceAlert.equipment_id == equipment_id)
+        criteria['equipment_id'] = equipment_id
+    if alert_type:
+        conditions.append(ComplianceAlert.alert_type == alert_type)
+        criteria['alert_type'] = alert_type
+    if older_than is not None:
+        conditions.append(ComplianceAlert.alert_date < older_than)
+        criteria['older_than'] = older_than.isoformat()
+    if not criteria:
+        raise ValueError('Give alert ids or at least one filter (equipment_id, alert_type, older_than)')
+
+    now = datetime.utcnow()
+    resolution = AlertResolution(
+        user_id=user_id,
+        resolved_by=resolved_by,
+        resolved_at=now,
+        resolution_notes=notes,
+        criteria=json.dumps(criteria)
+    )
+    db.session.add(resolution)
+    db.session.flush()
+
+    resolution.alert_count = db.session.execute(update(ComplianceAlert).where(*conditions).values(
+        status='Resolved',
+        resolved_date=resolved_date or now.date(),
+        resolved_by=resolved_by,
+        resolution_notes=notes,
+        resolution_id=resolution.id,
+        updated_at=now
+    ).execution_options(synchronize_session=False)).rowcount
+
+    return resolution
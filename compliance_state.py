@@ -0,0 +1,162 @@
+"""
+Equipment Compliance State Rollup for EcoFreonTrack
+Keeps one summary row per equipment (latest inspection, next due date, leak rate, last service)
+so the dashboard can read compliance status in a single indexed query
+
+Run directly to rebuild the rollup from inspection and service history:
+    python compliance_state.py
+"""
+from datetime import datetime
+from sqlalchemy import desc, func, insert, update, bindparam, or_
+from models import db, Equipment, LeakInspection, ServiceLog, EquipmentComplianceState
+
+
+def refresh_compliance_state(equipment_id):
+    """
+    Recompute the compliance rollup for a single equipment from its history
+
+    Runs inside the caller's session, so the rollup is committed (or rolled
+    back) together with the inspection or service log that triggered it.
+
+    Args:
+        equipment_id: Equipment database ID
+
+    Returns:
+        The updated EquipmentComplianceState (not yet committed)
+    """
+    # Make pending inspections/service logs visible to the queries below
+    db.session.flush()
+
+    state = EquipmentComplianceState.query.get(equipment_id)
+    if state is None:
+        state = EquipmentComplianceState(equipment_id=equipment_id)
+        db.session.add(state)
+
+    latest_inspection = LeakInspection.query.filter_by(equipment_id=equipment_id).order_by(
+        desc(LeakInspection.inspection_date), desc(LeakInspection.id)
+    ).first()
+
+    if latest_inspection:
+        state.last_inspection_date = latest_inspection.inspection_date
+        state.next_inspection_date = latest_inspection.next_inspection_date
+        state.latest_annual_leak_rate = latest_inspection.annual_leak_rate
+        state.compliant = latest_inspection.compliant if latest_inspection.compliant is not None else True
+    else:
+        state.last_inspection_date = None
+        state.next_inspection_date = None
+        state.latest_annual_leak_rate = None
+        state.compliant = True
+
+    state.last_service_date = db.session.query(func.max(ServiceLog.service_date)).filter(
+        ServiceLog.equipment_id == equipment_id
+    ).scalar()
+
+    return state
+
+
+def apply_service_dates(latest_service_dates):
+    """
+    Advance last_service_date for many equipment after a bulk service log load
+
+    Set-based counterpart of refresh_compliance_state for service logs: one
+    executemany UPDATE that only moves dates forward, plus one INSERT for
+    equipment without a rollup row yet. Runs inside the caller's session.
+
+    Args:
+        latest_service_dates: Dict of equipment_id -> latest service date in the load
+    """
+    if not latest_service_dates:
+        return
+
+    table = EquipmentComplianceState.__table__
+    now = datetime.utcnow()
+    db.session.execute(
+        update(table).where(
+            table.c.equipment_id == bindparam('key'),
+            or_(table.c.last_service_date.is_(None), table.c.last_service_date < bindparam('service_date'))
+        ).values(last_service_date=bindparam('service_date'), updated_at=now),
+        [{'key': equipment_id, 'service_date': service_date}
+         for equipment_id, service_date in latest_service_dates.items()]
+    )
+
+    # One row per equipment, so reading every key is cheaper than a huge IN list
+    existing = {equipment_id for (equipment_id,) in db.session.query(EquipmentComplianceState.equipment_id)}
+    missing = [
+        {'equipment_id': equipment_id, 'compliant': True, 'last_service_date': service_date, 'updated_at': now}
+        for equipment_id, service_date in latest_service_dates.items()
+        if equipment_id not in existing
+    ]
+    if missing:
+        db.session.execute(insert(table), missing)
+
+
+def rebuild_compliance_states():
+    """
+    Backfill the rollup for all equipment from inspection and service history
+
+    Uses one windowed query for latest inspections and one grouped query for
+    last service dates, then replaces the rollup table in a single transaction.
+
+    Returns:
+        Number of rollup rows written
+    """
+    ranked = db.session.query(
+        LeakInspection.equipment_id.label('equipment_id'),
+        LeakInspection.inspection_date.label('inspection_date'),
+        LeakInspection.next_inspection_date.label('next_inspection_date'),
+        LeakInspection.annual_leak_rate.label('annual_leak_rate'),
+        LeakInspection.compliant.label('compliant'),
+        func.row_number().over(
+            partition_by=LeakInspection.equipment_id,
+            order_by=(desc(LeakInspection.inspection_date), desc(LeakInspection.id))
+        ).label('rn')
+    ).subquery()
+
+    latest_inspections = {
+        row.equipment_id: row
+        for row in db.session.query(ranked).filter(ranked.c.rn == 1)
+    }
+
+    last_services = dict(
+        db.session.query(ServiceLog.equipment_id, func.max(ServiceLog.service_date))
+        .group_by(ServiceLog.equipment_id)
+        .all()
+    )
+
+    now = datetime.utcnow()
+    rows = []
+    for (equipment_id,) in db.session.query(Equipment.id):
+        inspection = latest_inspections.get(equipment_id)
+        rows.append({
+            'equipment_id': equipment_id,
+            'last_inspection_date': inspection.inspection_date if inspection else None,
+            'next_inspection_date': inspection.next_inspection_date if inspection else None,
+            'latest_annual_leak_rate': inspection.annual_leak_rate if inspection else None,
+            'compliant': inspection.compliant if inspection and inspection.compliant is not None else True,
+            'last_service_date': last_services.get(equipment_id),
+            'updated_at': now
+        })
+
+    try:
+        EquipmentComplianceState.query.delete()
+        if rows:
+            db.session.execute(insert(EquipmentComplianceState), rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return len(rows)
+
+
+if __name__ == '__main__':
+    from app import app
+
+    print("=" * 60)
+    print("EcoFreonTrack - Rebuild Equipment Compliance State")
+    print("=" * 60)
+
+    with app.app_context():
+        count = rebuild_compliance_states()
+
+    print(f"\n[OK] Rebuilt compliance state for {count} equipment")
@@ -0,0 +1,306 @@
+"""
+Compliance Sweeps for EcoFreonTrack
+Raises and resolves alerts for overdue inspections, expiring technician certifications
+and low refrigerant stock with set-based queries. A lease in the database makes sure only
+one process runs each sweep at a time, and every run is recorded with its duration.
+
+Run directly (e.g. from cron or as a service next to the web servers):
+    python compliance_sweep.py             # sweep every COMPLIANCE_SWEEP_INTERVAL seconds (default 900)
+    python compliance_sweep.py --once      # run each sweep once and exit
+"""
+import os
+import socket
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, insert, update, func, literal, null, cast, Integer, String
+from sqlalchemy.exc import IntegrityError
+from models import (
+    db, Equipment, Technician, RefrigerantInventory, ComplianceAlert,
+    EquipmentComplianceState, SweepLease, SweepRun
+)
+from compliance_alerts import raise_alerts_from_select, ALERT_KEY, ACTIVE_ALERT
+from dashboard_sections import invalidate_dashboard_sections
+
+# Interval for the standalone runner when COMPLIANCE_SWEEP_INTERVAL is not set
+DEFAULT_SWEEP_INTERVAL = 900
+
+
+def _holder():
+    """Identity of this process for leases"""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+# ============================================================================
+# SWEEP DEFINITIONS
+# ============================================================================
+# Each source selects the items that currently need an alert as
+# (equipment_id, technician_id, title, message); the ids plus the sweep's alert
+# type are the alert dedup key (see compliance_alerts). Missing ids are typed
+# NULLs so Postgres accepts them in INSERT ... SELECT.
+
+def _list_agg(expression):
+    """Comma-separated aggregate of a string expression"""
+    if db.engine.dialect.name == 'postgresql':
+        return func.string_agg(expression, literal(', '))
+    return func.group_concat(expression, literal(', '))
+
+
+def _overdue_inspections(today):
+    """Active equipment whose next leak inspection date has passed"""
+    return select(
+        Equipment.id.label('equipment_id'),
+        cast(null(), Integer).label('technician_id'),
+        (literal('Equipment ') + Equipment.equipment_id + literal(': Leak Inspection Overdue')).label('title'),
+        (literal('Leak inspection was due on ') + cast(EquipmentComplianceState.next_inspection_date, String)
+         + literal('. Inspect per 40 CFR 82.157.')).label('message')
+    ).join(EquipmentComplianceState, EquipmentComplianceState.equipment_id == Equipment.id).where(
+        Equipment.status == 'Active',
+        EquipmentComplianceState.next_inspection_date < today
+    )
+
+
+def _expiring_certifications(today):
+    """Technicians still on the roster whose certification expires within the warning window (or has expired)"""
+    warning_days = current_app.config.get('CERTIFICATION_EXPIRY_WARNING_DAYS', 30)
+    return select(
+        cast(null(), Integer).label('equipment_id'),
+        Technician.id.label('technician_id'),
+        (literal('Certification Expiring: ') + Technician.name).label('title'),
+        (literal('EPA 608 certification ') + Technician.certification_number + literal(' expires on ')
+         + cast(Technician.expiration_date, String) + literal('.')).label('message')
+    ).where(
+        Technician.status != 'Inactive',
+        Technician.expiration_date <= today + timedelta(days=warning_days)
+    )
+
+
+def _low_inventory(today):
+    """One row listing every refrigerant stocked below its reorder level (none when all are stocked)"""
+    return select(
+        cast(null(), Integer).label('equipment_id'),
+        cast(null(), Integer).label('technician_id'),
+        (literal('Low Inventory: ') + cast(func.count(), String)
+         + literal(' refrigerant(s) below reorder level')).label('title'),
+        _list_agg(
+            RefrigerantInventory.refrigerant_name + literal(' (') + cast(RefrigerantInventory.quantity_on_hand, String)
+            + literal(' of ') + cast(RefrigerantInventory.reorder_level, String) + literal(' lbs)')
+        ).label('message')
+    ).where(
+        RefrigerantInventory.quantity_on_hand < RefrigerantInventory.reorder_level
+    ).having(func.count() > 0)
+
+
+def _sync_below_reorder(today):
+    """Refresh the below_reorder flag of every refrigerant in one UPDATE"""
+    db.session.execute(update(RefrigerantInventory).values(
+        below_reorder=RefrigerantInventory.quantity_on_hand < RefrigerantInventory.reorder_level
+    ).execution_options(synchronize_session=False))
+
+
+# name -> {'alert_type', 'severity', 'source', 'resolution',
+#          optional 'prepare' (runs first in the same transaction), optional 'enabled' (config flag)}
+SWEEPS = {
+    'overdue_inspections': {
+        'alert_type': 'Inspection Overdue',
+        'severity': 'Warning',
+        'source': _overdue_inspections,
+        'resolution': 'Inspection recorded',
+    },
+    'expiring_certifications': {
+        'alert_type': 'Certification Expiring',
+        'severity': 'Warning',
+        'source': _expiring_certifications,
+        'resolution': 'Certification renewed',
+    },
+    'low_inventory': {
+        'alert_type': 'Low Inventory',
+        'severity': 'Info',
+        'source': _low_inventory,
+        'resolution': 'Stock replenished',
+        'prepare': _sync_below_reorder,
+        'enabled': 'LOW_INVENTORY_WARNING',
+    },
+}
+
+
+def _apply_sweep(sweep, today):
+    """
+    Raise (or refresh) alerts for current items and resolve alerts whose item no longer qualifies
+
+    Returns:
+        tuple: (alerts created, alerts resolved)
+    """
+    if sweep.get('prepare'):
+        sweep['prepare'](today)
+
+    source = sweep['source'](today).subquery()
+    # A condition that persists between runs is the same occurrence, so only last-seen moves
+    created = raise_alerts_from_select(source, sweep['alert_type'], sweep['severity'], today)
+
+    resolved = db.session.execute(update(ComplianceAlert).where(
+        ACTIVE_ALERT,
+        ComplianceAlert.alert_type == sweep['alert_type'],
+        ~select(source.c.title).where(
+            func.coalesce(source.c.equipment_id, 0) == ALERT_KEY[0],
+            func.coalesce(source.c.technician_id, 0) == ALERT_KEY[1]
+        ).exists()
+    ).values(
+        status='Resolved',
+        resolved_date=today,
+        resolved_by='System',
+        resolution_notes=sweep['resolution'],
+        updated_at=datetime.utcnow()
+    ).execution_options(synchronize_session=False)).rowcount
+
+    return created, resolved
+
+
+# ============================================================================
+# LEASES AND RUNS
+# ============================================================================
+
+def acquire_lease(name, holder, seconds):
+    """
+    Take (or renew) the lease for a sweep if it is free or expired
+
+    Uses a conditional UPDATE, or an INSERT for a sweep that never ran, so two
+    processes racing for the same lease cannot both win.
+
+    Returns:
+        True if this holder owns the lease until now + seconds
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=seconds)
+
+    taken = db.session.execute(update(SweepLease).where(
+        SweepLease.name == name,
+        (SweepLease.expires_at < now) | (SweepLease.holder == holder)
+    ).values(holder=holder, expires_at=expires_at).execution_options(synchronize_session=False)).rowcount
+
+    if not taken:
+        try:
+            db.session.execute(insert(SweepLease.__table__).values(name=name, holder=holder, expires_at=expires_at))
+        except IntegrityError:
+            # Another process holds a live lease
+            db.session.rollback()
+            return False
+
+    db.session.commit()
+    return True
+
+
+def release_lease(name, holder):
+    """Give up a lease early so the next run does not wait for it to expire"""
+    db.session.execute(update(SweepLease).where(
+        SweepLease.name == name, SweepLease.holder == holder
+    ).values(expires_at=datetime.utcnow()).execution_options(synchronize_session=False))
+    db.session.commit()
+
+
+def run_sweep(name, holder=None, today=None):
+    """
+    Run one sweep under its lease and record the run
+
+    Args:
+        name: Key of SWEEPS
+        holder: Lease holder identity (default host:pid)
+        today: Sweep date (default today)
+
+    Returns:
+        The recorded SweepRun, or None if another process holds the lease
+    """
+    sweep = SWEEPS[name]
+    holder = holder or _holder()
+    today = today or datetime.now().date()
+
+    if not acquire_lease(name, holder, current_app.config.get('SWEEP_LEASE_SECONDS', 300)):
+        return None
+
+    run = SweepRun(name=name, holder=holder, started_at=datetime.utcnow(), status='Success')
+    started = time.perf_counter()
+    try:
+        run.alerts_created, run.alerts_resolved = _apply_sweep(sweep, today)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        run.status = 'Failed'
+        run.error = str(e)
+    finally:
+        run.finished_at = datetime.utcnow()
+        run.duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        db.session.add(run)
+        db.session.commit()
+        release_lease(name, holder)
+
+    return run
+
+
+def run_all_sweeps(holder=None, today=None):
+    """
+    Run every enabled sweep whose lease is free
+
+    Returns:
+        Dict of sweep name -> SweepRun (None when skipped for another holder)
+    """
+    runs = {
+        name: run_sweep(name, holder, today) for name, sweep in SWEEPS.items()
+        if current_app.config.get(sweep.get('enabled'), True)
+    }
+    if any(run and (run.alerts_created or run.alerts_resolved) for run in runs.values()):
+        invalidate_dashboard_sections('alert')
+    return runs
+
+
+def start_sweep_scheduler(app, interval):
+    """
+    Run all sweeps every interval seconds in a daemon thread of this process
+
+    Safe to start in every web process: the leases let one of them do each run.
+
+    Returns:
+        threading.Event that stops the scheduler when set
+    """
+    stop = threading.Event()
+
+    def loop():
+        while not stop.is_set():
+            with app.app_context():
+                try:
+                    run_all_sweeps()
+                except Exception as e:
+                    app.logger.error(f'Compliance sweep failed: {e}')
+                finally:
+                    db.session.remove()
+            stop.wait(interval)
+
+    threading.Thread(target=loop, name='compliance-sweep', daemon=True).start()
+    return stop
+
+
+if __name__ == '__main__':
+    from app import app
+
+    once = '--once' in sys.argv
+    interval = app.config.get('COMPLIANCE_SWEEP_INTERVAL') or DEFAULT_SWEEP_INTERVAL
+
+    print("=" * 60)
+    print("EcoFreonTrack - Compliance Sweeps")
+    print("=" * 60)
+    if not once:
+        print(f"Sweeping every {interval}s (Ctrl+C to stop)")
+
+    while True:
+        with app.app_context():
+            for name, run in run_all_sweeps().items():
+                if run is None:
+                    print(f"  {name}: skipped (lease held by another process)")
+                else:
+                    print(f"  {name}: {run.status} - {run.alerts_created} raised, "
+                          f"{run.alerts_resolved} resolved in {run.duration_ms}ms"
+                          + (f" ({run.error})" if run.error else ""))
+        if once:
+            break
+        time.sleep(interval)
@@ -0,0 +1,67 @@
+"""
+Conditional GET Support for EcoFreonTrack Read APIs
+Derives weak ETags and Last-Modified from max(updated_at) and row counts, so polling
+clients get a 304 from a single aggregate query before any ORM objects are loaded
+"""
+import hashlib
+from datetime import timezone
+from flask import request, current_app
+from sqlalchemy import func
+
+
+def collection_version(query, model):
+    """
+    Change marker for the rows a query would return
+
+    The row count catches deletions that max(updated_at) cannot see.
+
+    Args:
+        query: Filtered ORM query over model
+        model: Model with id and updated_at columns
+
+    Returns:
+        tuple: (last_modified: datetime or None, row_count: int)
+    """
+    last_modified, row_count = query.with_entities(
+        func.max(model.updated_at), func.count(model.id)
+    ).order_by(None).one()
+    return last_modified, row_count
+
+
+def make_etag(*parts):
+    """Opaque ETag value for the current URL (path and query string) plus version parts"""
+    key = '|'.join(str(part) for part in (request.full_path,) + parts)
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+
+def _http_date(last_modified):
+    """Stored timestamps are naive UTC; HTTP dates have whole-second precision"""
+    return last_modified.replace(tzinfo=timezone.utc, microsecond=0) if last_modified else None
+
+
+def not_modified_response(etag, last_modified=None):
+    """
+    Return a 304 response when the client's cached copy is still current, else None
+
+    If-None-Match takes precedence over If-Modified-Since (RFC 9110).
+    """
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified:
+        fresh = _http_date(last_modified) <= request.if_modified_since
+    else:
+        fresh = False
+
+    if not fresh:
+        return None
+    return set_validators(current_app.response_class(status=304), etag, last_modified)
+
+
+def set_validators(response, etag, last_modified=None):
+    """Attach the weak ETag / Last-Modified and require revalidation on every use"""
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = _http_date(last_modified)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
@@ -37,6 +37,31 @@ class Config:
     CERTIFICATION_EXPIRY_WARNING_DAYS = 30    # Warn 30 days before cert expires
     LOW_INVENTORY_WARNING = True
 
+    # Reorder planner (refrigerant_forecast.py)
+    REORDER_LEAD_TIME_DAYS = 14               # Supplier delivery time
+    REORDER_COVER_DAYS = 60                   # Forecast usage an order should cover after delivery
+
+    # Compliance sweeps (seconds between runs; 0 leaves them to `python compliance_sweep.py`)
+    COMPLIANCE_SWEEP_INTERVAL = int(os.environ.get('COMPLIANCE_SWEEP_INTERVAL', 0))
+    SWEEP_LEASE_SECONDS = 300                 # A crashed runner's lease frees up after this
+
+    # Cold storage (`python record_archive.py`): records older than this move to archive tables.
+    # Archived records are kept, so this can stay at the 3 years of 40 CFR 82.166 or go lower.
+    ARCHIVE_RECORDS_AFTER_DAYS = int(os.environ.get('ARCHIVE_RECORDS_AFTER_DAYS', 3 * 365))
+    ARCHIVE_RESOLVED_ALERTS_AFTER_DAYS = int(os.environ.get('ARCHIVE_RESOLVED_ALERTS_AFTER_DAYS', 90))
+    ARCHIVE_BATCH_SIZE = 5000                 # Rows moved per transaction
+
+    # Writers that lose a lock race (SQLite busy timeout, Postgres deadlock) run again
+    WRITE_CONFLICT_RETRIES = 5                # Tries per transaction
+    WRITE_CONFLICT_BACKOFF = 0.05             # Seconds, doubled (with jitter) per retry
+
+    # Dashboard section cache (seconds, 0 disables caching)
+    DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', 300))
+
+    # List views and JSON APIs (keyset pagination)
+    LIST_PAGE_SIZE = int(os.environ.get('LIST_PAGE_SIZE', 50))
+    MAX_PAGE_SIZE = 500
+
 
 class DevelopmentConfig(Config):
     """Development environment configuration"""
@@ -95,6 +120,7 @@ class TestingConfig(Config):
 
     # Testing-specific settings
     WTF_CSRF_ENABLED = False  # Disable CSRF for testing
+    DASHBOARD_CACHE_TTL = 0  # Always rebuild dashboard sections
 
 
 # Configuration dictionary
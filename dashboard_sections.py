@@ -0,0 +1,511 @@
+"""
+Dashboard Section Registry for EcoFreonTrack
+Each dashboard section is a named builder; each role opts into the sections its dashboard layer renders.
+Built sections are cached per (section, role) and invalidated when the data they read is written.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app, url_for
+from sqlalchemy import func, desc, or_
+from models import db, Equipment, ServiceLog, LeakInspection, ComplianceAlert, Document, EquipmentComplianceState
+from refrigerant_usage import get_monthly_refrigerant_usage, get_recovery_summary
+from refrigerant_forecast import get_catalog_forecast
+from stats_service import get_equipment_stats, get_technician_stats, get_alert_stats
+
+# Registered sections: name -> {'build': callable(today, context) -> dict,
+#                                'requires': tuple of section names,
+#                                'sources': tuple of data sources the section reads}
+DASHBOARD_SECTIONS = {}
+
+# Data sources that invalidate cached sections when written
+DATA_SOURCES = {'equipment', 'technician', 'service_log', 'leak_inspection', 'alert', 'inventory', 'document'}
+
+# Number of active alerts listed in the auditor review table
+AUDIT_ALERT_LIMIT = 50
+
+# Default cache lifetime when DASHBOARD_CACHE_TTL is not configured
+DEFAULT_CACHE_TTL = 300  # seconds
+
+
+def dashboard_section(name, sources, requires=()):
+    """
+    Decorator registering a dashboard section builder
+
+    Args:
+        name: Section name used in ROLE_SECTIONS
+        sources: Data sources (see DATA_SOURCES) whose writes invalidate this section
+        requires: Sections whose template variables this builder reads from context
+    """
+    unknown = set(sources) - DATA_SOURCES
+    if unknown:
+        raise ValueError(f'Unknown data sources for section {name}: {", ".join(sorted(unknown))}')
+
+    def decorator(f):
+        DASHBOARD_SECTIONS[name] = {'build': f, 'requires': tuple(requires), 'sources': tuple(sources)}
+        return f
+    return decorator
+
+
+# ============================================================================
+# SECTION CACHE
+# ============================================================================
+
+class SectionCache:
+    """
+    Thread-safe in-process cache of built dashboard sections, keyed by (section, role)
+
+    Each section has a generation counter that is bumped on invalidation, so a
+    build that started before a write cannot store its (now stale) result.
+    """
+
+    def __init__(self):
+        self._entries = {}  # (section, role) -> (expires_at, value)
+        self._generations = {}  # section -> int
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, section, role):
+        """Return a cached section value, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get((section, role))
+            if entry and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def generation(self, section):
+        """Current generation of a section (capture before building it)"""
+        with self._lock:
+            return self._generations.get(section, 0)
+
+    def set(self, section, role, value, ttl, generation):
+        """Store a built section unless it was invalidated while being built"""
+        with self._lock:
+            if self._generations.get(section, 0) != generation:
+                return
+            self._entries[(section, role)] = (time.monotonic() + ttl, value)
+
+    def invalidate(self, sections):
+        """Drop every role's cached copy of the given sections"""
+        sections = set(sections)
+        with self._lock:
+            for section in sections:
+                self._generations[section] = self._generations.get(section, 0) + 1
+            for key in [key for key in self._entries if key[0] in sections]:
+                del self._entries[key]
+            self.invalidations += 1
+
+    def clear(self):
+        """Drop all cached sections"""
+        self.invalidate(DASHBOARD_SECTIONS)
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries)
+            }
+
+
+section_cache = SectionCache()
+
+
+def invalidate_dashboard_sections(*sources):
+    """
+    Invalidate cached dashboard sections that read any of the given data sources
+
+    Call after a successful commit, e.g. invalidate_dashboard_sections('service_log', 'inventory')
+    """
+    sections = [
+        name for name, section in DASHBOARD_SECTIONS.items()
+        if set(section['sources']) & set(sources)
+    ]
+    if sections:
+        section_cache.invalidate(sections)
+
+
+def _reattach(value):
+    """Merge cached ORM instances into the current session so templates can lazy-load relationships"""
+    if isinstance(value, db.Model):
+        return db.session.merge(value, load=False)
+    if isinstance(value, list):
+        return [_reattach(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _reattach(item) for key, item in value.items()}
+    return value
+
+
+# ============================================================================
+# SHARED SECTIONS (rendered for every role)
+# ============================================================================
+
+@dashboard_section('overview', sources=('equipment', 'technician', 'alert', 'leak_inspection'))
+def build_overview(today, context):
+    """Stats grid - active equipment, technicians and alerts"""
+    return {
+        'total_equipment': get_equipment_stats()['active'],
+        'total_technicians': get_technician_stats()['active'],
+        'active_alerts': get_alert_stats()['active']
+    }
+
+
+@dashboard_section('active_alerts', sources=('alert', 'leak_inspection'))
+def build_active_alerts(today, context):
+    """Most recent active compliance alerts"""
+    return {
+        'alerts': ComplianceAlert.query.filter_by(status='Active').order_by(desc(ComplianceAlert.alert_date)).limit(10).all()
+    }
+
+
+@dashboard_section('upcoming_inspections', sources=('equipment', 'leak_inspection'))
+def build_upcoming_inspections(today, context):
+    """Inspections due within 7 days, read from the compliance rollup"""
+    upcoming_inspections = [
+        {'equipment': equip, 'next_date': next_date}
+        for equip, next_date in db.session.query(Equipment, EquipmentComplianceState.next_inspection_date)
+        .join(EquipmentComplianceState, EquipmentComplianceState.equipment_id == Equipment.id)
+        .filter(
+            Equipment.status == 'Active',
+            EquipmentComplianceState.next_inspection_date <= today + timedelta(days=7)
+        )
+        .order_by(EquipmentComplianceState.next_inspection_date)
+        .all()
+    ]
+    return {'upcoming_inspections': upcoming_inspections}
+
+
+@dashboard_section('recent_services', sources=('service_log',))
+def build_recent_services(today, context):
+    """Last 5 service logs"""
+    return {
+        'recent_services': ServiceLog.query.order_by(desc(ServiceLog.service_date)).limit(5).all()
+    }
+
+
+@dashboard_section('low_inventory', sources=('inventory', 'service_log'))
+def build_low_inventory(today, context):
+    """Refrigerants below their reorder level or forecast to run short within the supplier lead time"""
+    return {
+        'low_inventory': [item for item in get_catalog_forecast(today) if item['reorder_now']]
+    }
+
+
+# ============================================================================
+# COMPLIANCE METRICS (Manager/Admin/Auditor)
+# ============================================================================
+
+@dashboard_section('compliance_metrics', sources=('equipment', 'leak_inspection'), requires=('overview',))
+def build_compliance_metrics(today, context):
+    """Compliance percentage - equipment with leak rate < 30%"""
+    total_equipment = context['total_equipment']
+    if total_equipment == 0:
+        return {'compliance_percentage': 100.0, 'compliant_equipment': 0}
+
+    # Equipment without an inspection (or a computed leak rate) counts as compliant (benefit of doubt)
+    compliant_equipment = db.session.query(func.count(Equipment.id)).outerjoin(
+        EquipmentComplianceState, EquipmentComplianceState.equipment_id == Equipment.id
+    ).filter(
+        Equipment.status == 'Active',
+        or_(
+            EquipmentComplianceState.latest_annual_leak_rate.is_(None),
+            EquipmentComplianceState.latest_annual_leak_rate < 30
+        )
+    ).scalar()
+
+    return {
+        'compliance_percentage': round((compliant_equipment / total_equipment) * 100, 1),
+        'compliant_equipment': compliant_equipment
+    }
+
+
+@dashboard_section('alert_severity', sources=('alert', 'leak_inspection'))
+def build_alert_severity(today, context):
+    """Active leak alerts by severity (Critical + Warning)"""
+    alert_stats = get_alert_stats()
+    return {
+        'critical_alerts': alert_stats['critical'],
+        'warning_alerts': alert_stats['warning']
+    }
+
+
+@dashboard_section('upcoming_reports', sources=('equipment', 'leak_inspection'), requires=('upcoming_inspections',))
+def build_upcoming_reports(today, context):
+    """Upcoming EPA reports - inspections due are shown as reports needed"""
+    return {'upcoming_reports_count': len(context['upcoming_inspections'])}
+
+
+@dashboard_section('recovery_summary', sources=('service_log',))
+def build_recovery_summary(today, context):
+    """Refrigerant recovered in the last 30 days"""
+    total_recovered, recovery_count = get_recovery_summary(today - timedelta(days=30))
+    return {
+        'total_recovered': round(total_recovered, 2),
+        'recovery_count': recovery_count
+    }
+
+
+@dashboard_section('usage_trend', sources=('service_log',))
+def build_usage_trend(today, context):
+    """Monthly refrigerant usage trend (last 6 calendar months)"""
+    usage_trend = get_monthly_refrigerant_usage(months=6, today=today)
+    return {
+        'monthly_usage': usage_trend['added'],
+        'monthly_labels': usage_trend['labels']
+    }
+
+
+# ============================================================================
+# TECHNICIAN SECTIONS
+# ============================================================================
+
+@dashboard_section('technician_recent_logs', sources=('service_log',))
+def build_technician_recent_logs(today, context):
+    """Recent service logs (for technicians to track their work)"""
+    return {
+        'technician_recent_logs': ServiceLog.query.order_by(desc(ServiceLog.service_date)).limit(10).all()
+    }
+
+
+@dashboard_section('recent_leak_inspections', sources=('leak_inspection',))
+def build_recent_leak_inspections(today, context):
+    """Last 10 leak inspections"""
+    return {
+        'recent_leak_inspections': LeakInspection.query.order_by(desc(LeakInspection.inspection_date)).limit(10).all()
+    }
+
+
+@dashboard_section('equipment_needing_service', sources=('equipment', 'service_log'))
+def build_equipment_needing_service(today, context):
+    """Equipment not serviced in 60+ days, read from the compliance rollup"""
+    equipment_needing_service = [
+        {
+            'equipment': equip,
+            'last_service_date': last_service_date,
+            'days_since': (today - last_service_date).days
+        }
+        for equip, last_service_date in db.session.query(Equipment, EquipmentComplianceState.last_service_date)
+        .join(EquipmentComplianceState, EquipmentComplianceState.equipment_id == Equipment.id)
+        .filter(
+            Equipment.status == 'Active',
+            EquipmentComplianceState.last_service_date < today - timedelta(days=60)
+        )
+        .order_by(EquipmentComplianceState.last_service_date)
+        .all()
+    ]
+    return {'equipment_needing_service': equipment_needing_service}
+
+
+# ============================================================================
+# AUDITOR SECTIONS
+# ============================================================================
+
+@dashboard_section('recent_documents', sources=('document',))
+def build_recent_documents(today, context):
+    """Recent compliance documents"""
+    return {
+        'recent_documents': Document.query.order_by(desc(Document.uploaded_at)).limit(10).all()
+    }
+
+
+@dashboard_section('audit_alerts', sources=('alert', 'leak_inspection'))
+def build_audit_alerts(today, context):
+    """Active alerts for audit review (most recent first)"""
+    return {
+        'all_active_alerts': ComplianceAlert.query.filter_by(status='Active').order_by(
+            desc(ComplianceAlert.alert_date)
+        ).limit(AUDIT_ALERT_LIMIT).all()
+    }
+
+
+# ============================================================================
+# ROLE OPT-IN
+# ============================================================================
+
+# Sections rendered below the role-specific layer for every user
+COMMON_SECTIONS = ['overview', 'active_alerts', 'upcoming_inspections', 'recent_services']
+
+MANAGER_SECTIONS = ['compliance_metrics', 'alert_severity', 'upcoming_reports', 'recovery_summary', 'usage_trend', 'low_inventory']
+
+ROLE_SECTIONS = {
+    'technician': COMMON_SECTIONS + ['technician_recent_logs', 'recent_leak_inspections', 'equipment_needing_service'],
+    'compliance_manager': COMMON_SECTIONS + MANAGER_SECTIONS,
+    'admin': COMMON_SECTIONS + MANAGER_SECTIONS,
+    'auditor': COMMON_SECTIONS + ['compliance_metrics', 'alert_severity', 'technician_recent_logs', 'recent_documents', 'audit_alerts'],
+}
+
+
+def get_role_sections(role):
+    """Get the section names a role's dashboard renders (unknown roles get the shared sections)"""
+    return ROLE_SECTIONS.get(role, COMMON_SECTIONS)
+
+
+def build_dashboard_context(role, sections=None, today=None):
+    """
+    Build template variables for only the sections a role renders
+
+    Sections are served from the section cache when fresh; an explicit
+    `today` bypasses the cache since results depend on the reference date.
+
+    Args:
+        role: User.role of the logged-in user
+        sections: Section names to build (defaults to every section the role renders)
+        today: Reference date (defaults to today)
+
+    Returns:
+        Dict of template variables for dashboard.html
+    """
+    use_cache = today is None
+    today = today or datetime.now().date()
+    ttl = current_app.config.get('DASHBOARD_CACHE_TTL', DEFAULT_CACHE_TTL)
+    context = {}
+    built = set()
+
+    def build(name):
+        if name in built:
+            return
+        section = DASHBOARD_SECTIONS[name]
+        for dependency in section['requires']:
+            build(dependency)
+
+        cached = section_cache.get(name, role) if use_cache and ttl else None
+        if cached is not None:
+            context.update(_reattach(cached))
+        else:
+            generation = section_cache.generation(name)
+            result = section['build'](today, context)
+            if use_cache and ttl:
+                section_cache.set(name, role, result, ttl, generation)
+            context.update(result)
+        built.add(name)
+
+    for name in (sections if sections is not None else get_role_sections(role)):
+        build(name)
+
+    return context
+
+
+# ============================================================================
+# ASYNCHRONOUS WIDGETS
+# ============================================================================
+
+# Widgets fetched as JSON after the page shell renders:
+# name -> {'sections': tuple of section names, 'serialize': callable(context) -> dict, 'max_age': seconds}
+DASHBOARD_WIDGETS = {}
+
+
+def dashboard_widget(name, sections, max_age=60):
+    """
+    Decorator registering a JSON dashboard widget built from one or more sections
+
+    Args:
+        name: Widget name used in /api/dashboard/widgets/<name>
+        sections: Sections the widget needs (a role sees the widget only if it renders all of them)
+        max_age: Browser cache lifetime in seconds
+    """
+    def decorator(f):
+        DASHBOARD_WIDGETS[name] = {'sections': tuple(sections), 'serialize': f, 'max_age': max_age}
+        return f
+    return decorator
+
+
+@dashboard_widget('stats', sections=('overview',))
+def serialize_stats(context):
+    """Stats grid counts"""
+    return {
+        'total_equipment': context['total_equipment'],
+        'total_technicians': context['total_technicians'],
+        'active_alerts': context['active_alerts']
+    }
+
+
+@dashboard_widget('upcoming-inspections', sections=('upcoming_inspections',))
+def serialize_upcoming_inspections(context):
+    """Inspections due within 7 days"""
+    return {
+        'items': [{
+            'id': item['equipment'].id,
+            'equipment_id': item['equipment'].equipment_id,
+            'name': item['equipment'].name,
+            'next_date': item['next_date'].isoformat(),
+            'detail_url': url_for('equipment_detail', id=item['equipment'].id),
+            'schedule_url': url_for('leak_inspection_add', equipment_id=item['equipment'].id)
+        } for item in context['upcoming_inspections']]
+    }
+
+
+@dashboard_widget('low-inventory', sections=('low_inventory',))
+def serialize_low_inventory(context):
+    """Refrigerants to reorder, with forecast stockout and suggested quantity"""
+    return {
+        'items': [{
+            'id': item['id'],
+            'refrigerant_name': item['refrigerant_name'],
+            'quantity_on_hand': item['quantity_on_hand'],
+            'reorder_level': item['reorder_level'],
+            'days_until_stockout': item['days_until_stockout'],
+            'suggested_reorder_quantity': item['suggested_reorder_quantity']
+        } for item in context['low_inventory']]
+    }
+
+
+@dashboard_widget('usage-trend', sections=('usage_trend',), max_age=300)
+def serialize_usage_trend(context):
+    """Monthly refrigerant usage chart data"""
+    return {
+        'labels': context['monthly_labels'],
+        'added': context['monthly_usage']
+    }
+
+
+@dashboard_widget('needs-service', sections=('equipment_needing_service',))
+def serialize_needs_service(context):
+    """Equipment not serviced in 60+ days"""
+    return {
+        'items': [{
+            'id': item['equipment'].id,
+            'equipment_id': item['equipment'].equipment_id,
+            'name': item['equipment'].name,
+            'last_service_date': item['last_service_date'].isoformat(),
+            'days_since': item['days_since'],
+            'detail_url': url_for('equipment_detail', id=item['equipment'].id),
+            'schedule_url': url_for('service_log_add', equipment_id=item['equipment'].id)
+        } for item in context['equipment_needing_service']]
+    }
+
+
+@dashboard_widget('recent-documents', sections=('recent_documents',))
+def serialize_recent_documents(context):
+    """Most recently uploaded documents"""
+    return {
+        'items': [{
+            'id': doc.id,
+            'filename': doc.filename,
+            'document_type': doc.document_type,
+            'uploaded_at': doc.uploaded_at.strftime('%Y-%m-%d') if doc.uploaded_at else None,
+            'download_url': url_for('document_download', id=doc.id)
+        } for doc in context['recent_documents']]
+    }
+
+
+# Sections served by widgets are left out of the initial page render
+ASYNC_SECTIONS = {name for widget in DASHBOARD_WIDGETS.values() for name in widget['sections']}
+
+
+def get_role_widgets(role):
+    """Widget names available to a role (every section the widget needs is one the role renders)"""
+    role_sections = set(get_role_sections(role))
+    return [name for name, widget in DASHBOARD_WIDGETS.items() if set(widget['sections']) <= role_sections]
+
+
+def get_shell_sections(role):
+    """Sections rendered with the page shell (sections a widget depends on are still built as dependencies)"""
+    return [name for name in get_role_sections(role) if name not in ASYNC_SECTIONS]
@@ -0,0 +1,116 @@
+"""
+Equipment API Projection and Streaming Export for EcoFreonTrack
+Maps public field names to columns, applies list filters, and streams NDJSON/CSV
+from a server-side cursor so large exports run in constant memory
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from sqlalchemy import select
+from models import db, Equipment
+
+# Public field name -> column
+EQUIPMENT_FIELDS = {
+    'id': Equipment.id,
+    'equipment_id': Equipment.equipment_id,
+    'name': Equipment.name,
+    'type': Equipment.equipment_type,
+    'refrigerant': Equipment.refrigerant_name,
+    'refrigerant_type': Equipment.refrigerant_type,
+    'full_charge': Equipment.full_charge,
+    'status': Equipment.status,
+    'customer_id': Equipment.customer_id,
+    'location': Equipment.location,
+    'manufacturer': Equipment.manufacturer,
+    'model_number': Equipment.model_number,
+    'serial_number': Equipment.serial_number,
+    'install_date': Equipment.install_date,
+    'retire_date': Equipment.retire_date,
+    'leak_rate_threshold': Equipment.leak_rate_threshold,
+    'inspection_frequency': Equipment.inspection_frequency,
+    'updated_at': Equipment.updated_at,
+}
+
+# Fields returned when no fields= projection is given
+DEFAULT_FIELDS = ['id', 'equipment_id', 'name', 'type', 'refrigerant', 'status']
+
+# Rows fetched per round trip while streaming
+STREAM_BATCH_SIZE = 1000
+
+
+def parse_fields(fields_arg):
+    """
+    Parse a comma-separated fields= projection
+
+    Returns:
+        List of field names (DEFAULT_FIELDS when empty)
+
+    Raises:
+        ValueError: If a field is unknown
+    """
+    if not fields_arg:
+        return list(DEFAULT_FIELDS)
+
+    fields = [field.strip() for field in fields_arg.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in EQUIPMENT_FIELDS]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}. Available: {", ".join(EQUIPMENT_FIELDS)}')
+    return fields
+
+
+def apply_equipment_filters(query, status=None, customer_id=None, refrigerant_name=None):
+    """Apply the optional list filters to an ORM query or select()"""
+    if status:
+        query = query.filter(Equipment.status == status)
+    if customer_id is not None:
+        query = query.filter(Equipment.customer_id == customer_id)
+    if refrigerant_name:
+        query = query.filter(Equipment.refrigerant_name == refrigerant_name)
+    return query
+
+
+def _json_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def project_equipment(equipment, fields):
+    """Projected dict for one Equipment instance"""
+    return {field: _json_value(getattr(equipment, EQUIPMENT_FIELDS[field].key)) for field in fields}
+
+
+def _stream_rows(fields, filters):
+    """Yield projected column tuples in id order, STREAM_BATCH_SIZE rows per fetch"""
+    stmt = apply_equipment_filters(
+        select(*(EQUIPMENT_FIELDS[field] for field in fields)), **filters
+    ).order_by(Equipment.id).execution_options(yield_per=STREAM_BATCH_SIZE)
+
+    # yield_per streams from a server-side cursor instead of buffering the result
+    for row in db.session.execute(stmt):
+        yield row
+
+
+def stream_ndjson(fields, filters):
+    """Generate one JSON object per line"""
+    for row in _stream_rows(fields, filters):
+        yield json.dumps({field: _json_value(value) for field, value in zip(fields, row)}) + '\n'
+
+
+def stream_csv(fields, filters):
+    """Generate a CSV header and one line per equipment"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return data
+
+    writer.writerow(fields)
+    yield flush()
+    for row in _stream_rows(fields, filters):
+        writer.writerow(_json_value(value) for value in row)
+        yield flush()
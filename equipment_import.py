@@ -0,0 +1,191 @@
+"""
+Bulk Equipment Import for EcoFreonTrack
+Streams a CSV or XLSX file, validates each row against existing equipment, customers and
+refrigerant inventory, and inserts valid rows in executemany batches
+
+Run directly to import a file:
+    python equipment_import.py units.csv              # all-or-nothing
+    python equipment_import.py units.xlsx --partial   # commit valid rows, report the rest
+"""
+import sys
+from sqlalchemy import insert
+from models import db, Equipment, Customer, RefrigerantInventory
+from equipment_search import index_new_equipment
+from bulk_import import (
+    iter_import_rows, detect_format, run_import, cell_text, parse_number, parse_date,
+    ALL_OR_NOTHING, PARTIAL, IMPORT_BATCH_SIZE
+)
+
+REQUIRED_COLUMNS = ['equipment_id', 'name', 'equipment_type', 'refrigerant_type', 'refrigerant_name', 'full_charge']
+
+EQUIPMENT_STATUSES = {'Active', 'Retired', 'Disposed'}
+
+
+# ============================================================================
+# VALIDATION
+# ============================================================================
+
+class ImportValidator:
+    """Validates rows against the database state loaded once per import"""
+
+    def __init__(self):
+        self.existing_codes = {code for (code,) in db.session.query(Equipment.equipment_id)}
+        self.refrigerants = {name for (name,) in db.session.query(RefrigerantInventory.refrigerant_name)}
+        self.customer_names = dict(db.session.query(Customer.id, Customer.company_name))
+        self.seen_codes = {}  # equipment_id -> first row number in this file
+
+    def validate(self, row_number, row):
+        """
+        Convert one file row to insert parameters
+
+        Returns:
+            tuple: (params dict or None, list of error messages)
+        """
+        errors = []
+        missing = [column for column in REQUIRED_COLUMNS if not cell_text(row.get(column))]
+        if missing:
+            errors.append(f'Missing required value(s): {", ".join(missing)}')
+
+        code = cell_text(row.get('equipment_id'))
+        if code:
+            if code in self.existing_codes:
+                errors.append(f'equipment_id {code} already exists')
+            elif code in self.seen_codes:
+                errors.append(f'equipment_id {code} duplicates row {self.seen_codes[code]}')
+            else:
+                self.seen_codes[code] = row_number
+
+        refrigerant_name = cell_text(row.get('refrigerant_name'))
+        if refrigerant_name and refrigerant_name not in self.refrigerants:
+            errors.append(f'Unknown refrigerant {refrigerant_name}')
+
+        customer_id = None
+        if cell_text(row.get('customer_id')):
+            customer_id = parse_number(row.get('customer_id'), int, 'customer_id', errors)
+            if customer_id is not None and customer_id not in self.customer_names:
+                errors.append(f'Unknown customer_id {customer_id}')
+
+        full_charge = None
+        if cell_text(row.get('full_charge')):
+            full_charge = parse_number(row.get('full_charge'), float, 'full_charge', errors)
+            if full_charge is not None and full_charge <= 0:
+                errors.append('full_charge must be greater than 0')
+
+        status = cell_text(row.get('status')) or 'Active'
+        if status not in EQUIPMENT_STATUSES:
+            errors.append(f'status must be one of: {", ".join(sorted(EQUIPMENT_STATUSES))}')
+
+        leak_rate_threshold = 10.0
+        if cell_text(row.get('leak_rate_threshold')):
+            leak_rate_threshold = parse_number(row.get('leak_rate_threshold'), float, 'leak_rate_threshold', errors)
+
+        inspection_frequency = 30
+        if cell_text(row.get('inspection_frequency')):
+            inspection_frequency = parse_number(row.get('inspection_frequency'), int, 'inspection_frequency', errors)
+
+        install_date = None
+        if cell_text(row.get('install_date')):
+            install_date = parse_date(row.get('install_date'), 'install_date', errors)
+
+        if errors:
+            return None, errors
+
+        # Every batch row carries the same keys, as executemany requires
+        return {
+            'customer_id': customer_id,
+            'equipment_id': code,
+            'name': cell_text(row.get('name')),
+            'equipment_type': cell_text(row.get('equipment_type')),
+            'location': cell_text(row.get('location')),
+            'manufacturer': cell_text(row.get('manufacturer')),
+            'model_number': cell_text(row.get('model_number')),
+            'serial_number': cell_text(row.get('serial_number')),
+            'refrigerant_type': cell_text(row.get('refrigerant_type')),
+            'refrigerant_name': refrigerant_name,
+            'full_charge': full_charge,
+            'status': status,
+            'install_date': install_date,
+            'leak_rate_threshold': leak_rate_threshold,
+            'inspection_frequency': inspection_frequency,
+        }, []
+
+
+# ============================================================================
+# IMPORT
+# ============================================================================
+
+def _insert_batch(batch, customer_names):
+    """Insert one batch with a single executemany and index it for search"""
+    # Core insert on the table skips the ORM bulk-persistence layer
+    table = Equipment.__table__
+    result = db.session.execute(
+        insert(table).returning(table.c.id, sort_by_parameter_order=True),
+        batch
+    )
+    index_new_equipment([
+        dict(params, id=equipment_id, customer_name=customer_names.get(params['customer_id']))
+        for params, equipment_id in zip(batch, result.scalars())
+    ])
+
+
+def import_equipment(stream, file_format='csv', mode=ALL_OR_NOTHING, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import equipment from a CSV or XLSX stream
+
+    Args:
+        stream: Binary file-like object
+        file_format: 'csv' or 'xlsx'
+        mode: ALL_OR_NOTHING (any invalid row rolls back the import) or PARTIAL
+        batch_size: Rows per executemany batch
+
+    Returns:
+        Import report (see bulk_import.run_import), errors keyed by equipment_id
+
+    Raises:
+        ValueError: For an unsupported format/mode or a file missing required columns
+    """
+    validator = ImportValidator()
+    return run_import(
+        iter_import_rows(stream, file_format),
+        REQUIRED_COLUMNS,
+        validator.validate,
+        lambda batch: _insert_batch(batch, validator.customer_names),
+        mode=mode,
+        batch_size=batch_size,
+        key_column='equipment_id'
+    )
+
+
+if __name__ == '__main__':
+    import time
+    from app import app
+
+    if len(sys.argv) < 2:
+        print("Usage: python equipment_import.py <file.csv|file.xlsx> [--partial]")
+        sys.exit(2)
+
+    path = sys.argv[1]
+    mode = PARTIAL if '--partial' in sys.argv else ALL_OR_NOTHING
+
+    print("=" * 60)
+    print("EcoFreonTrack - Bulk Equipment Import")
+    print("=" * 60)
+
+    with app.app_context():
+        started = time.perf_counter()
+        with open(path, 'rb') as f:
+            report = import_equipment(f, detect_format(path), mode)
+        elapsed = time.perf_counter() - started
+
+    print(f"\nRows read: {report['total_rows']}  Imported: {report['imported']}  "
+          f"Errors: {report['error_count']}  ({elapsed:.2f}s)")
+    for error in report['errors'][:50]:
+        print(f"  Row {error['row']} ({error['equipment_id'] or '-'}): {'; '.join(error['errors'])}")
+    if report['error_count'] > 50:
+        print(f"  ... and {report['error_count'] - 50} more")
+
+    if report['committed']:
+        print("\n[OK] Import committed")
+    else:
+        print("\n[!] Nothing imported - fix the errors above or rerun with --partial")
+        sys.exit(1)
@@ -0,0 +1,190 @@
+"""
+Scanner Code Lookup for EcoFreonTrack
+Resolves a scanned equipment ID or serial number through an in-process hash index,
+then reads the equipment and its compliance rollup with a single primary-key query.
+Codes the index does not know fall back to the upper(equipment_id) and
+upper(serial_number) expression indexes; codes found nowhere are remembered briefly.
+"""
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import func
+from models import db, Equipment, EquipmentComplianceState
+
+# Seconds an unknown code is answered from memory before the database is asked again
+MISS_TTL_SECONDS = 30
+
+# Unknown codes remembered at most (the oldest half is dropped beyond this)
+MAX_MISSES = 10000
+
+
+def normalize_code(code):
+    """Codes match exactly, ignoring surrounding whitespace and letter case"""
+    return (code or '').strip().upper()
+
+
+class EquipmentCodeIndex:
+    """
+    Thread-safe map of normalized equipment_id / serial_number -> Equipment.id
+
+    Each process keeps its own copy. Writes made by this process update it
+    directly; entries written by other workers are picked up on a miss or when
+    the indexed row no longer carries the code (see lookup_equipment). Codes
+    found nowhere are remembered for MISS_TTL_SECONDS, so another worker's new
+    equipment can take that long to resolve here.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._codes = {}      # code -> equipment pk
+        self._by_id = {}      # equipment pk -> codes indexed for it
+        self._misses = {}     # unknown code -> monotonic time it stops being trusted
+
+    def load(self):
+        """Rebuild the index from the equipment table"""
+        rows = db.session.query(Equipment.id, Equipment.equipment_id, Equipment.serial_number).all()
+        codes, by_id = {}, {}
+
+        # Serial numbers first so an equipment ID always wins a collision
+        for pk, _, serial_number in rows:
+            if normalize_code(serial_number):
+                codes[normalize_code(serial_number)] = pk
+                by_id.setdefault(pk, set()).add(normalize_code(serial_number))
+        for pk, equipment_id, _ in rows:
+            codes[normalize_code(equipment_id)] = pk
+            by_id.setdefault(pk, set()).add(normalize_code(equipment_id))
+
+        with self._lock:
+            self._codes = codes
+            self._by_id = by_id
+            self._misses = {}
+        return len(rows)
+
+    def update(self, equipment):
+        """Re-index one equipment after it was added or edited (call after commit)"""
+        new_codes = {normalize_code(equipment.equipment_id), normalize_code(equipment.serial_number)} - {''}
+        with self._lock:
+            for code in self._by_id.pop(equipment.id, set()):
+                if self._codes.get(code) == equipment.id:
+                    del self._codes[code]
+            for code in new_codes:
+                # Never let a serial number shadow another equipment's ID
+                if code == normalize_code(equipment.equipment_id) or code not in self._codes:
+                    self._codes[code] = equipment.id
+            self._by_id[equipment.id] = new_codes
+            for code in new_codes:
+                self._misses.pop(code, None)
+
+    def get(self, code):
+        """Equipment pk for a code, or None"""
+        with self._lock:
+            return self._codes.get(normalize_code(code))
+
+    def add_miss(self, code):
+        """Remember that a code matched no equipment"""
+        with self._lock:
+            if len(self._misses) >= MAX_MISSES:
+                # Insertion order is roughly expiry order
+                for stale in list(self._misses)[:MAX_MISSES // 2]:
+                    del self._misses[stale]
+            self._misses[normalize_code(code)] = time.monotonic() + MISS_TTL_SECONDS
+
+    def is_recent_miss(self, code):
+        """True if the code matched no equipment within the last MISS_TTL_SECONDS"""
+        code = normalize_code(code)
+        with self._lock:
+            expires = self._misses.get(code)
+            if expires is None:
+                return False
+            if expires <= time.monotonic():
+                del self._misses[code]
+                return False
+            return True
+
+    def __len__(self):
+        with self._lock:
+            return len(self._codes)
+
+
+# Process-wide index, loaded at startup
+equipment_code_index = EquipmentCodeIndex()
+
+
+def _load_with_state(equipment_pk):
+    """Equipment and its compliance rollup in one primary-key query"""
+    return db.session.query(Equipment, EquipmentComplianceState).outerjoin(
+        EquipmentComplianceState, EquipmentComplianceState.equipment_id == Equipment.id
+    ).filter(Equipment.id == equipment_pk).first()
+
+
+def _matches(equipment, code):
+    code = normalize_code(code)
+    return code in (normalize_code(equipment.equipment_id), normalize_code(equipment.serial_number))
+
+
+def lookup_equipment(code):
+    """
+    Resolve a scanned code to its equipment and compliance rollup
+
+    Args:
+        code: Scanned equipment ID or serial number
+
+    Returns:
+        tuple: (Equipment, EquipmentComplianceState or None), or None if not found
+    """
+    if not normalize_code(code):
+        return None
+
+    equipment_pk = equipment_code_index.get(code)
+    if equipment_pk is not None:
+        row = _load_with_state(equipment_pk)
+        if row and _matches(row[0], code):
+            return row
+
+    if equipment_code_index.is_recent_miss(code):
+        return None
+
+    # Missed or stale (written by another worker) - resolve from the database and learn it.
+    # One indexed probe per column; an equipment ID wins over another unit's serial number.
+    code = normalize_code(code)
+    equipment = Equipment.query.filter(func.upper(Equipment.equipment_id) == code).first() \
+        or Equipment.query.filter(func.upper(Equipment.serial_number) == code).first()
+    if equipment is None:
+        equipment_code_index.add_miss(code)
+        return None
+
+    equipment_code_index.update(equipment)
+    return _load_with_state(equipment.id)
+
+
+def compliance_summary(equipment, state, today=None):
+    """
+    Compact status payload for the scanner
+
+    Args:
+        equipment: Equipment
+        state: EquipmentComplianceState (None before the first inspection)
+        today: Reference date (defaults to today)
+
+    Returns:
+        Dict with identity, refrigerant and compliance fields
+    """
+    today = today or datetime.now().date()
+    next_due = state.next_inspection_date if state else None
+
+    return {
+        'id': equipment.id,
+        'equipment_id': equipment.equipment_id,
+        'name': equipment.name,
+        'location': equipment.location,
+        'status': equipment.status,
+        'refrigerant': equipment.refrigerant_name,
+        'full_charge': equipment.full_charge,
+        'compliant': state.compliant if state else True,
+        'leak_rate': round(state.latest_annual_leak_rate, 2) if state and state.latest_annual_leak_rate is not None else None,
+        'leak_rate_threshold': equipment.leak_rate_threshold,
+        'last_inspection': state.last_inspection_date.isoformat() if state and state.last_inspection_date else None,
+        'next_inspection_due': next_due.isoformat() if next_due else None,
+        'inspection_overdue': bool(next_due and next_due < today),
+        'last_service': state.last_service_date.isoformat() if state and state.last_service_date else None,
+    }
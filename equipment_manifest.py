@@ -0,0 +1,106 @@
+"""
+Offline Equipment Manifest for EcoFreonTrack
+Compact, versioned list of active equipment for the scanner to resolve codes without signal.
+The version is the latest equipment/compliance change time, so clients sync only what changed.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import func, or_, case
+from models import db, Equipment, EquipmentComplianceState
+
+EPOCH = datetime(1970, 1, 1)
+
+# Manifest fields per equipment, in row order
+MANIFEST_FIELDS = ['id', 'equipment_id', 'serial_number', 'name', 'refrigerant', 'full_charge', 'next_inspection']
+
+
+def to_version(timestamp):
+    """Manifest version for a naive UTC timestamp (microseconds since the epoch)"""
+    if timestamp is None:
+        return 0
+    return (timestamp - EPOCH) // timedelta(microseconds=1)
+
+
+def from_version(version):
+    """Naive UTC timestamp for a manifest version"""
+    return EPOCH + timedelta(microseconds=version)
+
+
+def get_manifest_version():
+    """
+    Current manifest version and active equipment count, from two aggregates and no row loads
+
+    Returns:
+        tuple: (version: int, active_count: int)
+    """
+    equipment_changed, active_count = db.session.query(
+        func.max(Equipment.updated_at),
+        func.coalesce(func.sum(case((Equipment.status == 'Active', 1), else_=0)), 0)
+    ).one()
+    state_changed = db.session.query(func.max(EquipmentComplianceState.updated_at)).scalar()
+
+    changes = [ts for ts in (equipment_changed, state_changed) if ts is not None]
+    return to_version(max(changes) if changes else None), active_count
+
+
+def build_manifest(since=None, current=None):
+    """
+    Build the full manifest, or the delta since a previous version
+
+    Equipment whose own row or compliance rollup changed after since is returned
+    in 'equipment' when active, or in 'removed' (by database id) once retired or
+    disposed. Clients should resync in full when their row count differs from
+    'count', which also covers rows deleted outright.
+
+    Args:
+        since: Version the client already holds (None for the full manifest)
+        current: (version, count) from get_manifest_version, if already read
+
+    Returns:
+        Dict with version, count, fields, equipment rows and removed ids
+    """
+    version, active_count = current or get_manifest_version()
+
+    query = db.session.query(
+        Equipment.id,
+        Equipment.equipment_id,
+        Equipment.serial_number,
+        Equipment.name,
+        Equipment.refrigerant_name,
+        Equipment.full_charge,
+        Equipment.status,
+        EquipmentComplianceState.next_inspection_date
+    ).outerjoin(EquipmentComplianceState, EquipmentComplianceState.equipment_id == Equipment.id)
+
+    if since:
+        changed_after = from_version(since)
+        query = query.filter(or_(
+            Equipment.updated_at > changed_after,
+            EquipmentComplianceState.updated_at > changed_after
+        ))
+    else:
+        query = query.filter(Equipment.status == 'Active')
+
+    rows, removed = [], []
+    for row in query.order_by(Equipment.id):
+        if row.status != 'Active':
+            removed.append(row.id)
+            continue
+        # Positional rows keep the payload small; see MANIFEST_FIELDS
+        rows.append([
+            row.id,
+            row.equipment_id,
+            row.serial_number or None,
+            row.name,
+            row.refrigerant_name,
+            row.full_charge,
+            row.next_inspection_date.isoformat() if row.next_inspection_date else None
+        ])
+
+    return {
+        'version': version,
+        'since': since,
+        'count': active_count,
+        'fields': MANIFEST_FIELDS,
+        'equipment': rows,
+        'removed': removed
+    }
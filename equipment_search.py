@@ -0,0 +1,307 @@
+"""
+Equipment Full-Text Search for EcoFreonTrack
+Indexes equipment codes, descriptive fields and customer names in SQLite FTS5 or a
+Postgres tsvector (GIN) table, matching the configured database, and returns ranked matches
+
+Run directly to rebuild the search index:
+    python equipment_search.py
+"""
+import re
+from flask import request
+from sqlalchemy import text
+from models import db, Equipment, Customer
+from pagination import KeysetPage, InvalidCursor, encode_cursor, decode_cursor, get_page_size
+
+# Indexed fields, in FTS5 column order
+SEARCH_FIELDS = ('equipment_id', 'name', 'serial_number', 'model_number', 'manufacturer', 'location', 'customer_name')
+
+# Relevance weights - exact codes outrank descriptive text
+SQLITE_BM25_WEIGHTS = (10.0, 5.0, 8.0, 3.0, 2.0, 1.0, 2.0)
+POSTGRES_FIELD_WEIGHTS = {
+    'equipment_id': 'A',
+    'serial_number': 'A',
+    'name': 'B',
+    'model_number': 'C',
+    'manufacturer': 'C',
+    'customer_name': 'C',
+    'location': 'D',
+}
+
+
+def _is_postgres():
+    return db.engine.dialect.name == 'postgresql'
+
+
+def _postgres_vector():
+    """SQL expression building the weighted tsvector from bound field parameters"""
+    return ' || '.join(
+        f"setweight(to_tsvector('simple', coalesce(:{field}, '')), '{POSTGRES_FIELD_WEIGHTS[field]}')"
+        for field in SEARCH_FIELDS
+    )
+
+
+def ensure_search_index():
+    """Create the search index table if it does not exist yet"""
+    if _is_postgres():
+        statements = [
+            'CREATE TABLE IF NOT EXISTS equipment_search ('
+            'id INTEGER PRIMARY KEY REFERENCES equipment(id) ON DELETE CASCADE, '
+            'search_vector TSVECTOR NOT NULL)',
+            'CREATE INDEX IF NOT EXISTS ix_equipment_search_vector ON equipment_search USING GIN (search_vector)',
+        ]
+    else:
+        statements = [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS equipment_search USING fts5("
+            f"{', '.join(SEARCH_FIELDS)}, tokenize = 'unicode61')"
+        ]
+
+    for statement in statements:
+        db.session.execute(text(statement))
+    db.session.commit()
+
+
+def _search_documents(equipment_ids=None):
+    """Indexed field values per equipment, joined with the customer name"""
+    query = db.session.query(
+        Equipment.id,
+        Equipment.equipment_id,
+        Equipment.name,
+        Equipment.serial_number,
+        Equipment.model_number,
+        Equipment.manufacturer,
+        Equipment.location,
+        Customer.company_name.label('customer_name')
+    ).outerjoin(Customer, Customer.id == Equipment.customer_id)
+
+    if equipment_ids is not None:
+        query = query.filter(Equipment.id.in_(equipment_ids))
+
+    return [dict(row._mapping) for row in query]
+
+
+def _write_documents(documents, replace=True):
+    """Insert (or replace) index entries for the given documents"""
+    if not documents:
+        return
+
+    if _is_postgres():
+        db.session.execute(text(
+            f'INSERT INTO equipment_search (id, search_vector) VALUES (:id, {_postgres_vector()}) '
+            'ON CONFLICT (id) DO UPDATE SET search_vector = EXCLUDED.search_vector'
+        ), documents)
+    else:
+        if replace:
+            db.session.execute(
+                text('DELETE FROM equipment_search WHERE rowid = :id'),
+                [{'id': document['id']} for document in documents]
+            )
+        db.session.execute(text(
+            f"INSERT INTO equipment_search (rowid, {', '.join(SEARCH_FIELDS)}) "
+            f"VALUES (:id, {', '.join(':' + field for field in SEARCH_FIELDS)})"
+        ), documents)
+
+
+def index_equipment(*equipment):
+    """
+    Refresh the search entries for new or edited equipment
+
+    Runs inside the caller's session, so the index commits (or rolls back)
+    together with the equipment change.
+
+    Args:
+        *equipment: Equipment instances (pending or persistent)
+    """
+    # Assign ids to pending equipment
+    db.session.flush()
+    index_equipment_ids([e.id for e in equipment])
+
+
+def index_equipment_ids(equipment_ids):
+    """Refresh the search entries for equipment rows written without the ORM"""
+    if equipment_ids:
+        _write_documents(_search_documents(equipment_ids))
+
+
+def index_new_equipment(documents):
+    """
+    Add search entries for freshly inserted equipment without re-reading it
+
+    Args:
+        documents: Dicts with 'id', the SEARCH_FIELDS columns and 'customer_name'
+    """
+    _write_documents([
+        {'id': document['id'], **{field: document.get(field) for field in SEARCH_FIELDS}}
+        for document in documents
+    ], replace=False)
+
+
+def reindex_customer(customer_id):
+    """Refresh the search entries for all equipment of a renamed or removed customer"""
+    db.session.flush()
+    index_equipment_ids([row.id for row in db.session.query(Equipment.id).filter_by(customer_id=customer_id)])
+
+
+def rebuild_search_index():
+    """
+    Replace the search index with entries for all equipment
+
+    Returns:
+        Number of equipment indexed
+    """
+    ensure_search_index()
+    documents = _search_documents()
+
+    try:
+        db.session.execute(text('DELETE FROM equipment_search'))
+        _write_documents(documents)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return len(documents)
+
+
+def search_index_size():
+    """Number of entries in the search index"""
+    return db.session.execute(text('SELECT count(*) FROM equipment_search')).scalar()
+
+
+def _match_query(query_text):
+    """Search terms as an FTS5 / tsquery expression matching every word as a prefix, or None"""
+    terms = re.findall(r'[^\W_]+', query_text.lower())
+    if not terms:
+        return None
+    if _is_postgres():
+        return ' & '.join(f'{term}:*' for term in terms)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _ranked_matches(match, limit, position=None, backwards=False):
+    """
+    (id, rank) of matching entries in rank order, lower rank first, ties by id
+
+    Args:
+        match: Expression from _match_query
+        limit: Maximum rows
+        position: (rank, id) to continue after (or before, when backwards)
+        backwards: Scan towards better matches, nearest to position first
+
+    Returns:
+        List of (id, rank) rows in scan order
+    """
+    if _is_postgres():
+        # Negated so both databases sort best matches first in ascending order
+        ranked = ("SELECT id, -ts_rank(search_vector, to_tsquery('simple', :query)) AS rank "
+                  "FROM equipment_search WHERE search_vector @@ to_tsquery('simple', :query)")
+    else:
+        weights = ', '.join(str(weight) for weight in SQLITE_BM25_WEIGHTS)
+        ranked = (f"SELECT rowid AS id, bm25(equipment_search, {weights}) AS rank "
+                  "FROM equipment_search WHERE equipment_search MATCH :query")
+
+    params = {'query': match, 'limit': limit}
+    where = ''
+    if position:
+        op = '<' if backwards else '>'
+        where = f'WHERE rank {op} :rank OR (rank = :rank AND id {op} :id) '
+        params['rank'], params['id'] = position
+    order = 'rank DESC, id DESC' if backwards else 'rank, id'
+
+    return db.session.execute(text(
+        f'SELECT id, rank FROM ({ranked}) AS ranked {where}ORDER BY {order} LIMIT :limit'
+    ), params).all()
+
+
+def _load_ranked(ranked_ids):
+    """Equipment for ranked ids, in rank order (entries for deleted equipment are skipped)"""
+    if not ranked_ids:
+        return []
+    equipment = {e.id: e for e in Equipment.query.filter(Equipment.id.in_(ranked_ids))}
+    return [equipment[equipment_id] for equipment_id in ranked_ids if equipment_id in equipment]
+
+
+def search_equipment(query_text, limit=50):
+    """
+    Find equipment matching every word of a search query, best matches first
+
+    Each word matches as a prefix, so 'EQ-00' finds 'EQ-0012' and 'carr chill'
+    finds a Carrier chiller.
+
+    Args:
+        query_text: User search text
+        limit: Maximum results
+
+    Returns:
+        List of Equipment in rank order
+    """
+    match = _match_query(query_text)
+    if match is None:
+        return []
+    return _load_ranked([row.id for row in _ranked_matches(match, limit)])
+
+
+def search_equipment_page(query_text, page_size=None, after=None, before=None):
+    """
+    One page of search results, paged on (rank, id) like paginate_keyset
+
+    Args:
+        query_text: User search text
+        page_size: Results per page (defaults to get_page_size())
+        after: Cursor of the last result on the previous page
+        before: Cursor of the first result on the next page
+        (both default to the request's after/before query parameters)
+
+    Returns:
+        KeysetPage of Equipment in rank order
+
+    Raises:
+        InvalidCursor: If a cursor is malformed
+    """
+    page_size = page_size or get_page_size()
+    if after is None and before is None:
+        after = request.args.get('after') or None
+        before = request.args.get('before') or None
+
+    match = _match_query(query_text)
+    if match is None:
+        return KeysetPage([], page_size=page_size)
+
+    backwards = before is not None
+    cursor = before if backwards else after
+    position = None
+    if cursor:
+        rank, row_id = decode_cursor(cursor)
+        try:
+            position = (float(rank), row_id)
+        except (TypeError, ValueError) as e:
+            raise InvalidCursor(f'Invalid cursor: {cursor}') from e
+
+    rows = _ranked_matches(match, page_size + 1, position, backwards)
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+
+    next_cursor = prev_cursor = None
+    if rows:
+        first, last = encode_cursor(rows[0].rank, rows[0].id), encode_cursor(rows[-1].rank, rows[-1].id)
+        if backwards:
+            next_cursor, prev_cursor = last, first if has_more else None
+        else:
+            next_cursor, prev_cursor = last if has_more else None, first if cursor else None
+
+    return KeysetPage(_load_ranked([row.id for row in rows]), next_cursor=next_cursor,
+                      prev_cursor=prev_cursor, page_size=page_size)
+
+
+if __name__ == '__main__':
+    from app import app
+
+    print("=" * 60)
+    print("EcoFreonTrack - Rebuild Equipment Search Index")
+    print("=" * 60)
+
+    with app.app_context():
+        count = rebuild_search_index()
+
+    print(f"\n[OK] Indexed {count} equipment")
@@ -7,6 +7,7 @@ import uuid
 from datetime import datetime
 from werkzeug.utils import secure_filename
 from models import db, Document
+from dashboard_sections import invalidate_dashboard_sections
 
 # Allowed file extensions for different document types
 ALLOWED_EXTENSIONS = {
@@ -191,6 +192,7 @@ def create_document_record(file, document_type, description='',
 
         db.session.add(document)
         db.session.commit()
+        invalidate_dashboard_sections('document')
 
         return True, document.id
 
@@ -242,6 +244,7 @@ def delete_document(document_id):
     try:
         db.session.delete(document)
         db.session.commit()
+        invalidate_dashboard_sections('document')
         return True, 'Document deleted successfully'
     except Exception as e:
         db.session.rollback()
@@ -252,7 +255,29 @@ def get_documents_by_entity(equipment_id=None, technician_id=None,
                             service_log_id=None, leak_inspection_id=None,
                             refrigerant_transaction_id=None, document_type=None):
     """
-    Get all documents associated with an entity
+    Get all documents associated with an entity, newest first
+
+    Takes the same filters as documents_by_entity_query.
+
+    Returns:
+        List of Document objects
+    """
+    query = documents_by_entity_query(
+        equipment_id=equipment_id,
+        technician_id=technician_id,
+        service_log_id=service_log_id,
+        leak_inspection_id=leak_inspection_id,
+        refrigerant_transaction_id=refrigerant_transaction_id,
+        document_type=document_type
+    )
+    return query.order_by(Document.uploaded_at.desc()).all()
+
+
+def documents_by_entity_query(equipment_id=None, technician_id=None,
+                              service_log_id=None, leak_inspection_id=None,
+                              refrigerant_transaction_id=None, document_type=None):
+    """
+    Build the (unordered) query for active documents associated with an entity
 
     Args:
         equipment_id: Filter by equipment
@@ -263,7 +288,7 @@ def get_documents_by_entity(equipment_id=None, technician_id=None,
         document_type: Optional filter by document type
 
     Returns:
-        List of Document objects
+        Document query
     """
     query = Document.query.filter_by(status='Active')
 
@@ -280,7 +305,7 @@ def get_documents_by_entity(equipment_id=None, technician_id=None,
     if document_type:
         query = query.filter_by(document_type=document_type)
 
-    return query.order_by(Document.uploaded_at.desc()).all()
+    return query
 
 
 def format_file_size(size_bytes):
@@ -0,0 +1,276 @@
+"""
+Point-in-Time Refrigerant Balances for EcoFreonTrack
+Answers "what was our R-22 balance on a given date" from the transaction ledger,
+archived transactions included. Month-end checkpoints hold each refrigerant's running
+balance, so a query starts from the nearest checkpoint on or before the date and replays
+only the transactions after it - at most about a month of one refrigerant's ledger.
+
+Balances are ledger balances: on hand is purchased less added to equipment and disposed
+of, recovered is everything recovered. Stock entered without a transaction (e.g. an
+opening quantity) is not part of them.
+
+Transactions dated on or before existing checkpoints (backdated service logs) shift
+those checkpoints as they are recorded, so checkpoints stay correct without a rebuild.
+
+Run directly (e.g. nightly from cron):
+    python inventory_balances.py             # checkpoint every month ended since the last run
+    python inventory_balances.py --verify    # compare checkpoints against a full ledger replay
+    python inventory_balances.py --rebuild   # recompute all checkpoints from the ledger
+"""
+import sys
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, func, case, desc, union_all
+from models import db, RefrigerantInventory, RefrigerantTransaction, RefrigerantTransactionArchive, InventoryCheckpoint
+
+# Transaction types that take stock out of the on-hand balance (Purchase puts it in)
+ON_HAND_OUTFLOWS = ('Added', 'Disposed')
+
+
+# ============================================================================
+# LEDGER REPLAY
+# ============================================================================
+
+def _ledger(refrigerant_name=None, after=None, through=None):
+    """Hot and archived transactions, filtered in each branch so both use their refrigerant/date index"""
+    branches = []
+    for model in (RefrigerantTransaction, RefrigerantTransactionArchive):
+        branch = select(model.id, model.refrigerant_name, model.transaction_date, model.transaction_type, model.quantity)
+        if refrigerant_name is not None:
+            branch = branch.where(model.refrigerant_name == refrigerant_name)
+        if after is not None:
+            branch = branch.where(model.transaction_date > after)
+        if through is not None:
+            branch = branch.where(model.transaction_date <= through)
+        branches.append(branch)
+    return union_all(*branches).subquery()
+
+
+def _totals(ledger):
+    """(on hand, recovered, transaction count) aggregates of a ledger subquery"""
+    on_hand = case(
+        (ledger.c.transaction_type == 'Purchase', ledger.c.quantity),
+        (ledger.c.transaction_type.in_(ON_HAND_OUTFLOWS), -ledger.c.quantity),
+        else_=0.0
+    )
+    recovered = case((ledger.c.transaction_type == 'Recovered', ledger.c.quantity), else_=0.0)
+    return (
+        func.coalesce(func.sum(on_hand), 0.0),
+        func.coalesce(func.sum(recovered), 0.0),
+        func.count(ledger.c.id)
+    )
+
+
+def _refrigerant_names():
+    """Stocked refrigerants (transactions are only recorded for these)"""
+    return [name for (name,) in db.session.query(RefrigerantInventory.refrigerant_name).order_by(
+        RefrigerantInventory.refrigerant_name
+    )]
+
+
+def balance_at(refrigerant_name, as_of=None):
+    """
+    Ledger balance of one refrigerant at the end of a date
+
+    Args:
+        refrigerant_name: Refrigerant (e.g. 'R-22')
+        as_of: Date whose transactions are the last included (default today)
+
+    Returns:
+        Dict with the balances, the checkpoint started from and the number of
+        transactions replayed on top of it
+    """
+    as_of = as_of or datetime.now().date()
+    checkpoint = InventoryCheckpoint.query.filter(
+        InventoryCheckpoint.refrigerant_name == refrigerant_name,
+        InventoryCheckpoint.checkpoint_date <= as_of
+    ).order_by(desc(InventoryCheckpoint.checkpoint_date)).first()
+
+    ledger = _ledger(refrigerant_name, after=checkpoint.checkpoint_date if checkpoint else None, through=as_of)
+    on_hand, recovered, replayed = db.session.execute(select(*_totals(ledger))).one()
+
+    return {
+        'refrigerant_name': refrigerant_name,
+        'as_of': as_of.isoformat(),
+        'quantity_on_hand': round((checkpoint.quantity_on_hand if checkpoint else 0.0) + on_hand, 2),
+        'quantity_recovered': round((checkpoint.quantity_recovered if checkpoint else 0.0) + recovered, 2),
+        'checkpoint_date': checkpoint.checkpoint_date.isoformat() if checkpoint else None,
+        'transactions_replayed': replayed,
+    }
+
+
+def balances_at(as_of=None):
+    """Ledger balance of every stocked refrigerant at the end of a date (see balance_at)"""
+    return [balance_at(name, as_of) for name in _refrigerant_names()]
+
+
+# ============================================================================
+# CHECKPOINTS
+# ============================================================================
+
+def _month_end(day):
+    """Last day of day's month"""
+    next_month = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return next_month - timedelta(days=1)
+
+
+def apply_to_checkpoints(transaction_date, refrigerant_name, transaction_type, quantity, count=1):
+    """
+    Carry a transaction into the checkpoints dated on or after it
+
+    A no-op for transactions after the latest checkpoint, i.e. nearly all of
+    them. Runs inside the caller's session; the caller commits.
+    """
+    if transaction_type == 'Purchase':
+        on_hand, recovered = quantity, 0.0
+    elif transaction_type in ON_HAND_OUTFLOWS:
+        on_hand, recovered = -quantity, 0.0
+    elif transaction_type == 'Recovered':
+        on_hand, recovered = 0.0, quantity
+    else:
+        on_hand = recovered = 0.0
+
+    db.session.execute(update(InventoryCheckpoint).where(
+        InventoryCheckpoint.refrigerant_name == refrigerant_name,
+        InventoryCheckpoint.checkpoint_date >= transaction_date
+    ).values(
+        quantity_on_hand=InventoryCheckpoint.quantity_on_hand + on_hand,
+        quantity_recovered=InventoryCheckpoint.quantity_recovered + recovered,
+        transaction_count=InventoryCheckpoint.transaction_count + count
+    ).execution_options(synchronize_session=False))
+
+
+def checkpoint_balances(through=None):
+    """
+    Add a checkpoint at every month end since each refrigerant's latest one
+
+    Reads only the transactions after the latest checkpoint, grouped by day,
+    and carries the running balance forward month by month. A refrigerant
+    without checkpoints starts at the month of its first transaction.
+
+    Args:
+        through: Last date that may be checkpointed (default yesterday)
+
+    Returns:
+        Number of checkpoints written
+    """
+    through = through or datetime.now().date() - timedelta(days=1)
+    written = 0
+
+    try:
+        for refrigerant_name in _refrigerant_names():
+            latest = InventoryCheckpoint.query.filter_by(refrigerant_name=refrigerant_name).order_by(
+                desc(InventoryCheckpoint.checkpoint_date)
+            ).first()
+
+            ledger = _ledger(refrigerant_name, after=latest.checkpoint_date if latest else None, through=through)
+            days = db.session.execute(
+                select(ledger.c.transaction_date, *_totals(ledger))
+                .group_by(ledger.c.transaction_date).order_by(ledger.c.transaction_date)
+            ).all()
+
+            if latest:
+                on_hand, recovered, count = latest.quantity_on_hand, latest.quantity_recovered, latest.transaction_count
+                month_end = _month_end(latest.checkpoint_date + timedelta(days=1))
+            elif days:
+                on_hand, recovered, count = 0.0, 0.0, 0
+                month_end = _month_end(days[0].transaction_date)
+            else:
+                continue
+
+            day = 0
+            while month_end <= through:
+                while day < len(days) and days[day].transaction_date <= month_end:
+                    on_hand += days[day][1]
+                    recovered += days[day][2]
+                    count += days[day][3]
+                    day += 1
+                db.session.add(InventoryCheckpoint(
+                    refrigerant_name=refrigerant_name,
+                    checkpoint_date=month_end,
+                    quantity_on_hand=on_hand,
+                    quantity_recovered=recovered,
+                    transaction_count=count
+                ))
+                written += 1
+                month_end = _month_end(month_end + timedelta(days=1))
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return written
+
+
+def rebuild_checkpoints(through=None):
+    """
+    Replace every checkpoint with balances recomputed from the whole ledger
+
+    Returns:
+        Number of checkpoints written
+    """
+    try:
+        InventoryCheckpoint.query.delete()
+        db.session.flush()
+    except Exception:
+        db.session.rollback()
+        raise
+    return checkpoint_balances(through)
+
+
+def verify_checkpoints(tolerance=0.001):
+    """
+    Compare every checkpoint against a full replay of the ledger up to its date
+
+    Args:
+        tolerance: Allowed difference in pounds (float rounding)
+
+    Returns:
+        List of dicts describing each checkpoint that drifted
+    """
+    drifted = []
+    for checkpoint in InventoryCheckpoint.query.order_by(
+        InventoryCheckpoint.refrigerant_name, InventoryCheckpoint.checkpoint_date
+    ):
+        ledger = _ledger(checkpoint.refrigerant_name, through=checkpoint.checkpoint_date)
+        on_hand, recovered, count = db.session.execute(select(*_totals(ledger))).one()
+        if (abs(on_hand - checkpoint.quantity_on_hand) > tolerance
+                or abs(recovered - checkpoint.quantity_recovered) > tolerance
+                or count != checkpoint.transaction_count):
+            drifted.append({
+                'refrigerant_name': checkpoint.refrigerant_name,
+                'checkpoint_date': checkpoint.checkpoint_date,
+                'checkpoint_on_hand': round(checkpoint.quantity_on_hand, 3),
+                'ledger_on_hand': round(on_hand, 3),
+                'checkpoint_recovered': round(checkpoint.quantity_recovered, 3),
+                'ledger_recovered': round(recovered, 3),
+                'checkpoint_count': checkpoint.transaction_count,
+                'ledger_count': count
+            })
+    return drifted
+
+
+if __name__ == '__main__':
+    from app import app
+
+    print("=" * 60)
+    print("EcoFreonTrack - Inventory Balance Checkpoints")
+    print("=" * 60)
+
+    with app.app_context():
+        if '--verify' in sys.argv:
+            drifted = verify_checkpoints()
+            if not drifted:
+                print("\n[OK] Checkpoints match the transaction ledger")
+            else:
+                print(f"\n[!] {len(drifted)} checkpoints differ from the ledger:")
+                for d in drifted:
+                    print(f"  {d['checkpoint_date']} {d['refrigerant_name']}: "
+                          f"checkpoint {d['checkpoint_on_hand']}/{d['checkpoint_recovered']} lbs, {d['checkpoint_count']} tx; "
+                          f"ledger {d['ledger_on_hand']}/{d['ledger_recovered']} lbs, {d['ledger_count']} tx")
+                print("\nRun with --rebuild to recompute the checkpoints from the ledger.")
+                sys.exit(1)
+        elif '--rebuild' in sys.argv:
+            print(f"\n[OK] Rebuilt {rebuild_checkpoints()} checkpoints from the ledger")
+        else:
+            print(f"\n[OK] {checkpoint_balances()} new checkpoints")
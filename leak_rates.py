@@ -0,0 +1,653 @@
+"""
+Leak Rate Recomputation for EcoFreonTrack
+Recomputes charge_deficit, annual_leak_rate and compliant for the whole inspection
+history with NumPy, writes back only the rows that changed, and answers "what-if"
+threshold questions without touching the database. Single inserts and edits recompute
+just the downstream window of the affected unit.
+
+Also maintains the EPA 40 CFR 82.157 leak rate stored on each service log that adds
+refrigerant, by both the annualizing and the rolling-average method.
+
+Run directly:
+    python leak_rates.py                   # recompute and save (inspections and service logs)
+    python leak_rates.py --dry-run         # report what would change
+    python leak_rates.py --threshold 15    # what-if: every unit at a 15% threshold
+"""
+import sys
+from datetime import datetime, date, timedelta
+import numpy as np
+from sqlalchemy import select, update, bindparam, func, literal, literal_column, true, union_all, and_, or_
+from models import (
+    db, Equipment, LeakInspection, ServiceLog, EquipmentComplianceState, ComplianceAlert,
+    LeakInspectionArchive, ServiceLogArchive
+)
+from compliance_alerts import raise_alert
+
+# Model default, used for equipment without a threshold
+DEFAULT_LEAK_RATE_THRESHOLD = 10.0
+
+# Rows per executemany write
+RECOMPUTE_BATCH_SIZE = 10000
+
+# Alerts raised for inspections over the unit's threshold
+LEAK_RATE_ALERT_TYPE = 'Leak Rate Exceeded'
+
+# Day numbers count from 1970-01-01
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# EPA 40 CFR 82.157 leak rate period
+LEAK_RATE_PERIOD_DAYS = 365
+
+
+# ============================================================================
+# LOADING
+# ============================================================================
+
+
+def _day_number(column):
+    """A date column as days since 1970-01-01, computed by the database"""
+    if db.engine.dialect.name == 'postgresql':
+        return column - literal_column("DATE '1970-01-01'")
+    return func.julianday(column) - 2440587.5
+
+
+# Column layout of _series_query: (name, dtype, value for NULL)
+INSPECTION_COLUMNS = (
+    ('id', np.int64, 0),
+    ('equipment_id', np.int64, 0),
+    ('day', np.int64, 0),
+    ('charge', np.float64, np.nan),
+    ('deficit', np.float64, np.nan),
+    ('rate', np.float64, np.nan),
+    # Unset compliance counts as compliant, as in the compliance rollup
+    ('compliant', bool, True),
+    ('threshold', np.float64, DEFAULT_LEAK_RATE_THRESHOLD),
+    ('archived', bool, False),
+)
+
+
+def _hot_and_archived(columns, sources, condition=None):
+    """
+    UNION ALL of the same columns from a hot table and its archive, plus an archived flag
+
+    Archived rows keep chains that cross the archive boundary intact; only hot
+    rows are ever written back.
+
+    Args:
+        columns: Callable(model) -> list of columns to select
+        sources: (hot model, archive model), each joined to its Equipment
+        condition: Optional callable(model) -> where clause for both tables
+    """
+    selects = []
+    for model, archived in zip(sources, (False, True)):
+        query = select(*columns(model), literal(archived)).join(Equipment, Equipment.id == model.equipment_id)
+        if condition is not None:
+            query = query.where(condition(model))
+        selects.append(query)
+    return union_all(*selects)
+
+
+def _series_query(condition=None):
+    """Inspection columns the leak-rate chain needs, with each unit's threshold"""
+    return _hot_and_archived(lambda model: [
+        model.id,
+        model.equipment_id,
+        _day_number(model.inspection_date),
+        model.current_charge,
+        model.charge_deficit,
+        model.annual_leak_rate,
+        model.compliant,
+        Equipment.leak_rate_threshold
+    ], (LeakInspection, LeakInspectionArchive), condition)
+
+
+def _fetch_series(query, columns=INSPECTION_COLUMNS):
+    """
+    Run a query as column arrays, ordered by equipment, day and id
+
+    Args:
+        query: Select whose columns match the columns layout (including id, equipment_id and day)
+        columns: (name, dtype, value for NULL) per selected column
+
+    Returns:
+        Dict of NumPy arrays (empty arrays when there are no rows)
+    """
+    # Make pending changes (e.g. a new inspection or edited threshold) visible to the raw query below
+    db.session.flush()
+
+    # Raw DBAPI tuples: every column is numeric, and building Row objects
+    # costs more than the whole computation at millions of rows
+    result = db.session.connection().execute(query)
+    rows = result.cursor.fetchall()
+    result.close()
+
+    table = np.array(rows, dtype=object).reshape(len(rows), len(columns))
+
+    series = {}
+    for index, (name, dtype, fill) in enumerate(columns):
+        values = np.where(np.equal(table[:, index], None), fill, table[:, index])
+        if dtype is np.int64:
+            # Day numbers arrive as floats on SQLite
+            values = np.rint(values.astype(np.float64))
+        series[name] = values.astype(dtype)
+
+    order = np.lexsort((series['id'], series['day'], series['equipment_id']))
+    return {name: values[order] for name, values in series.items()}
+
+
+def _load_series(equipment_ids=None):
+    """Inspection history of all (or the given) equipment as column arrays"""
+    if equipment_ids is None:
+        return _fetch_series(_series_query())
+    return _fetch_series(_series_query(lambda model: model.equipment_id.in_(equipment_ids)))
+
+
+# ============================================================================
+# COMPUTATION
+# ============================================================================
+
+def compute_leak_rates(series, thresholds=None):
+    """
+    Leak-rate chain for ordered inspection series, mirroring leak_inspection_add
+
+    Each inspection is compared with the previous inspection of the same
+    equipment; the rate is only defined when that inspection recorded a charge
+    and is at least a day earlier. Inspections without a rate are compliant.
+
+    Args:
+        series: Arrays from _load_series
+        thresholds: Optional what-if threshold - a number for every unit or a
+                    dict of equipment id -> threshold (others keep their own)
+
+    Returns:
+        tuple: (deficit, rate, compliant) arrays, NaN where undefined
+    """
+    count = len(series['id'])
+    deficit = np.full(count, np.nan)
+    rate = np.full(count, np.nan)
+    compliant = np.ones(count, dtype=bool)
+    if count < 2:
+        return deficit, rate, compliant
+
+    threshold = series['threshold']
+    if isinstance(thresholds, dict):
+        if thresholds:
+            keys = np.fromiter(thresholds.keys(), dtype=np.int64, count=len(thresholds))
+            values = np.fromiter(thresholds.values(), dtype=np.float64, count=len(thresholds))
+            order = np.argsort(keys)
+            keys, values = keys[order], values[order]
+            position = np.minimum(np.searchsorted(keys, series['equipment_id']), len(keys) - 1)
+            threshold = np.where(keys[position] == series['equipment_id'], values[position], threshold)
+    elif thresholds is not None:
+        threshold = np.full(count, float(thresholds))
+
+    previous_charge = series['charge'][:-1]
+    current_charge = series['charge'][1:]
+    days = series['day'][1:] - series['day'][:-1]
+
+    with np.errstate(invalid='ignore'):
+        defined = (
+            (series['equipment_id'][1:] == series['equipment_id'][:-1])
+            & ~np.isnan(previous_charge) & (previous_charge != 0)
+            & ~np.isnan(current_charge)
+            & (days > 0)
+        )
+
+    lost = previous_charge[defined] - current_charge[defined]
+    annual = (lost / previous_charge[defined]) * (365.0 / days[defined]) * 100
+
+    later = np.flatnonzero(defined) + 1
+    deficit[later] = lost
+    rate[later] = annual
+    compliant[later] = annual <= threshold[later]
+
+    return deficit, rate, compliant
+
+
+def _differs(stored, computed):
+    """Elementwise 'value changed' for float columns where NaN means NULL"""
+    return ~np.isclose(stored, computed, rtol=1e-9, atol=1e-12, equal_nan=True)
+
+
+def _nullable(values):
+    """Float array to Python values with None for NaN"""
+    return [None if value != value else value for value in values.tolist()]
+
+
+# ============================================================================
+# RECOMPUTE / WHAT-IF
+# ============================================================================
+
+def _run(equipment_ids, thresholds, dry_run):
+    series = _load_series(equipment_ids)
+    deficit, rate, compliant = compute_leak_rates(series, thresholds)
+
+    changed = np.flatnonzero(~series['archived'] & (
+        _differs(series['deficit'], deficit)
+        | _differs(series['rate'], rate)
+        | (series['compliant'] != compliant)
+    ))
+
+    # A unit's status is the result of its latest inspection
+    latest = np.flatnonzero(np.append(series['equipment_id'][1:] != series['equipment_id'][:-1], True)) \
+        if len(series['id']) else np.empty(0, dtype=np.int64)
+    flipped = latest[series['compliant'][latest] != compliant[latest]]
+
+    codes = dict(db.session.query(Equipment.id, Equipment.equipment_id).filter(
+        Equipment.id.in_(series['equipment_id'][flipped].tolist())
+    )) if len(flipped) else {}
+
+    report = {
+        'inspections': int(np.count_nonzero(~series['archived'])),
+        'changed_inspections': int(len(changed)),
+        'status_changes': [
+            {
+                'equipment_id': int(series['equipment_id'][i]),
+                'equipment_code': codes.get(int(series['equipment_id'][i])),
+                'compliant_before': bool(series['compliant'][i]),
+                'compliant_after': bool(compliant[i]),
+                'annual_leak_rate': None if np.isnan(rate[i]) else round(float(rate[i]), 2),
+            }
+            for i in flipped
+        ],
+        'dry_run': dry_run,
+    }
+
+    if not dry_run and len(changed):
+        _write_back(series, deficit, rate, compliant, changed, latest)
+
+    return report
+
+
+def _bulk_update(model, ids, **columns):
+    """
+    Update many rows by primary key with executemany UPDATEs
+
+    Args:
+        model: Mapped class (its table needs id and updated_at)
+        ids: Primary keys
+        **columns: Column name -> values aligned with ids
+    """
+    table = model.__table__
+    statement = update(table).where(table.c.id == bindparam('key')).values(
+        updated_at=datetime.utcnow(),
+        **{name: bindparam(f'new_{name}') for name in columns}
+    )
+    for start in range(0, len(ids), RECOMPUTE_BATCH_SIZE):
+        end = start + RECOMPUTE_BATCH_SIZE
+        db.session.execute(statement, [
+            {'key': key, **{f'new_{name}': values[offset] for name, values in columns.items()}}
+            for offset, key in enumerate(ids[start:end], start=start)
+        ])
+
+    # The UPDATEs bypass the ORM, so reload any of these rows already in the session
+    updated = set(ids)
+    for obj in list(db.session.identity_map.values()):
+        if isinstance(obj, model) and obj.id in updated:
+            db.session.expire(obj)
+
+
+def _write_inspections(series, deficit, rate, compliant, changed):
+    """Bulk-update the given inspection rows with their recomputed values"""
+    _bulk_update(
+        LeakInspection,
+        series['id'][changed].tolist(),
+        charge_deficit=_nullable(deficit[changed]),
+        annual_leak_rate=_nullable(rate[changed]),
+        compliant=compliant[changed].tolist()
+    )
+
+
+def _write_back(series, deficit, rate, compliant, changed, latest):
+    """Bulk-update changed inspections, the compliance rollup and the leak-rate alerts of affected units"""
+    _write_inspections(series, deficit, rate, compliant, changed)
+
+    # Units whose latest inspection changed status get their alert raised or resolved,
+    # from the unit's own rows exactly as the incremental path does
+    first = np.append(0, latest[:-1] + 1)
+    for start, end in zip(first.tolist(), latest.tolist()):
+        if series['compliant'][end] == compliant[end]:
+            continue
+        rows = slice(start, end + 1)
+        _reconcile_alerts(
+            int(series['equipment_id'][end]),
+            {name: values[rows] for name, values in series.items()},
+            rate[rows], compliant[rows],
+            changed[(changed >= start) & (changed <= end)] - start
+        )
+
+    # The rollup mirrors each unit's latest inspection
+    latest_changed = np.intersect1d(latest, changed, assume_unique=True)
+    if len(latest_changed):
+        state = EquipmentComplianceState.__table__
+        db.session.execute(
+            update(state).where(state.c.equipment_id == bindparam('key')).values(
+                latest_annual_leak_rate=bindparam('rate'),
+                compliant=bindparam('ok'),
+                updated_at=datetime.utcnow()
+            ),
+            [
+                {'key': key, 'rate': r, 'ok': ok}
+                for key, r, ok in zip(
+                    series['equipment_id'][latest_changed].tolist(),
+                    _nullable(rate[latest_changed]), compliant[latest_changed].tolist()
+                )
+            ]
+        )
+
+
+def recompute_leak_rates(equipment_ids=None, dry_run=False):
+    """
+    Recompute leak rates from inspection history and save the rows that changed
+
+    Runs inside the caller's session; the caller commits.
+
+    Args:
+        equipment_ids: Limit to these equipment (default all)
+        dry_run: Report the changes without writing them
+
+    Returns:
+        Dict report with inspections, changed_inspections, status_changes
+        ([{'equipment_id', 'equipment_code', 'compliant_before', 'compliant_after',
+        'annual_leak_rate'}]) and dry_run
+    """
+    return _run(equipment_ids, None, dry_run)
+
+
+def what_if_thresholds(thresholds, equipment_ids=None):
+    """
+    Report which units would change compliance status under other thresholds
+
+    Never writes - hypothetical thresholds must not reach stored compliance.
+
+    Args:
+        thresholds: A threshold for every unit, or a dict of equipment id -> threshold
+        equipment_ids: Limit to these equipment (default all)
+
+    Returns:
+        Dict report as from recompute_leak_rates
+    """
+    return _run(equipment_ids, thresholds, True)
+
+
+# ============================================================================
+# INCREMENTAL RECOMPUTE
+# ============================================================================
+
+def leak_rate_alert_text(equipment, annual_leak_rate):
+    """Title and message of a leak-rate alert"""
+    return (
+        f'Equipment {equipment.equipment_id}: Leak Rate Exceeds Threshold',
+        f'Annual leak rate of {annual_leak_rate:.2f}% exceeds threshold of {equipment.leak_rate_threshold}%. '
+        f'Immediate repair required per 40 CFR 82.156.'
+    )
+
+
+def _reconcile_alerts(equipment_id, series, rate, compliant, indices):
+    """
+    Bring the unit's leak-rate alert in line with recomputed inspections
+
+    Each recomputed inspection that newly exceeds the threshold is an occurrence
+    of the unit's single active alert. The alert follows the unit's latest
+    inspection (the last row of the window): raised or refreshed while it
+    exceeds the threshold, resolved once it is back within it.
+    """
+    occurrences = int(np.count_nonzero(series['compliant'][indices] & ~compliant[indices]))
+    latest = len(series['id']) - 1
+    latest_date = date.fromordinal(EPOCH_ORDINAL + int(series['day'][latest]))
+
+    if compliant[latest]:
+        db.session.execute(update(ComplianceAlert).where(
+            ComplianceAlert.equipment_id == equipment_id,
+            ComplianceAlert.alert_type == LEAK_RATE_ALERT_TYPE,
+            ComplianceAlert.status == 'Active'
+        ).values(
+            status='Resolved',
+            resolved_date=datetime.now().date(),
+            resolved_by='System',
+            resolution_notes='Leak rate recomputed within threshold',
+            updated_at=datetime.utcnow()
+        ).execution_options(synchronize_session='fetch'))
+        return
+
+    title, message = leak_rate_alert_text(db.session.get(Equipment, equipment_id), float(rate[latest]))
+    raise_alert(
+        LEAK_RATE_ALERT_TYPE, 'Critical', title, message,
+        equipment_id=equipment_id, alert_date=latest_date, occurrences=occurrences
+    )
+
+
+def recompute_inspection_window(equipment_id, since_date, since_id=0):
+    """
+    Recompute one unit's inspections from a point in its history onwards
+
+    Use after inserting, editing or deleting an inspection: every inspection
+    ordered at or after (since_date, since_id) is recomputed against its
+    predecessor, so a backdated entry fixes the rows that now chain from it.
+    The window and its anchor inspection are read in one query, and leak-rate
+    alerts for changed inspections are reconciled. Runs inside the caller's
+    session; the caller commits.
+
+    Args:
+        equipment_id: Equipment database ID
+        since_date: Date of the earliest inserted/edited/removed inspection
+        since_id: Its id (inspections on since_date with a lower id are untouched)
+
+    Returns:
+        Number of inspections whose stored values changed
+    """
+    def earlier(model):
+        return and_(
+            model.equipment_id == equipment_id,
+            or_(
+                model.inspection_date < since_date,
+                and_(model.inspection_date == since_date, model.id < since_id)
+            )
+        )
+
+    # The anchor may have been archived (e.g. for an entry backdated into archived history)
+    anchor_dates = union_all(*[
+        select(func.max(model.inspection_date).label('inspection_date')).where(earlier(model))
+        for model in (LeakInspection, LeakInspectionArchive)
+    ]).subquery()
+    anchor_date = select(func.max(anchor_dates.c.inspection_date)).scalar_subquery()
+
+    series = _fetch_series(_series_query(lambda model: and_(
+        model.equipment_id == equipment_id,
+        model.inspection_date >= func.coalesce(anchor_date, since_date)
+    )))
+    deficit, rate, compliant = compute_leak_rates(series)
+
+    since_day = since_date.toordinal() - EPOCH_ORDINAL
+    window = ~series['archived'] & (
+        (series['day'] > since_day) | ((series['day'] == since_day) & (series['id'] >= since_id))
+    )
+    changed = np.flatnonzero(window & (
+        _differs(series['deficit'], deficit)
+        | _differs(series['rate'], rate)
+        | (series['compliant'] != compliant)
+    ))
+
+    if len(changed):
+        _write_inspections(series, deficit, rate, compliant, changed)
+        _reconcile_alerts(equipment_id, series, rate, compliant, changed)
+
+    return int(len(changed))
+
+
+# ============================================================================
+# EPA 82.157 LEAK RATES FROM REFRIGERANT ADDITIONS
+# ============================================================================
+
+# Column layout of _additions_query
+ADDITION_COLUMNS = (
+    ('id', np.int64, 0),
+    ('equipment_id', np.int64, 0),
+    ('day', np.int64, 0),
+    ('added', np.float64, 0.0),
+    ('full_charge', np.float64, np.nan),
+    ('annualized', np.float64, np.nan),
+    ('rolling', np.float64, np.nan),
+    ('archived', bool, False),
+)
+
+
+def _additions_query(condition=None):
+    """Service logs that added refrigerant, with each unit's full charge"""
+    return _hot_and_archived(lambda model: [
+        model.id,
+        model.equipment_id,
+        _day_number(model.service_date),
+        model.refrigerant_added,
+        Equipment.full_charge,
+        model.annualized_leak_rate,
+        model.rolling_average_leak_rate
+    ], (ServiceLog, ServiceLogArchive), lambda model: and_(
+        model.refrigerant_added > 0,
+        condition(model) if condition is not None else true()
+    ))
+
+
+def compute_epa_leak_rates(series):
+    """
+    EPA 82.157 leak rates for ordered refrigerant additions
+
+    Annualizing method: added / full charge * 365 / days since the previous
+    addition (at most 365; 365 for a unit's first addition) * 100.
+    Rolling-average method: refrigerant added over the 365 days ending on this
+    addition / full charge * 100, from per-equipment prefix sums.
+
+    Args:
+        series: Arrays laid out as ADDITION_COLUMNS, ordered by equipment, day and id
+
+    Returns:
+        tuple: (annualized, rolling) arrays, NaN for units without a full charge
+    """
+    count = len(series['id'])
+    equipment, day, added, full_charge = series['equipment_id'], series['day'], series['added'], series['full_charge']
+    if not count:
+        return np.empty(0), np.empty(0)
+
+    same_unit = equipment[1:] == equipment[:-1]
+    gap = np.full(count, LEAK_RATE_PERIOD_DAYS, dtype=np.int64)
+    gap[1:] = np.where(same_unit, day[1:] - day[:-1], LEAK_RATE_PERIOD_DAYS)
+    # Same-day additions count as a one-day gap
+    gap = np.clip(gap, 1, LEAK_RATE_PERIOD_DAYS)
+
+    # Offset each unit's days far apart so one sorted key keeps windows inside a unit
+    unit = np.concatenate(([0], np.cumsum(~same_unit)))
+    key = unit * 10_000_000 + day
+    cumulative = np.cumsum(added)
+    window_start = np.searchsorted(key, key - LEAK_RATE_PERIOD_DAYS, side='right')
+    window_total = cumulative - np.where(window_start > 0, cumulative[np.maximum(window_start - 1, 0)], 0.0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        valid = ~np.isnan(full_charge) & (full_charge > 0)
+        annualized = np.where(valid, added / full_charge * (365.0 / gap) * 100, np.nan)
+        rolling = np.where(valid, window_total / full_charge * 100, np.nan)
+
+    return annualized, rolling
+
+
+def _write_epa_rates(series, annualized, rolling, rows):
+    """Save recomputed EPA rates for the given rows when they changed"""
+    changed = rows[
+        _differs(series['annualized'][rows], annualized[rows])
+        | _differs(series['rolling'][rows], rolling[rows])
+    ]
+    if len(changed):
+        _bulk_update(
+            ServiceLog,
+            series['id'][changed].tolist(),
+            annualized_leak_rate=_nullable(annualized[changed]),
+            rolling_average_leak_rate=_nullable(rolling[changed])
+        )
+    return int(len(changed))
+
+
+def recompute_service_leak_rates(equipment_ids=None):
+    """
+    Recompute the EPA leak rates stored on service logs from the addition history
+
+    Runs inside the caller's session; the caller commits.
+
+    Args:
+        equipment_ids: Limit to these equipment (default all)
+
+    Returns:
+        Number of service logs whose stored rates changed
+    """
+    condition = None
+    if equipment_ids is not None:
+        condition = lambda model: model.equipment_id.in_(equipment_ids)
+
+    series = _fetch_series(_additions_query(condition), ADDITION_COLUMNS)
+    annualized, rolling = compute_epa_leak_rates(series)
+    return _write_epa_rates(series, annualized, rolling, np.flatnonzero(~series['archived']))
+
+
+def recompute_service_window(equipment_id, since_date):
+    """
+    Recompute EPA leak rates after a refrigerant addition on since_date
+
+    Only additions within a year after since_date can change: later ones have
+    neither it in their rolling window nor a gap shorter than the 365-day cap.
+    The window plus the year of context before it is read in one query. Runs
+    inside the caller's session; the caller commits.
+
+    Args:
+        equipment_id: Equipment database ID
+        since_date: Service date of the new or edited addition
+
+    Returns:
+        Number of service logs whose stored rates changed
+    """
+    period = timedelta(days=LEAK_RATE_PERIOD_DAYS)
+    series = _fetch_series(_additions_query(lambda model: and_(
+        model.equipment_id == equipment_id,
+        model.service_date >= since_date - period,
+        model.service_date <= since_date + period
+    )), ADDITION_COLUMNS)
+    annualized, rolling = compute_epa_leak_rates(series)
+
+    since_day = since_date.toordinal() - EPOCH_ORDINAL
+    return _write_epa_rates(series, annualized, rolling, np.flatnonzero((series['day'] >= since_day) & ~series['archived']))
+
+
+if __name__ == '__main__':
+    import time
+    from app import app
+
+    dry_run = '--dry-run' in sys.argv
+    threshold = None
+    if '--threshold' in sys.argv:
+        threshold = float(sys.argv[sys.argv.index('--threshold') + 1])
+
+    print("=" * 60)
+    print("EcoFreonTrack - Recompute Leak Rates")
+    print("=" * 60)
+
+    with app.app_context():
+        started = time.perf_counter()
+        if threshold is not None:
+            report = what_if_thresholds(threshold)
+        else:
+            report = recompute_leak_rates(dry_run=dry_run)
+            if not dry_run:
+                service_logs = recompute_service_leak_rates()
+                db.session.commit()
+                print(f"\nService logs with updated EPA leak rates: {service_logs}")
+        elapsed = time.perf_counter() - started
+
+    print(f"\nInspections: {report['inspections']}  Changed: {report['changed_inspections']}  ({elapsed:.2f}s)")
+    for change in report['status_changes'][:50]:
+        before = 'compliant' if change['compliant_before'] else 'non-compliant'
+        after = 'compliant' if change['compliant_after'] else 'non-compliant'
+        print(f"  {change['equipment_code']}: {before} -> {after} (leak rate {change['annual_leak_rate']}%)")
+    if len(report['status_changes']) > 50:
+        print(f"  ... and {len(report['status_changes']) - 50} more")
+
+    if report['dry_run']:
+        print("\n[i] Dry run - nothing saved")
+    else:
+        print("\n[OK] Leak rates saved")
@@ -39,7 +39,7 @@ class Equipment(db.Model):
 
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)  # manifest delta sync
 
     # Relationships
     service_logs = db.relationship('ServiceLog', backref='equipment', lazy=True, cascade='all, delete-orphan')
@@ -47,6 +47,12 @@ class Equipment(db.Model):
     refrigerant_transactions = db.relationship('RefrigerantTransaction', backref='equipment', lazy=True, cascade='all, delete-orphan')
     documents = db.relationship('Document', backref='equipment', lazy=True, foreign_keys='Document.equipment_id')
 
+    __table_args__ = (
+        # Case-insensitive scanner lookups (equipment_lookup.py)
+        db.Index('ix_equipment_upper_equipment_id', db.func.upper(equipment_id)),
+        db.Index('ix_equipment_upper_serial_number', db.func.upper(serial_number)),
+    )
+
     def __repr__(self):
         return f'<Equipment {self.equipment_id}: {self.name}>'
 
@@ -102,6 +108,10 @@ class ServiceLog(db.Model):
     refrigerant_added = db.Column(db.Float, default=0.0)  # pounds
     refrigerant_recovered = db.Column(db.Float, default=0.0)  # pounds
 
+    # EPA 40 CFR 82.157 leak rate at this addition (set when refrigerant_added > 0)
+    annualized_leak_rate = db.Column(db.Float)  # percentage per year, annualizing method
+    rolling_average_leak_rate = db.Column(db.Float)  # percentage, rolling-average method
+
     # Service details
     work_performed = db.Column(db.Text)
     leak_found = db.Column(db.Boolean, default=False)
@@ -120,6 +130,15 @@ class ServiceLog(db.Model):
     # Relationships
     documents = db.relationship('Document', backref='service_log', lazy=True, foreign_keys='Document.service_log_id')
 
+    __table_args__ = (
+        # Keyset pagination order (sort key, id)
+        db.Index('ix_service_log_date_id', 'service_date', 'id'),
+        # Per-equipment service history (leak-rate windows)
+        db.Index('ix_service_log_equipment_date', 'equipment_id', 'service_date'),
+        # Archived rows keep their ids, so SQLite must never hand them out again
+        {'sqlite_autoincrement': True},
+    )
+
     def __repr__(self):
         return f'<ServiceLog {self.id}: {self.service_type} on {self.service_date}>'
 
@@ -161,16 +180,52 @@ class LeakInspection(db.Model):
     # Relationships
     documents = db.relationship('Document', backref='leak_inspection', lazy=True, foreign_keys='Document.leak_inspection_id')
 
+    __table_args__ = (
+        # Keyset pagination order (sort key, id)
+        db.Index('ix_leak_inspection_date_id', 'inspection_date', 'id'),
+        # Per-equipment inspection history (leak-rate windows, archival)
+        db.Index('ix_leak_inspection_equipment_date', 'equipment_id', 'inspection_date'),
+        # Archived rows keep their ids, so SQLite must never hand them out again
+        {'sqlite_autoincrement': True},
+    )
+
     def __repr__(self):
         return f'<LeakInspection {self.id}: Equipment {self.equipment_id} on {self.inspection_date}>'
 
 
+class EquipmentComplianceState(db.Model):
+    """Per-equipment compliance rollup, maintained on every inspection and service log write"""
+    __tablename__ = 'equipment_compliance_state'
+
+    equipment_id = db.Column(db.Integer, db.ForeignKey('equipment.id'), primary_key=True)
+
+    # Latest leak inspection
+    last_inspection_date = db.Column(db.Date)
+    next_inspection_date = db.Column(db.Date, index=True)
+    latest_annual_leak_rate = db.Column(db.Float)  # percentage per year
+    compliant = db.Column(db.Boolean, default=True)
+
+    # Latest service
+    last_service_date = db.Column(db.Date, index=True)
+
+    # Timestamps
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    # Relationships
+    equipment = db.relationship('Equipment', backref=db.backref('compliance_state', uselist=False, cascade='all, delete-orphan'))
+
+    def __repr__(self):
+        return f'<EquipmentComplianceState {self.equipment_id}: compliant={self.compliant}>'
+
+
 class RefrigerantTransaction(db.Model):
     """Refrigerant purchase, usage, recovery, and disposal records"""
     __tablename__ = 'refrigerant_transaction'
 
     id = db.Column(db.Integer, primary_key=True)
     equipment_id = db.Column(db.Integer, db.ForeignKey('equipment.id'), nullable=True)
+    # Owner of the equipment when the transaction was recorded (usage stays with it after reassignment)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=True)
 
     transaction_date = db.Column(db.Date, nullable=False)
     transaction_type = db.Column(db.String(50), nullable=False)  # Purchase, Added, Recovered, Disposed
@@ -200,10 +255,65 @@ class RefrigerantTransaction(db.Model):
     # Relationships
     documents = db.relationship('Document', backref='refrigerant_transaction', lazy=True, foreign_keys='Document.refrigerant_transaction_id')
 
+    # Date scans (archival)
+    __table_args__ = (
+        db.Index('ix_refrigerant_transaction_date_id', 'transaction_date', 'id'),
+        # Replays since a balance checkpoint
+        db.Index('ix_refrigerant_transaction_refrigerant_date', 'refrigerant_name', 'transaction_date'),
+        # Archived rows keep their ids, so SQLite must never hand them out again
+        {'sqlite_autoincrement': True},
+    )
+
     def __repr__(self):
         return f'<RefrigerantTransaction {self.id}: {self.transaction_type} - {self.quantity} lbs {self.refrigerant_name}>'
 
 
+class RefrigerantDailyRollup(db.Model):
+    """Daily refrigerant totals per refrigerant, customer and transaction type, maintained with each transaction"""
+    __tablename__ = 'refrigerant_daily_rollup'
+
+    id = db.Column(db.Integer, primary_key=True)
+    rollup_date = db.Column(db.Date, nullable=False)
+    refrigerant_name = db.Column(db.String(50), nullable=False)  # R-22, R-410A, etc.
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=True)  # None for stock movements
+    transaction_type = db.Column(db.String(50), nullable=False)  # Purchase, Added, Recovered, Disposed
+
+    # Totals for the day
+    total_quantity = db.Column(db.Float, nullable=False, default=0.0)  # pounds
+    transaction_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_refrigerant_daily_rollup_key', 'rollup_date', 'refrigerant_name', 'customer_id', 'transaction_type'),
+        db.Index('ix_refrigerant_daily_rollup_type_date', 'transaction_type', 'rollup_date'),
+    )
+
+    def __repr__(self):
+        return f'<RefrigerantDailyRollup {self.rollup_date} {self.refrigerant_name} {self.transaction_type}: {self.total_quantity} lbs>'
+
+
+class InventoryCheckpoint(db.Model):
+    """Ledger balance of a refrigerant at a month end, so point-in-time balances replay only later transactions"""
+    __tablename__ = 'inventory_checkpoint'
+
+    id = db.Column(db.Integer, primary_key=True)
+    refrigerant_name = db.Column(db.String(50), nullable=False)  # R-22, R-410A, etc.
+    checkpoint_date = db.Column(db.Date, nullable=False)  # Includes every transaction dated on or before it
+
+    # Running totals of the ledger through checkpoint_date
+    quantity_on_hand = db.Column(db.Float, nullable=False, default=0.0)  # Purchased less added and disposed, pounds
+    quantity_recovered = db.Column(db.Float, nullable=False, default=0.0)  # pounds
+    transaction_count = db.Column(db.Integer, nullable=False, default=0)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('uq_inventory_checkpoint_refrigerant_date', 'refrigerant_name', 'checkpoint_date', unique=True),
+    )
+
+    def __repr__(self):
+        return f'<InventoryCheckpoint {self.refrigerant_name} {self.checkpoint_date}: {self.quantity_on_hand} lbs>'
+
+
 class ComplianceAlert(db.Model):
     """Compliance alerts and notifications"""
     __tablename__ = 'compliance_alert'
@@ -224,15 +334,96 @@ class ComplianceAlert(db.Model):
     resolved_date = db.Column(db.Date)
     resolved_by = db.Column(db.String(200))
     resolution_notes = db.Column(db.Text)
+    resolution_id = db.Column(db.Integer, db.ForeignKey('alert_resolution.id'), nullable=True)
+
+    # Repeat occurrences of an active alert (see compliance_alerts.raise_alert)
+    occurrence_count = db.Column(db.Integer, default=1)
+    last_seen_date = db.Column(db.Date)
 
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # Keyset pagination order (sort key, id)
+        db.Index('ix_compliance_alert_date_id', 'alert_date', 'id'),
+        # Open alerts of a type (compliance sweeps)
+        db.Index('ix_compliance_alert_type_status', 'alert_type', 'status'),
+        # Alerts closed by one resolution
+        db.Index('ix_compliance_alert_resolution', 'resolution_id'),
+        # At most one active alert per equipment, technician and type (NULL ids compare as 0)
+        db.Index(
+            'uq_compliance_alert_active',
+            db.func.coalesce(equipment_id, 0), db.func.coalesce(technician_id, 0), alert_type,
+            unique=True,
+            sqlite_where=db.text("status = 'Active'"),
+            postgresql_where=db.text("status = 'Active'")
+        ),
+        # Archived rows keep their ids, so SQLite must never hand them out again
+        {'sqlite_autoincrement': True},
+    )
+
     def __repr__(self):
         return f'<ComplianceAlert {self.id}: {self.alert_type} - {self.severity}>'
 
 
+class AlertResolution(db.Model):
+    """Audit record of one resolve action - who resolved which alerts (single or bulk), and why"""
+    __tablename__ = 'alert_resolution'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    resolved_by = db.Column(db.String(200), nullable=False)
+    resolved_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    resolution_notes = db.Column(db.Text)
+
+    criteria = db.Column(db.Text)  # JSON of the filters used (ids are linked via ComplianceAlert.resolution_id)
+    alert_count = db.Column(db.Integer, default=0)
+
+    # Relationships
+    alerts = db.relationship('ComplianceAlert', backref='resolution', lazy='dynamic')
+
+    def __repr__(self):
+        return f'<AlertResolution {self.id}: {self.alert_count} alerts by {self.resolved_by}>'
+
+
+class SweepLease(db.Model):
+    """Time-limited lease giving one process the right to run a compliance sweep"""
+    __tablename__ = 'sweep_lease'
+
+    name = db.Column(db.String(50), primary_key=True)  # Sweep name
+    holder = db.Column(db.String(200), nullable=False)  # host:pid of the lease owner
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<SweepLease {self.name}: {self.holder} until {self.expires_at}>'
+
+
+class SweepRun(db.Model):
+    """One run of a compliance sweep, with its duration and outcome"""
+    __tablename__ = 'sweep_run'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False)
+    holder = db.Column(db.String(200))
+
+    started_at = db.Column(db.DateTime, nullable=False)
+    finished_at = db.Column(db.DateTime)
+    duration_ms = db.Column(db.Float)
+
+    alerts_created = db.Column(db.Integer, default=0)
+    alerts_resolved = db.Column(db.Integer, default=0)
+    status = db.Column(db.String(20), nullable=False)  # Success, Failed
+    error = db.Column(db.Text)
+
+    __table_args__ = (
+        db.Index('ix_sweep_run_name_started', 'name', 'started_at'),
+    )
+
+    def __repr__(self):
+        return f'<SweepRun {self.id}: {self.name} {self.status} in {self.duration_ms}ms>'
+
+
 class RefrigerantInventory(db.Model):
     """Current refrigerant inventory tracking"""
     __tablename__ = 'refrigerant_inventory'
@@ -295,6 +486,11 @@ class Document(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Keyset pagination order (sort key, id)
+    __table_args__ = (
+        db.Index('ix_document_status_uploaded_id', 'status', 'uploaded_at', 'id'),
+    )
+
     def __repr__(self):
         return f'<Document {self.id}: {self.original_filename} ({self.document_type})>'
 
@@ -483,5 +679,99 @@ class Customer(db.Model):
     # Relationships - Link equipment to customers
     equipment = db.relationship('Equipment', backref='customer', lazy=True, foreign_keys='Equipment.customer_id')
 
+    # Keyset pagination order (sort key, id)
+    __table_args__ = (
+        db.Index('ix_customer_company_name_id', 'company_name', 'id'),
+    )
+
     def __repr__(self):
         return f'<Customer {self.company_name}>'
+
+
+# ============================================================================
+# COLD STORAGE
+# ============================================================================
+# Records moved out of the hot tables by record_archive.py. Each archive table
+# copies its hot table's columns (original id kept, constraints and defaults
+# dropped) plus archived_at; rows are read-only and kept for audits.
+#
+# Original ids must stay unique across hot and archive, so the hot tables are
+# AUTOINCREMENT on SQLite (Postgres sequences never go back). SQLite databases
+# created before that reuse the highest free id instead; record_archive.py
+# always leaves each table's newest row in place so that id never comes free.
+
+def _archive_table(model, *indexes):
+    """Archive table with the hot model's columns"""
+    columns = [
+        db.Column(column.name, column.type, nullable=column.name != 'id')
+        for column in model.__table__.columns
+    ]
+    return db.Table(
+        f'{model.__tablename__}_archive', db.metadata,
+        db.Column('archive_id', db.Integer, primary_key=True),
+        *columns,
+        db.Column('archived_at', db.DateTime, nullable=False, default=datetime.utcnow),
+        *indexes
+    )
+
+
+class ServiceLogArchive(db.Model):
+    """Archived service logs"""
+    __table__ = _archive_table(
+        ServiceLog,
+        db.Index('ix_service_log_archive_equipment_date', 'equipment_id', 'service_date'),
+        db.Index('ix_service_log_archive_technician_date', 'technician_id', 'service_date'),
+    )
+    archived = True
+
+    equipment = db.relationship('Equipment', primaryjoin='foreign(ServiceLogArchive.equipment_id) == Equipment.id', viewonly=True)
+    technician = db.relationship('Technician', primaryjoin='foreign(ServiceLogArchive.technician_id) == Technician.id', viewonly=True)
+
+    def __repr__(self):
+        return f'<ServiceLogArchive {self.id}: {self.service_type} on {self.service_date}>'
+
+
+class LeakInspectionArchive(db.Model):
+    """Archived leak inspections"""
+    __table__ = _archive_table(
+        LeakInspection,
+        db.Index('ix_leak_inspection_archive_equipment_date', 'equipment_id', 'inspection_date'),
+        db.Index('ix_leak_inspection_archive_technician_date', 'technician_id', 'inspection_date'),
+    )
+    archived = True
+
+    equipment = db.relationship('Equipment', primaryjoin='foreign(LeakInspectionArchive.equipment_id) == Equipment.id', viewonly=True)
+    technician = db.relationship('Technician', primaryjoin='foreign(LeakInspectionArchive.technician_id) == Technician.id', viewonly=True)
+
+    def __repr__(self):
+        return f'<LeakInspectionArchive {self.id}: Equipment {self.equipment_id} on {self.inspection_date}>'
+
+
+class RefrigerantTransactionArchive(db.Model):
+    """Archived refrigerant transactions"""
+    __table__ = _archive_table(
+        RefrigerantTransaction,
+        db.Index('ix_refrigerant_transaction_archive_equipment_date', 'equipment_id', 'transaction_date'),
+        db.Index('ix_refrigerant_transaction_archive_refrigerant_date', 'refrigerant_name', 'transaction_date'),
+    )
+    archived = True
+
+    equipment = db.relationship('Equipment', primaryjoin='foreign(RefrigerantTransactionArchive.equipment_id) == Equipment.id', viewonly=True)
+
+    def __repr__(self):
+        return f'<RefrigerantTransactionArchive {self.id}: {self.transaction_type} - {self.quantity} lbs {self.refrigerant_name}>'
+
+
+class ComplianceAlertArchive(db.Model):
+    """Archived resolved and dismissed compliance alerts"""
+    __table__ = _archive_table(
+        ComplianceAlert,
+        db.Index('ix_compliance_alert_archive_date_id', 'alert_date', 'id'),
+        db.Index('ix_compliance_alert_archive_equipment', 'equipment_id'),
+    )
+    archived = True
+
+    equipment = db.relationship('Equipment', primaryjoin='foreign(ComplianceAlertArchive.equipment_id) == Equipment.id', viewonly=True)
+
+    def __repr__(self):
+        return f'<ComplianceAlertArchive {self.id}: {self.alert_type} - {self.severity}>'
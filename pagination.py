@@ -0,0 +1,208 @@
+"""
+Keyset Pagination for EcoFreonTrack
+Pages list views and JSON APIs on (sort key, id) so every page costs one indexed
+range scan, no matter how deep the user pages
+"""
+import base64
+import json
+from datetime import date, datetime
+from flask import current_app, request, url_for
+from sqlalchemy import and_, or_
+
+# Default rows per page when LIST_PAGE_SIZE is not configured
+DEFAULT_PAGE_SIZE = 50
+
+# Upper bound for the per_page query parameter when MAX_PAGE_SIZE is not configured
+DEFAULT_MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def encode_cursor(sort_value, row_id):
+    """
+    Encode a (sort key, id) position as an opaque URL-safe cursor
+
+    Args:
+        sort_value: Sort column value of the boundary row (str, int, float, date or datetime)
+        row_id: Primary key of the boundary row
+
+    Returns:
+        Cursor string
+    """
+    if isinstance(sort_value, (date, datetime)):
+        sort_value = sort_value.isoformat()
+    payload = json.dumps([sort_value, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort_column=None):
+    """
+    Decode a cursor back into a (sort key, id) position typed for sort_column
+
+    Args:
+        cursor: Cursor string produced by encode_cursor
+        sort_column: Column the cursor was produced for (None leaves the sort key as decoded JSON)
+
+    Returns:
+        tuple: (sort_value, row_id)
+
+    Raises:
+        InvalidCursor: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        python_type = sort_column.type.python_type if sort_column is not None else None
+        if python_type is datetime:
+            sort_value = datetime.fromisoformat(sort_value)
+        elif python_type is date:
+            sort_value = date.fromisoformat(sort_value)
+        return sort_value, int(row_id)
+    except (ValueError, TypeError, NotImplementedError) as e:
+        raise InvalidCursor(f'Invalid cursor: {cursor}') from e
+
+
+def get_page_size():
+    """Rows per page from the per_page query parameter, clamped to the configured maximum"""
+    default_size = current_app.config.get('LIST_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    max_size = current_app.config.get('MAX_PAGE_SIZE', DEFAULT_MAX_PAGE_SIZE)
+    page_size = request.args.get('per_page', default_size, type=int)
+    return max(1, min(page_size, max_size))
+
+
+class KeysetPage:
+    """One page of rows plus the cursors to reach its neighbours"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None, page_size=DEFAULT_PAGE_SIZE):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.page_size = page_size
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def _page_url(self, **cursor):
+        """URL of the current endpoint with its query string, swapping in a new cursor"""
+        args = request.args.to_dict()
+        args.pop('after', None)
+        args.pop('before', None)
+        args.update(cursor)
+        return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+    @property
+    def next_url(self):
+        return self._page_url(after=self.next_cursor) if self.has_next else None
+
+    @property
+    def prev_url(self):
+        return self._page_url(before=self.prev_cursor) if self.has_prev else None
+
+    def link_header(self):
+        """RFC 8288 Link header value for the API responses"""
+        links = []
+        if self.has_next:
+            links.append(f'<{self.next_url}>; rel="next"')
+        if self.has_prev:
+            links.append(f'<{self.prev_url}>; rel="prev"')
+        return ', '.join(links)
+
+    def apply_headers(self, response):
+        """Attach cursors to a JSON response without changing its body"""
+        if self.has_next:
+            response.headers['X-Next-Cursor'] = self.next_cursor
+        if self.has_prev:
+            response.headers['X-Prev-Cursor'] = self.prev_cursor
+        link = self.link_header()
+        if link:
+            response.headers['Link'] = link
+        return response
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+
+def paginate_keyset(query, sort_column, id_column, descending=True, page_size=None, after=None, before=None):
+    """
+    Fetch one page of a query ordered by (sort_column, id_column)
+
+    Pass the after cursor to page forward or the before cursor to page back.
+    Both default to the request's after/before query parameters. Each page is a
+    single range query of page_size + 1 rows, so the cost does not grow with depth.
+
+    Args:
+        query: Filtered SQLAlchemy query (without ORDER BY)
+        sort_column: Non-null sort key column
+        id_column: Unique tie-breaker column (primary key)
+        descending: Sort newest/largest first
+        page_size: Rows per page (defaults to get_page_size())
+        after: Cursor of the last row on the previous page
+        before: Cursor of the first row on the next page
+
+    Returns:
+        KeysetPage
+
+    Raises:
+        InvalidCursor: If a cursor is malformed
+    """
+    page_size = page_size or get_page_size()
+    if after is None and before is None:
+        after = request.args.get('after') or None
+        before = request.args.get('before') or None
+
+    # Walking backwards flips the scan direction; rows are re-reversed below
+    backwards = before is not None
+    scan_descending = descending != backwards
+    cursor = before if backwards else after
+
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor, sort_column)
+        if scan_descending:
+            query = query.filter(or_(
+                sort_column < sort_value,
+                and_(sort_column == sort_value, id_column < row_id)
+            ))
+        else:
+            query = query.filter(or_(
+                sort_column > sort_value,
+                and_(sort_column == sort_value, id_column > row_id)
+            ))
+
+    if scan_descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+
+    rows = query.limit(page_size + 1).all()
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+
+    def boundary(row):
+        return encode_cursor(getattr(row, sort_column.key), getattr(row, id_column.key))
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if backwards:
+            # We arrived from the page after this one, so it always exists
+            next_cursor = boundary(rows[-1])
+            prev_cursor = boundary(rows[0]) if has_more else None
+        else:
+            next_cursor = boundary(rows[-1]) if has_more else None
+            prev_cursor = boundary(rows[0]) if cursor else None
+
+    return KeysetPage(rows, next_cursor=next_cursor, prev_cursor=prev_cursor, page_size=page_size)
@@ -0,0 +1,202 @@
+"""
+Cold Storage for EcoFreonTrack
+Moves resolved alerts and service, inspection and refrigerant records past the hot
+retention window into archive tables, a batch per transaction. Archived records are
+never deleted: the equipment and technician detail pages merge them back in, and the
+leak-rate and usage computations read them alongside the hot tables.
+
+Run directly (e.g. nightly from cron):
+    python record_archive.py               # archive everything due
+    python record_archive.py --dry-run     # count what would move
+"""
+import sys
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, insert, delete, exists, func, desc, literal, and_, DateTime
+from sqlalchemy.orm import aliased
+from models import (
+    db, ServiceLog, LeakInspection, RefrigerantTransaction, ComplianceAlert, Document,
+    ServiceLogArchive, LeakInspectionArchive, RefrigerantTransactionArchive, ComplianceAlertArchive
+)
+from dashboard_sections import invalidate_dashboard_sections
+
+# Hot model -> archive model
+ARCHIVE_MODELS = {
+    ServiceLog: ServiceLogArchive,
+    LeakInspection: LeakInspectionArchive,
+    RefrigerantTransaction: RefrigerantTransactionArchive,
+    ComplianceAlert: ComplianceAlertArchive,
+}
+
+
+# ============================================================================
+# WHAT IS DUE
+# ============================================================================
+
+def _records_cutoff(today):
+    """Records dated before this leave the hot tables"""
+    return today - timedelta(days=current_app.config.get('ARCHIVE_RECORDS_AFTER_DAYS', 3 * 365))
+
+
+def _service_logs_due(today):
+    """Aged service logs, except each unit's latest and those with documents attached"""
+    later = aliased(ServiceLog)
+    return and_(
+        ServiceLog.service_date < _records_cutoff(today),
+        # The latest service log feeds the unit's compliance state
+        exists().where(later.equipment_id == ServiceLog.equipment_id, later.service_date > ServiceLog.service_date),
+        ~exists().where(Document.service_log_id == ServiceLog.id)
+    )
+
+
+def _leak_inspections_due(today):
+    """Aged inspections, except each unit's latest and those with documents attached"""
+    later = aliased(LeakInspection)
+    return and_(
+        LeakInspection.inspection_date < _records_cutoff(today),
+        # The latest inspection anchors the next inspection's leak rate
+        exists().where(later.equipment_id == LeakInspection.equipment_id, later.inspection_date > LeakInspection.inspection_date),
+        ~exists().where(Document.leak_inspection_id == LeakInspection.id)
+    )
+
+
+def _refrigerant_transactions_due(today):
+    """Aged ledger entries without documents attached"""
+    return and_(
+        RefrigerantTransaction.transaction_date < _records_cutoff(today),
+        ~exists().where(Document.refrigerant_transaction_id == RefrigerantTransaction.id)
+    )
+
+
+def _compliance_alerts_due(today):
+    """Alerts resolved or dismissed long enough ago"""
+    cutoff = today - timedelta(days=current_app.config.get('ARCHIVE_RESOLVED_ALERTS_AFTER_DAYS', 90))
+    return and_(
+        ComplianceAlert.status.in_(('Resolved', 'Dismissed')),
+        func.coalesce(ComplianceAlert.resolved_date, ComplianceAlert.alert_date) < cutoff
+    )
+
+
+# name -> (hot model, due condition, dashboard sources to invalidate)
+ARCHIVES = {
+    'service_log': (ServiceLog, _service_logs_due, ('service_log',)),
+    'leak_inspection': (LeakInspection, _leak_inspections_due, ('leak_inspection',)),
+    'refrigerant_transaction': (RefrigerantTransaction, _refrigerant_transactions_due, ('service_log', 'inventory')),
+    'compliance_alert': (ComplianceAlert, _compliance_alerts_due, ('alert',)),
+}
+
+
+# ============================================================================
+# ARCHIVING
+# ============================================================================
+
+def _archive_batch(model, due, batch_size):
+    """
+    Move up to batch_size due rows into the archive table in one transaction
+
+    Returns:
+        Number of rows moved
+    """
+    ids = db.session.execute(select(model.id).where(due).order_by(model.id).limit(batch_size)).scalars().all()
+    if not ids:
+        return 0
+
+    try:
+        hot = model.__table__
+        db.session.execute(insert(ARCHIVE_MODELS[model].__table__).from_select(
+            [column.name for column in hot.columns] + ['archived_at'],
+            select(*hot.columns, literal(datetime.utcnow(), DateTime)).where(hot.c.id.in_(ids))
+        ))
+        db.session.execute(delete(hot).where(hot.c.id.in_(ids)))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return len(ids)
+
+
+def archive_records(today=None, dry_run=False, batch_size=None):
+    """
+    Move every record past its retention window into cold storage
+
+    Each batch commits on its own, so an interrupted run keeps its progress
+    and never holds long locks on the hot tables.
+
+    Args:
+        today: Reference date (default today)
+        dry_run: Only count the records that would move
+        batch_size: Rows per transaction (default ARCHIVE_BATCH_SIZE)
+
+    Returns:
+        Dict of table name -> records archived (or due, for a dry run)
+    """
+    today = today or datetime.now().date()
+    batch_size = batch_size or current_app.config.get('ARCHIVE_BATCH_SIZE', 5000)
+
+    report, sources = {}, set()
+    for name, (model, due_condition, dashboard_sources) in ARCHIVES.items():
+        # The newest row always stays: SQLite tables created without AUTOINCREMENT
+        # give new rows max(id) + 1, which would otherwise reuse an archived id
+        due = and_(due_condition(today), model.id < select(func.max(model.id)).correlate(None).scalar_subquery())
+        if dry_run:
+            report[name] = db.session.execute(select(func.count()).select_from(model).where(due)).scalar()
+            continue
+
+        moved = 0
+        while True:
+            batch = _archive_batch(model, due, batch_size)
+            moved += batch
+            if batch < batch_size:
+                break
+        report[name] = moved
+        if moved:
+            sources.update(dashboard_sources)
+
+    if sources:
+        invalidate_dashboard_sections(*sources)
+    return report
+
+
+# ============================================================================
+# READING ARCHIVED RECORDS
+# ============================================================================
+
+def with_archived(model, order_by, limit=None, **filters):
+    """
+    Hot and archived records matching filters, newest first (for detail pages)
+
+    Archived rows have the same attributes as hot ones plus archived = True.
+
+    Args:
+        model: Hot model (a key of ARCHIVE_MODELS)
+        order_by: Name of the date column to sort on
+        limit: Return at most this many records
+        **filters: Column equality filters, e.g. equipment_id=5
+
+    Returns:
+        List of model and archive model instances
+    """
+    records = []
+    for source in (model, ARCHIVE_MODELS[model]):
+        query = source.query.filter_by(**filters).order_by(desc(getattr(source, order_by)), desc(source.id))
+        if limit:
+            query = query.limit(limit)
+        records.extend(query.all())
+
+    records.sort(key=lambda record: (getattr(record, order_by), record.id), reverse=True)
+    return records[:limit] if limit else records
+
+
+if __name__ == '__main__':
+    from app import app
+
+    dry_run = '--dry-run' in sys.argv
+
+    print("=" * 60)
+    print("EcoFreonTrack - Archive Records" + (" (dry run)" if dry_run else ""))
+    print("=" * 60)
+
+    with app.app_context():
+        for name, count in archive_records(dry_run=dry_run).items():
+            print(f"  {name}: {count} {'due' if dry_run else 'archived'}")
@@ -0,0 +1,264 @@
+"""
+Refrigerant Demand Forecasting for EcoFreonTrack
+Projects each refrigerant's consumption from its history of refrigerant added to
+equipment, and turns it into days until stockout and a suggested reorder quantity.
+The whole catalog is forecast in one pass with NumPy over a refrigerants x days matrix
+of daily usage read from the daily rollup (archived transactions included):
+
+- level: the 90-day moving average of daily usage, with the season taken out
+- seasonality: each calendar month's average daily usage relative to the overall
+  average, once at least a year of history exists
+- projection: level x seasonal index of each future day, accumulated until it
+  exceeds the stock on hand
+
+The forecast is cached in-process until a new transaction is recorded, the inventory
+changes or the day turns over.
+
+Run directly:
+    python refrigerant_forecast.py     # print the reorder plan
+"""
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+from flask import current_app
+from sqlalchemy import func
+from models import db, RefrigerantInventory, RefrigerantTransaction, RefrigerantDailyRollup
+
+# Days of usage history read (two years, so every month is seen twice)
+FORECAST_HISTORY_DAYS = 730
+
+# Days projected ahead; stockouts further out are reported as None
+FORECAST_HORIZON_DAYS = 365
+
+# Moving average windows (days)
+SHORT_WINDOW_DAYS = 30
+LONG_WINDOW_DAYS = 90
+
+# History needed before monthly seasonality is applied
+MIN_SEASONAL_HISTORY_DAYS = 365
+
+# Safety stock covers lead-time demand up to this many standard deviations (~95% service level)
+SAFETY_STOCK_Z = 1.65
+
+_cache = {'version': None, 'forecast': None}
+_cache_lock = threading.Lock()
+
+
+# ============================================================================
+# LOADING
+# ============================================================================
+
+def _load_usage(names, start, today):
+    """
+    Daily pounds added per refrigerant from start through today
+
+    Returns:
+        tuple: (usage matrix of shape (len(names), days), dict of refrigerant -> first day it was used)
+    """
+    days = (today - start).days + 1
+    usage = np.zeros((len(names), days))
+    rows = db.session.query(
+        RefrigerantDailyRollup.rollup_date,
+        RefrigerantDailyRollup.refrigerant_name,
+        func.sum(RefrigerantDailyRollup.total_quantity)
+    ).filter(
+        RefrigerantDailyRollup.transaction_type == 'Added',
+        RefrigerantDailyRollup.rollup_date >= start,
+        RefrigerantDailyRollup.rollup_date <= today
+    ).group_by(RefrigerantDailyRollup.rollup_date, RefrigerantDailyRollup.refrigerant_name).all()
+
+    index = {name: i for i, name in enumerate(names)}
+    rows = [row for row in rows if row[1] in index]
+    if rows:
+        np.add.at(
+            usage,
+            (np.fromiter((index[row[1]] for row in rows), dtype=np.int64, count=len(rows)),
+             np.fromiter(((row[0] - start).days for row in rows), dtype=np.int64, count=len(rows))),
+            np.fromiter((row[2] or 0.0 for row in rows), dtype=np.float64, count=len(rows))
+        )
+
+    first_used = dict(db.session.query(
+        RefrigerantDailyRollup.refrigerant_name, func.min(RefrigerantDailyRollup.rollup_date)
+    ).filter(
+        RefrigerantDailyRollup.transaction_type == 'Added'
+    ).group_by(RefrigerantDailyRollup.refrigerant_name).all())
+    return usage, first_used
+
+
+def _months(start, days):
+    """Calendar month (0-11) of each of days consecutive days from start"""
+    dates = np.datetime64(start, 'D') + np.arange(days)
+    return dates.astype('datetime64[M]').astype(np.int64) % 12
+
+
+# ============================================================================
+# FORECASTING
+# ============================================================================
+
+def _last_days(days, spans):
+    """Mask of shape (refrigerants, days) selecting each refrigerant's last spans[i] days"""
+    return np.arange(days) >= days - spans[:, None]
+
+
+def _moving_average(usage, observed, window):
+    """Average daily usage over each refrigerant's last window observed days (fewer if its history is shorter)"""
+    span = np.minimum(window, observed)
+    totals = np.where(_last_days(usage.shape[1], span), usage, 0.0).sum(axis=1)
+    return np.divide(totals, span, out=np.zeros(usage.shape[0]), where=span > 0)
+
+
+def _seasonal_indices(usage, months, observed):
+    """
+    Per-refrigerant seasonal index of each calendar month, shape (refrigerants, 12)
+
+    A month's index is its average daily usage over the overall average, both
+    taken over the refrigerant's own history; all ones for refrigerants with
+    less than a year of history or no usage, and for unseen months.
+    """
+    indices = np.ones((usage.shape[0], 12))
+    seasonal = observed >= MIN_SEASONAL_HISTORY_DAYS
+    if not seasonal.any():
+        return indices
+
+    observed_days = _last_days(usage.shape[1], observed).astype(np.float64)
+    # One-hot (days, 12) turns the per-month sums and day counts into matrix products
+    one_hot = (months[:, None] == np.arange(12)).astype(np.float64)
+    month_sums = (usage * observed_days) @ one_hot
+    month_days = observed_days @ one_hot
+    overall = np.divide(month_sums.sum(axis=1), observed, out=np.zeros(usage.shape[0]), where=observed > 0)
+
+    apply = seasonal[:, None] & (overall > 0)[:, None] & (month_days > 0)
+    monthly = np.divide(month_sums, month_days, out=np.zeros_like(month_sums), where=month_days > 0)
+    ratio = np.divide(monthly, overall[:, None], out=np.ones_like(monthly), where=overall[:, None] > 0)
+    return np.where(apply, ratio, indices)
+
+
+def forecast_catalog(today=None):
+    """
+    Forecast usage, stockout and reorder quantity for every stocked refrigerant
+
+    Args:
+        today: Forecast date (default today)
+
+    Returns:
+        List of dicts, one per refrigerant, ordered by refrigerant name
+    """
+    today = today or datetime.now().date()
+    lead_time = max(int(current_app.config.get('REORDER_LEAD_TIME_DAYS', 14)), 0)
+    cover = max(int(current_app.config.get('REORDER_COVER_DAYS', 60)), 0)
+    horizon = max(FORECAST_HORIZON_DAYS, lead_time + cover)
+
+    inventory = RefrigerantInventory.query.order_by(RefrigerantInventory.refrigerant_name).all()
+    if not inventory:
+        return []
+    names = [item.refrigerant_name for item in inventory]
+    on_hand = np.array([item.quantity_on_hand or 0.0 for item in inventory])
+    reorder_level = np.array([item.reorder_level or 0.0 for item in inventory])
+
+    start = today - timedelta(days=FORECAST_HISTORY_DAYS - 1)
+    usage, first_used = _load_usage(names, start, today)
+    # Days of history per refrigerant, from its own first use
+    observed = np.array([
+        (today - max(first_used[name], start)).days + 1 if name in first_used else 0
+        for name in names
+    ])
+    months = _months(start, FORECAST_HISTORY_DAYS)
+
+    # Level: long moving average, divided by the seasonality of the days it spans
+    short_average = _moving_average(usage, observed, SHORT_WINDOW_DAYS)
+    long_average = _moving_average(usage, observed, LONG_WINDOW_DAYS)
+    indices = _seasonal_indices(usage, months, observed)
+    span = np.maximum(np.minimum(LONG_WINDOW_DAYS, observed), 1)
+    window = _last_days(FORECAST_HISTORY_DAYS, span)
+    window_season = np.where(window, indices[:, months], 0.0).sum(axis=1) / span
+    level = np.divide(long_average, window_season, out=long_average.copy(), where=window_season > 0)
+
+    # Projection: cumulative usage through each future day, column 0 being none at all
+    future_months = _months(today + timedelta(days=1), horizon)
+    projected = np.zeros((len(names), horizon + 1))
+    np.cumsum(level[:, None] * indices[:, future_months], axis=1, out=projected[:, 1:])
+
+    out_of_stock = projected >= on_hand[:, None]
+    runs_out = out_of_stock.any(axis=1)
+    days_until_stockout = np.where(on_hand <= 0, 0, np.where(runs_out, out_of_stock.argmax(axis=1), -1))
+
+    # Reorder point: lead-time demand plus safety stock for its variability
+    window_mean = np.where(window, usage, 0.0).sum(axis=1) / span
+    daily_deviation = np.sqrt(np.where(window, (usage - window_mean[:, None]) ** 2, 0.0).sum(axis=1) / span)
+    daily_deviation[observed == 0] = 0.0
+    safety_stock = SAFETY_STOCK_Z * daily_deviation * np.sqrt(lead_time)
+    reorder_point = projected[:, lead_time] + safety_stock
+    order_up_to = np.maximum(projected[:, lead_time + cover] + safety_stock, reorder_level)
+    reorder_now = ((on_hand <= reorder_point) & (level > 0)) | (on_hand < reorder_level)
+    suggested = np.where(reorder_now, np.maximum(order_up_to - on_hand, 0.0), 0.0)
+
+    current_month = today.month - 1
+    forecast = []
+    for i, item in enumerate(inventory):
+        stockout_in = int(days_until_stockout[i]) if days_until_stockout[i] >= 0 else None
+        forecast.append({
+            'id': item.id,
+            'refrigerant_name': item.refrigerant_name,
+            'quantity_on_hand': round(float(on_hand[i]), 2),
+            'reorder_level': item.reorder_level,
+            'average_daily_usage_30d': round(float(short_average[i]), 3),
+            'average_daily_usage_90d': round(float(long_average[i]), 3),
+            'seasonal_index': round(float(indices[i, current_month]), 3),
+            'forecast_daily_usage': round(float(level[i] * indices[i, current_month]), 3),
+            'days_until_stockout': stockout_in,
+            'stockout_date': (today + timedelta(days=stockout_in)).isoformat() if stockout_in is not None else None,
+            'reorder_point': round(float(reorder_point[i]), 2),
+            'reorder_now': bool(reorder_now[i]),
+            'suggested_reorder_quantity': round(float(suggested[i]), 2),
+        })
+    return forecast
+
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+def _forecast_version(today):
+    """Changes whenever a transaction is recorded, the inventory is edited or the day turns over"""
+    last_transaction = db.session.query(func.max(RefrigerantTransaction.id)).scalar()
+    last_inventory_change, stocked = db.session.query(
+        func.max(RefrigerantInventory.last_updated), func.count(RefrigerantInventory.id)
+    ).one()
+    return today, last_transaction, last_inventory_change, stocked
+
+
+def get_catalog_forecast(today=None):
+    """
+    forecast_catalog(), computed once per version of the ledger and inventory
+
+    Returns:
+        List of dicts, one per refrigerant (shared - do not modify)
+    """
+    today = today or datetime.now().date()
+    version = _forecast_version(today)
+    with _cache_lock:
+        if _cache['version'] == version:
+            return _cache['forecast']
+
+    forecast = forecast_catalog(today)
+    with _cache_lock:
+        _cache['version'], _cache['forecast'] = version, forecast
+    return forecast
+
+
+if __name__ == '__main__':
+    from app import app
+
+    print("=" * 60)
+    print("EcoFreonTrack - Refrigerant Reorder Plan")
+    print("=" * 60)
+
+    with app.app_context():
+        for item in forecast_catalog():
+            stockout = f"{item['days_until_stockout']} days" if item['days_until_stockout'] is not None \
+                else f"over {FORECAST_HORIZON_DAYS} days"
+            print(f"\n  {item['refrigerant_name']}: {item['quantity_on_hand']} lbs on hand, "
+                  f"~{item['forecast_daily_usage']} lbs/day, stockout in {stockout}")
+            if item['reorder_now']:
+                print(f"    -> reorder {item['suggested_reorder_quantity']} lbs "
+                      f"(reorder point {item['reorder_point']} lbs)")
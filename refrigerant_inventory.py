@@ -0,0 +1,95 @@
+"""
+Refrigerant Inventory Updates for EcoFreonTrack
+Stock levels only ever change through relative UPDATEs
+(SET quantity_on_hand = quantity_on_hand - :x), so concurrent service submissions
+and adjustments against the same refrigerant cannot overwrite each other's changes.
+
+On Postgres the UPDATE row-locks the inventory row until the transaction commits.
+SQLite locks the whole database instead; a writer that times out waiting for the
+lock (or loses a deadlock on Postgres) is rolled back and run again.
+
+Stress test with parallel writers: python stress_inventory.py
+"""
+import random
+import time
+from flask import current_app
+from sqlalchemy import update, func
+from sqlalchemy.exc import DBAPIError
+from models import db, RefrigerantInventory
+
+# Postgres SQLSTATEs of transactions that lost a race and can simply run again:
+# serialization failure, deadlock detected, lock not available
+RETRYABLE_SQLSTATES = {'40001', '40P01', '55P03'}
+
+
+def adjust_inventory(refrigerant_name=None, inventory_id=None, on_hand=0.0, recovered=0.0):
+    """
+    Apply stock changes to one refrigerant with a single atomic UPDATE
+
+    The new levels are computed by the database from the row's current values,
+    and below_reorder is refreshed in the same statement. Runs inside the
+    caller's session; the caller commits.
+
+    Args:
+        refrigerant_name: Refrigerant to adjust (e.g. 'R-22'), or
+        inventory_id: Inventory database ID to adjust
+        on_hand: Pounds to add to quantity_on_hand (negative to take stock out)
+        recovered: Pounds to add to quantity_recovered
+
+    Returns:
+        True if the refrigerant is stocked (its row was updated)
+    """
+    if inventory_id is not None:
+        condition = RefrigerantInventory.id == inventory_id
+    else:
+        condition = RefrigerantInventory.refrigerant_name == refrigerant_name
+
+    on_hand_now = func.coalesce(RefrigerantInventory.quantity_on_hand, 0.0) + on_hand
+    return db.session.execute(update(RefrigerantInventory).where(condition).values(
+        quantity_on_hand=on_hand_now,
+        quantity_recovered=func.coalesce(RefrigerantInventory.quantity_recovered, 0.0) + recovered,
+        # SET expressions all see the row as it was, so compare against the new level explicitly
+        below_reorder=on_hand_now < RefrigerantInventory.reorder_level
+    ).execution_options(synchronize_session=False)).rowcount > 0
+
+
+# ============================================================================
+# RETRYING ON WRITE CONFLICTS
+# ============================================================================
+
+def is_write_conflict(error):
+    """True for lock and serialization errors that running the transaction again can get past"""
+    if 'database is locked' in str(error.orig):
+        return True  # SQLite busy timeout expired
+    return getattr(error.orig, 'pgcode', None) in RETRYABLE_SQLSTATES
+
+
+def retry_on_conflict(work, attempts=None):
+    """
+    Run work() and commit, starting over when the transaction loses a write conflict
+
+    A conflict rolls the session back, discarding every object work() added,
+    so work() must build its objects itself rather than receive them. Other
+    errors roll back and propagate unchanged.
+
+    Args:
+        work: Callable making the changes in db.session (without committing)
+        attempts: Tries before giving up (default WRITE_CONFLICT_RETRIES)
+
+    Returns:
+        What work() returned on the attempt that committed
+    """
+    attempts = attempts or current_app.config.get('WRITE_CONFLICT_RETRIES', 5)
+    backoff = current_app.config.get('WRITE_CONFLICT_BACKOFF', 0.05)
+
+    for attempt in range(1, attempts + 1):
+        try:
+            result = work()
+            db.session.commit()
+            return result
+        except DBAPIError as e:
+            db.session.rollback()
+            if attempt == attempts or not is_write_conflict(e):
+                raise
+            # Jittered exponential backoff so the losers do not collide again in step
+            time.sleep(random.uniform(0, backoff * 2 ** attempt))
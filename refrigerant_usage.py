@@ -0,0 +1,378 @@
+"""
+Refrigerant Usage Aggregates for EcoFreonTrack
+Maintains the daily refrigerant rollup alongside the transaction ledger and answers
+usage questions (monthly trends, totals by refrigerant) from the rollup
+
+Run directly to reconcile the rollup against the raw ledger:
+    python refrigerant_usage.py          # report mismatches
+    python refrigerant_usage.py --fix    # rebuild the rollup from the ledger
+"""
+import sys
+from datetime import datetime
+from sqlalchemy import func, insert, select, update, union_all
+from models import db, Equipment, RefrigerantTransaction, RefrigerantTransactionArchive, RefrigerantDailyRollup
+from inventory_balances import apply_to_checkpoints
+
+# Supported breakdown dimensions for monthly usage
+USAGE_GROUPINGS = {
+    'refrigerant': RefrigerantDailyRollup.refrigerant_name,
+    'customer': RefrigerantDailyRollup.customer_id,
+}
+
+
+# ============================================================================
+# ROLLUP MAINTENANCE
+# ============================================================================
+
+def add_refrigerant_transaction(transaction, customer_id=None):
+    """
+    Add a ledger transaction to the session and apply it to the daily rollup
+    (and to any balance checkpoints it predates)
+
+    Runs inside the caller's session, so the rollup commits (or rolls back)
+    together with the transaction. The rollup row is bumped with a single
+    UPDATE ... SET total_quantity = total_quantity + :qty so concurrent writers
+    never lose increments; reads always SUM, so a rare duplicate key row from
+    a concurrent first insert is harmless.
+
+    Args:
+        transaction: New RefrigerantTransaction
+        customer_id: Customer owning the equipment (None for stock movements),
+                     recorded on the transaction so its usage stays with that customer
+    """
+    transaction.customer_id = customer_id
+    db.session.add(transaction)
+    apply_to_rollup(
+        transaction.transaction_date,
+        transaction.refrigerant_name,
+        customer_id,
+        transaction.transaction_type,
+        transaction.quantity
+    )
+    apply_to_checkpoints(
+        transaction.transaction_date,
+        transaction.refrigerant_name,
+        transaction.transaction_type,
+        transaction.quantity
+    )
+
+
+def apply_to_rollup(rollup_date, refrigerant_name, customer_id, transaction_type, quantity, count=1):
+    """Increment one daily rollup bucket, creating it if needed"""
+    customer_filter = (
+        RefrigerantDailyRollup.customer_id.is_(None) if customer_id is None
+        else RefrigerantDailyRollup.customer_id == customer_id
+    )
+
+    updated = RefrigerantDailyRollup.query.filter(
+        RefrigerantDailyRollup.rollup_date == rollup_date,
+        RefrigerantDailyRollup.refrigerant_name == refrigerant_name,
+        customer_filter,
+        RefrigerantDailyRollup.transaction_type == transaction_type
+    ).update({
+        RefrigerantDailyRollup.total_quantity: RefrigerantDailyRollup.total_quantity + quantity,
+        RefrigerantDailyRollup.transaction_count: RefrigerantDailyRollup.transaction_count + count
+    }, synchronize_session=False)
+
+    if not updated:
+        db.session.add(RefrigerantDailyRollup(
+            rollup_date=rollup_date,
+            refrigerant_name=refrigerant_name,
+            customer_id=customer_id,
+            transaction_type=transaction_type,
+            total_quantity=quantity,
+            transaction_count=count
+        ))
+
+
+def _ledger_aggregate():
+    """Grouped ledger totals, archived entries included, in rollup shape (date, refrigerant, customer, type, quantity, count)"""
+    ledger = union_all(*[
+        select(model.id, model.customer_id, model.transaction_date, model.refrigerant_name,
+               model.transaction_type, model.quantity)
+        for model in (RefrigerantTransaction, RefrigerantTransactionArchive)
+    ]).subquery()
+
+    # Grouped on the customer recorded with each transaction, as the rollup was written
+    return select(
+        ledger.c.transaction_date,
+        ledger.c.refrigerant_name,
+        ledger.c.customer_id,
+        ledger.c.transaction_type,
+        func.sum(ledger.c.quantity),
+        func.count(ledger.c.id)
+    ).select_from(ledger).group_by(
+        ledger.c.transaction_date,
+        ledger.c.refrigerant_name,
+        ledger.c.customer_id,
+        ledger.c.transaction_type
+    )
+
+
+def backfill_transaction_customers():
+    """
+    Record the current equipment owner on transactions written before customer_id existed
+
+    Their original owner is unknown, so this is the best available answer;
+    run it once, when the column is added. The caller commits.
+    """
+    for model in (RefrigerantTransaction, RefrigerantTransactionArchive):
+        db.session.execute(update(model).where(
+            model.customer_id.is_(None),
+            model.equipment_id.isnot(None)
+        ).values(
+            customer_id=select(Equipment.customer_id).where(Equipment.id == model.equipment_id).scalar_subquery()
+        ).execution_options(synchronize_session=False))
+
+
+def detach_customer_usage(customer_id):
+    """
+    Move a deleted customer's transactions and rollup buckets to 'Unassigned'
+
+    Ledger and rollup change together, so they keep reconciling. Runs inside
+    the caller's session; the caller commits.
+    """
+    for model in (RefrigerantTransaction, RefrigerantTransactionArchive, RefrigerantDailyRollup):
+        db.session.execute(update(model).where(model.customer_id == customer_id).values(
+            customer_id=None
+        ).execution_options(synchronize_session=False))
+
+
+def rebuild_refrigerant_rollup():
+    """
+    Replace the daily rollup with totals recomputed from the raw ledger
+
+    Returns:
+        Number of rollup rows written
+    """
+    try:
+        RefrigerantDailyRollup.query.delete()
+        db.session.execute(
+            insert(RefrigerantDailyRollup).from_select(
+                ['rollup_date', 'refrigerant_name', 'customer_id', 'transaction_type',
+                 'total_quantity', 'transaction_count'],
+                _ledger_aggregate()
+            )
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return RefrigerantDailyRollup.query.count()
+
+
+def reconcile_refrigerant_rollup(tolerance=0.001):
+    """
+    Compare the daily rollup against the raw ledger
+
+    Args:
+        tolerance: Allowed difference in pounds per bucket (float rounding)
+
+    Returns:
+        List of dicts describing each mismatched (date, refrigerant, customer, type) bucket
+    """
+    ledger = {
+        (row[0], row[1], row[2], row[3]): (row[4] or 0.0, row[5])
+        for row in db.session.execute(_ledger_aggregate())
+    }
+
+    rollup = {
+        (row[0], row[1], row[2], row[3]): (row[4] or 0.0, row[5])
+        for row in db.session.query(
+            RefrigerantDailyRollup.rollup_date,
+            RefrigerantDailyRollup.refrigerant_name,
+            RefrigerantDailyRollup.customer_id,
+            RefrigerantDailyRollup.transaction_type,
+            func.sum(RefrigerantDailyRollup.total_quantity),
+            func.sum(RefrigerantDailyRollup.transaction_count)
+        ).group_by(
+            RefrigerantDailyRollup.rollup_date,
+            RefrigerantDailyRollup.refrigerant_name,
+            RefrigerantDailyRollup.customer_id,
+            RefrigerantDailyRollup.transaction_type
+        )
+    }
+
+    mismatches = []
+    for key in sorted(set(ledger) | set(rollup), key=lambda k: tuple(str(part) for part in k)):
+        ledger_quantity, ledger_count = ledger.get(key, (0.0, 0))
+        rollup_quantity, rollup_count = rollup.get(key, (0.0, 0))
+        if abs(ledger_quantity - rollup_quantity) > tolerance or ledger_count != rollup_count:
+            mismatches.append({
+                'date': key[0],
+                'refrigerant_name': key[1],
+                'customer_id': key[2],
+                'transaction_type': key[3],
+                'ledger_quantity': round(ledger_quantity, 3),
+                'rollup_quantity': round(rollup_quantity, 3),
+                'ledger_count': ledger_count,
+                'rollup_count': rollup_count
+            })
+    return mismatches
+
+
+# ============================================================================
+# USAGE QUERIES
+# ============================================================================
+
+def get_month_starts(months=6, today=None):
+    """
+    Get the first day of each of the last N calendar months, oldest first
+
+    Args:
+        months: Number of months including the current one
+        today: Reference date (defaults to today)
+
+    Returns:
+        List of date objects
+    """
+    today = today or datetime.now().date()
+    starts = []
+    year, month = today.year, today.month
+    for _ in range(months):
+        starts.append(today.replace(year=year, month=month, day=1))
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+    return list(reversed(starts))
+
+
+def _next_month(month_start):
+    """First day of the month after month_start"""
+    if month_start.month == 12:
+        return month_start.replace(year=month_start.year + 1, month=1)
+    return month_start.replace(month=month_start.month + 1)
+
+
+def month_key(column):
+    """SQL expression truncating a date column to a 'YYYY-MM' key for the active database"""
+    if db.engine.dialect.name == 'postgresql':
+        return func.to_char(column, 'YYYY-MM')
+    return func.strftime('%Y-%m', column)
+
+
+def get_monthly_refrigerant_usage(months=6, group_by=None, today=None):
+    """
+    Refrigerant added and recovered per calendar month, read from the daily rollup
+
+    Args:
+        months: Number of calendar months to include (current month last)
+        group_by: Optional breakdown - 'refrigerant' or 'customer'
+        today: Reference date (defaults to today)
+
+    Returns:
+        Dict with 'labels', 'added' and 'recovered' lists (one entry per month),
+        plus 'breakdown' mapping each group value (as a string, 'Unassigned' for
+        equipment without a customer) to its own added/recovered lists when
+        group_by is given
+    """
+    if group_by and group_by not in USAGE_GROUPINGS:
+        raise ValueError(f'Unsupported grouping: {group_by}')
+
+    month_starts = get_month_starts(months, today)
+    keys = [m.strftime('%Y-%m') for m in month_starts]
+    index = {key: i for i, key in enumerate(keys)}
+    series_for_type = {'Added': 'added', 'Recovered': 'recovered'}
+
+    month = month_key(RefrigerantDailyRollup.rollup_date).label('month')
+    columns = [
+        month,
+        RefrigerantDailyRollup.transaction_type,
+        func.sum(RefrigerantDailyRollup.total_quantity).label('total'),
+    ]
+    group_columns = [month, RefrigerantDailyRollup.transaction_type]
+    if group_by:
+        group_column = USAGE_GROUPINGS[group_by].label('group_value')
+        columns.append(group_column)
+        group_columns.append(group_column)
+
+    rows = db.session.query(*columns).filter(
+        RefrigerantDailyRollup.transaction_type.in_(series_for_type),
+        RefrigerantDailyRollup.rollup_date >= month_starts[0],
+        RefrigerantDailyRollup.rollup_date < _next_month(month_starts[-1])
+    ).group_by(*group_columns).all()
+
+    totals = {'added': [0.0] * months, 'recovered': [0.0] * months}
+    breakdown = {}
+
+    for row in rows:
+        i = index.get(row.month)
+        if i is None:
+            continue
+        series = series_for_type[row.transaction_type]
+        totals[series][i] += row.total or 0.0
+
+        if group_by:
+            group_key = str(row.group_value) if row.group_value is not None else 'Unassigned'
+            group = breakdown.setdefault(group_key, {'added': [0.0] * months, 'recovered': [0.0] * months})
+            group[series][i] = round(group[series][i] + (row.total or 0.0), 2)
+
+    usage = {
+        'labels': [m.strftime('%b %Y') for m in month_starts],
+        'added': [round(v, 2) for v in totals['added']],
+        'recovered': [round(v, 2) for v in totals['recovered']],
+    }
+    if group_by:
+        usage['breakdown'] = breakdown
+    return usage
+
+
+def get_recovery_summary(since):
+    """
+    Total refrigerant recovered and number of recovery operations since a date
+
+    Args:
+        since: Start date (inclusive)
+
+    Returns:
+        tuple: (total_recovered: float, recovery_count: int)
+    """
+    total, count = db.session.query(
+        func.coalesce(func.sum(RefrigerantDailyRollup.total_quantity), 0.0),
+        func.coalesce(func.sum(RefrigerantDailyRollup.transaction_count), 0)
+    ).filter(
+        RefrigerantDailyRollup.transaction_type == 'Recovered',
+        RefrigerantDailyRollup.rollup_date >= since
+    ).one()
+    return total, count
+
+
+def get_usage_by_refrigerant(transaction_type='Added'):
+    """
+    All-time totals per refrigerant for a transaction type
+
+    Returns:
+        List of rows with refrigerant_name and total
+    """
+    return db.session.query(
+        RefrigerantDailyRollup.refrigerant_name,
+        func.sum(RefrigerantDailyRollup.total_quantity).label('total')
+    ).filter(
+        RefrigerantDailyRollup.transaction_type == transaction_type
+    ).group_by(RefrigerantDailyRollup.refrigerant_name).all()
+
+
+if __name__ == '__main__':
+    from app import app
+
+    print("=" * 60)
+    print("EcoFreonTrack - Reconcile Refrigerant Daily Rollup")
+    print("=" * 60)
+
+    with app.app_context():
+        if '--fix' in sys.argv:
+            count = rebuild_refrigerant_rollup()
+            print(f"\n[OK] Rebuilt rollup from ledger ({count} daily buckets)")
+        else:
+            mismatches = reconcile_refrigerant_rollup()
+            if not mismatches:
+                print("\n[OK] Rollup matches the transaction ledger")
+            else:
+                print(f"\n[!] {len(mismatches)} mismatched buckets:")
+                for m in mismatches:
+                    print(f"  {m['date']} {m['refrigerant_name']} customer={m['customer_id']} {m['transaction_type']}: "
+                          f"ledger {m['ledger_quantity']} lbs/{m['ledger_count']} tx, "
+                          f"rollup {m['rollup_quantity']} lbs/{m['rollup_count']} tx")
+                print("\nRun with --fix to rebuild the rollup from the ledger.")
+                sys.exit(1)
@@ -0,0 +1,224 @@
+"""
+Bulk Service Log Ingestion for EcoFreonTrack
+Loads historical service logs in executemany batches together with their derived
+refrigerant transactions, then applies one aggregated inventory delta per refrigerant,
+one rollup increment per daily bucket and one set-based compliance update
+
+Run directly to load a file:
+    python service_log_import.py logs.csv              # all-or-nothing
+    python service_log_import.py logs.xlsx --partial   # commit valid rows, report the rest
+"""
+import sys
+from collections import defaultdict
+from sqlalchemy import insert
+from models import db, Equipment, Technician, ServiceLog, RefrigerantTransaction, RefrigerantInventory
+from refrigerant_usage import apply_to_rollup
+from refrigerant_inventory import adjust_inventory
+from inventory_balances import apply_to_checkpoints
+from compliance_state import apply_service_dates
+from leak_rates import recompute_service_leak_rates, RECOMPUTE_BATCH_SIZE
+from bulk_import import (
+    iter_import_rows, detect_format, run_import, cell_text, parse_number, parse_date, parse_bool,
+    ALL_OR_NOTHING, PARTIAL, IMPORT_BATCH_SIZE
+)
+
+# equipment_id is the equipment code (Equipment.equipment_id), as on the equipment import file
+REQUIRED_COLUMNS = ['equipment_id', 'technician_id', 'service_date', 'service_type']
+
+
+class ServiceLogIngestion:
+    """
+    One ingestion run: validates rows, writes batches, and accumulates the
+    inventory, rollup and compliance effects to apply once at the end
+    """
+
+    def __init__(self):
+        # equipment code -> (id, refrigerant_name, refrigerant_type, customer_id)
+        self.equipment = {
+            row.equipment_id: (row.id, row.refrigerant_name, row.refrigerant_type, row.customer_id)
+            for row in db.session.query(
+                Equipment.equipment_id, Equipment.id, Equipment.refrigerant_name,
+                Equipment.refrigerant_type, Equipment.customer_id
+            )
+        }
+        self.technician_ids = {technician_id for (technician_id,) in db.session.query(Technician.id)}
+        self.stocked = {name for (name,) in db.session.query(RefrigerantInventory.refrigerant_name)}
+
+        self.inventory_deltas = defaultdict(lambda: {'added': 0.0, 'recovered': 0.0})
+        self.rollup_deltas = defaultdict(lambda: [0.0, 0])  # (date, refrigerant, customer, type) -> [qty, count]
+        self.latest_service = {}  # equipment pk -> latest service date
+
+    def validate(self, row_number, row):
+        """Convert one row to service log parameters plus the equipment it belongs to"""
+        errors = []
+        missing = [column for column in REQUIRED_COLUMNS if not cell_text(row.get(column))]
+        if missing:
+            errors.append(f'Missing required value(s): {", ".join(missing)}')
+
+        code = cell_text(row.get('equipment_id'))
+        equipment = self.equipment.get(code)
+        if code and equipment is None:
+            errors.append(f'Unknown equipment {code}')
+
+        technician_id = None
+        if cell_text(row.get('technician_id')):
+            technician_id = parse_number(row.get('technician_id'), int, 'technician_id', errors)
+            if technician_id is not None and technician_id not in self.technician_ids:
+                errors.append(f'Unknown technician_id {technician_id}')
+
+        service_date = None
+        if cell_text(row.get('service_date')):
+            service_date = parse_date(row.get('service_date'), 'service_date', errors)
+
+        quantities = {}
+        for column in ('refrigerant_added', 'refrigerant_recovered'):
+            quantities[column] = 0.0
+            if cell_text(row.get(column)):
+                quantities[column] = parse_number(row.get(column), float, column, errors)
+                if quantities[column] is not None and quantities[column] < 0:
+                    errors.append(f'{column} cannot be negative')
+
+        follow_up_date = None
+        if cell_text(row.get('follow_up_date')):
+            follow_up_date = parse_date(row.get('follow_up_date'), 'follow_up_date', errors)
+
+        if errors:
+            return None, errors
+
+        return {
+            'equipment': equipment,
+            'log': {
+                'equipment_id': equipment[0],
+                'technician_id': technician_id,
+                'service_date': service_date,
+                'service_type': cell_text(row.get('service_type')),
+                'refrigerant_added': quantities['refrigerant_added'],
+                'refrigerant_recovered': quantities['refrigerant_recovered'],
+                'work_performed': cell_text(row.get('work_performed')),
+                'leak_found': parse_bool(row.get('leak_found')),
+                'leak_repaired': parse_bool(row.get('leak_repaired')),
+                'leak_location': cell_text(row.get('leak_location')),
+                'follow_up_required': parse_bool(row.get('follow_up_required')),
+                'follow_up_date': follow_up_date,
+                'follow_up_notes': cell_text(row.get('follow_up_notes')),
+            }
+        }, []
+
+    def write_batch(self, batch):
+        """Insert one batch of logs and derived transactions, and accumulate their effects"""
+        logs, transactions = [], []
+
+        for item in batch:
+            log = item['log']
+            equipment_pk, refrigerant_name, refrigerant_type, customer_id = item['equipment']
+            logs.append(log)
+
+            if self.latest_service.get(equipment_pk) is None or log['service_date'] > self.latest_service[equipment_pk]:
+                self.latest_service[equipment_pk] = log['service_date']
+
+            # Same rule as service_log_add: only stocked refrigerants move inventory
+            if refrigerant_name not in self.stocked:
+                continue
+
+            for transaction_type, column, verb in (('Added', 'refrigerant_added', 'Added'),
+                                                   ('Recovered', 'refrigerant_recovered', 'Recovered')):
+                quantity = log[column]
+                if quantity <= 0:
+                    continue
+                transactions.append({
+                    'equipment_id': equipment_pk,
+                    'customer_id': customer_id,
+                    'transaction_date': log['service_date'],
+                    'transaction_type': transaction_type,
+                    'refrigerant_type': refrigerant_type,
+                    'refrigerant_name': refrigerant_name,
+                    'quantity': quantity,
+                    'notes': f"{verb} during {log['service_type']}"
+                })
+                self.inventory_deltas[refrigerant_name][transaction_type.lower()] += quantity
+                bucket = self.rollup_deltas[(log['service_date'], refrigerant_name, customer_id, transaction_type)]
+                bucket[0] += quantity
+                bucket[1] += 1
+
+        db.session.execute(insert(ServiceLog.__table__), logs)
+        if transactions:
+            db.session.execute(insert(RefrigerantTransaction.__table__), transactions)
+
+    def finalize(self):
+        """Apply the accumulated inventory, rollup, compliance and leak-rate effects"""
+        for refrigerant_name, delta in self.inventory_deltas.items():
+            adjust_inventory(refrigerant_name, on_hand=-delta['added'], recovered=delta['recovered'])
+
+        for (rollup_date, refrigerant_name, customer_id, transaction_type), (quantity, count) in self.rollup_deltas.items():
+            apply_to_rollup(rollup_date, refrigerant_name, customer_id, transaction_type, quantity, count)
+            apply_to_checkpoints(rollup_date, refrigerant_name, transaction_type, quantity, count)
+
+        apply_service_dates(self.latest_service)
+
+        # EPA leak rates for the loaded additions and the later ones they precede
+        touched = list(self.latest_service)
+        recompute_service_leak_rates(touched if len(touched) <= RECOMPUTE_BATCH_SIZE else None)
+
+
+def ingest_service_logs(rows, mode=ALL_OR_NOTHING, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Ingest service logs in bulk
+
+    Args:
+        rows: Iterable of (row number, {column: value}), e.g. from iter_import_rows
+              or enumerate(json_records, start=1)
+        mode: ALL_OR_NOTHING (any invalid row rolls back the load) or PARTIAL
+        batch_size: Logs per executemany batch
+
+    Returns:
+        Import report (see bulk_import.run_import), errors keyed by equipment_id
+
+    Raises:
+        ValueError: For an unsupported mode or input missing required columns
+    """
+    ingestion = ServiceLogIngestion()
+    return run_import(
+        rows,
+        REQUIRED_COLUMNS,
+        ingestion.validate,
+        ingestion.write_batch,
+        mode=mode,
+        batch_size=batch_size,
+        key_column='equipment_id',
+        finalize=ingestion.finalize
+    )
+
+
+if __name__ == '__main__':
+    import time
+    from app import app
+
+    if len(sys.argv) < 2:
+        print("Usage: python service_log_import.py <file.csv|file.xlsx> [--partial]")
+        sys.exit(2)
+
+    path = sys.argv[1]
+    mode = PARTIAL if '--partial' in sys.argv else ALL_OR_NOTHING
+
+    print("=" * 60)
+    print("EcoFreonTrack - Bulk Service Log Ingestion")
+    print("=" * 60)
+
+    with app.app_context():
+        started = time.perf_counter()
+        with open(path, 'rb') as f:
+            report = ingest_service_logs(iter_import_rows(f, detect_format(path)), mode)
+        elapsed = time.perf_counter() - started
+
+    print(f"\nRows read: {report['total_rows']}  Imported: {report['imported']}  "
+          f"Errors: {report['error_count']}  ({elapsed:.2f}s)")
+    for error in report['errors'][:50]:
+        print(f"  Row {error['row']} ({error['equipment_id'] or '-'}): {'; '.join(error['errors'])}")
+    if report['error_count'] > 50:
+        print(f"  ... and {report['error_count'] - 50} more")
+
+    if report['committed']:
+        print("\n[OK] Ingestion committed")
+    else:
+        print("\n[!] Nothing imported - fix the errors above or rerun with --partial")
+        sys.exit(1)
@@ -0,0 +1,79 @@
+"""
+Headline Statistics Service for EcoFreonTrack
+Each table's status breakdown comes from one conditional-aggregate query (SUM(CASE ...)),
+memoized for the rest of the request so dashboard, reports, settings and chatbot share it
+"""
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import g, current_app
+from sqlalchemy import func, case
+from models import db, Equipment, Technician, ComplianceAlert, LeakInspection
+
+
+def request_memoized(f):
+    """Cache a stats function's result on flask.g for the current request/app context"""
+    @wraps(f)
+    def decorated_function(*args):
+        cache = g.setdefault('_stats_cache', {})
+        key = (f.__name__,) + args
+        if key not in cache:
+            cache[key] = f(*args)
+        return cache[key]
+    return decorated_function
+
+
+def _count_where(condition):
+    """SUM(CASE WHEN condition THEN 1 ELSE 0 END)"""
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+@request_memoized
+def get_equipment_stats():
+    """Equipment counts: total, active, retired, disposed"""
+    row = db.session.query(
+        func.count(Equipment.id).label('total'),
+        _count_where(Equipment.status == 'Active').label('active'),
+        _count_where(Equipment.status == 'Retired').label('retired'),
+        _count_where(Equipment.status == 'Disposed').label('disposed')
+    ).one()
+    return dict(row._mapping)
+
+
+@request_memoized
+def get_alert_stats():
+    """Alert counts: total, active, resolved, and active alerts by severity"""
+    active = ComplianceAlert.status == 'Active'
+    row = db.session.query(
+        func.count(ComplianceAlert.id).label('total'),
+        _count_where(active).label('active'),
+        _count_where(ComplianceAlert.status == 'Resolved').label('resolved'),
+        _count_where(active & (ComplianceAlert.severity == 'Critical')).label('critical'),
+        _count_where(active & (ComplianceAlert.severity == 'Warning')).label('warning'),
+        _count_where(active & (ComplianceAlert.severity == 'Info')).label('info')
+    ).one()
+    return dict(row._mapping)
+
+
+@request_memoized
+def get_inspection_stats():
+    """Leak inspection counts: total, compliant, non-compliant"""
+    row = db.session.query(
+        func.count(LeakInspection.id).label('total'),
+        _count_where(LeakInspection.compliant == True).label('compliant'),  # noqa: E712
+        _count_where(LeakInspection.compliant == False).label('non_compliant')  # noqa: E712
+    ).one()
+    return dict(row._mapping)
+
+
+@request_memoized
+def get_technician_stats():
+    """Technician counts: total, active, and active technicians whose certification expires soon"""
+    warning_days = current_app.config.get('CERTIFICATION_EXPIRY_WARNING_DAYS', 30)
+    expiry_cutoff = datetime.now().date() + timedelta(days=warning_days)
+    active = Technician.status == 'Active'
+    row = db.session.query(
+        func.count(Technician.id).label('total'),
+        _count_where(active).label('active'),
+        _count_where(active & (Technician.expiration_date <= expiry_cutoff)).label('expiring_certs')
+    ).one()
+    return dict(row._mapping)